@@ -1,14 +1,20 @@
 from __future__ import annotations
 
+import os
 import sys
 from pathlib import Path
 
 
 def ensure_cc3_importable() -> Path:
-    """Ensure `import cc3` works when running the API without installing the package."""
+    """Ensure `import cc3` works when running the API without installing the package.
+
+    Returns the data root (workspaces/, .env). `CC3_REPO_ROOT` overrides it,
+    e.g. to point a load test at a scratch directory.
+    """
 
     repo_root = Path(__file__).resolve().parents[3]
     src_dir = repo_root / "src"
     if src_dir.exists() and str(src_dir) not in sys.path:
         sys.path.insert(0, str(src_dir))
-    return repo_root
+    override = os.environ.get("CC3_REPO_ROOT")
+    return Path(override).resolve() if override else repo_root
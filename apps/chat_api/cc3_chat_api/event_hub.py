@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .bootstrap import ensure_cc3_importable
+
+_repo_root = ensure_cc3_importable()
+
+from cc3 import metrics  # noqa: E402
+from cc3.event_store import INDEX_FILE, RunReader, StoredEvent  # noqa: E402
+
+TERMINAL_STATES = {"completed", "failed", "cancelled", "coalesced"}
+
+# Items delivered to subscribers, prefixed with the subscriber's key. `next`
+# is the sequence number just past the event, i.e. the resume point:
+#   ("event", next, raw_line)      one stored event
+#   ("status", next, dict)         terminal run status (last item of a run)
+#   ("lifecycle", 0, dict)         run queued/started/finished (user channels)
+#   ("overflow", 0, None)          subscriber fell too far behind; reconnect
+Item = tuple[str, int, Any]
+Queued = tuple[Any, str, int, Any]
+
+POLL_S = 0.25
+MAX_QUEUE = 10_000
+
+
+def read_status(status_path: Path) -> dict[str, Any]:
+    if not status_path.exists():
+        return {}
+    try:
+        status = json.loads(status_path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return {}
+    return status if isinstance(status, dict) else {}
+
+
+def new_queue() -> asyncio.Queue[Queued]:
+    return asyncio.Queue(MAX_QUEUE)
+
+
+@dataclass(eq=False)
+class Subscriber:
+    """One consumer of a feed or user channel.
+
+    Several subscribers may share a queue (a multiplexed stream); `key` tells
+    their items apart.
+    """
+
+    queue: asyncio.Queue[Queued] = field(default_factory=new_queue)
+    key: Any = None
+
+    def push(self, item: Item) -> bool:
+        """Enqueue without blocking; on overflow drop the backlog and signal it."""
+
+        try:
+            self.queue.put_nowait((self.key, *item))
+            return True
+        except asyncio.QueueFull:
+            # Undelivered items are dropped; the client resumes from its last
+            # received id (Last-Event-ID) after reconnecting.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait((self.key, "overflow", 0, None))
+            return False
+
+
+class RunFeed:
+    """One shared poller of a run's event store, fanned out to subscribers."""
+
+    def __init__(self, hub: EventHub, run_dir: Path):
+        self._hub = hub
+        self.run_dir = run_dir
+        self.reader = RunReader(run_dir)
+        self.status_path = run_dir / "status.json"
+        # Next sequence number to poll for.
+        self.offset = 0
+        self.subscribers: set[Subscriber] = set()
+        self._task: asyncio.Task[None] | None = None
+
+    def attach(self, sub: Subscriber, since: int) -> None:
+        """Deliver the backlog [since, offset) synchronously, then go live.
+
+        Runs without an intervening await, so the pump cannot advance
+        `offset` between the backlog read and registration.
+        """
+
+        if since < self.offset:
+            for ev in self.reader.read(since, self.offset):
+                sub.push(("event", ev.seq + 1, ev.raw))
+        elif since > self.offset and not self.subscribers:
+            # A fresh feed for a reconnecting client: start where it left off.
+            self.offset = since
+        self.subscribers.add(sub)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._pump())
+
+    def detach(self, sub: Subscriber) -> None:
+        self.subscribers.discard(sub)
+        if not self.subscribers:
+            self._stop()
+
+    def _stop(self) -> None:
+        # The pump is not cancelled: it may be inside a worker-thread poll, and
+        # it exits on its own once it sees no subscribers.
+        self._task = None
+        self.reader.close()
+        self._hub._drop_feed(self)
+
+    def _poll(self, reader: RunReader, offset: int) -> tuple[dict[str, Any], list[StoredEvent]]:
+        """Status and events from `offset` on (blocking file IO, run in a worker thread)."""
+
+        # Read the status before draining: once it is terminal the executor
+        # has finished writing, so this drain is guaranteed to be the last.
+        status = read_status(self.status_path)
+        batch = list(reader.read(offset))
+        if batch:
+            try:
+                # The index mtime is the newest publish; once per batch.
+                published = (self.run_dir / INDEX_FILE).stat().st_mtime
+            except FileNotFoundError:
+                pass
+            else:
+                metrics.SSE_FANOUT_LAG.observe(max(0.0, time.time() - published))
+        return status, batch
+
+    async def _pump(self) -> None:
+        # Its own reader: `self.reader` serves attach() on the event loop.
+        reader = RunReader(self.run_dir)
+        try:
+            while self.subscribers:
+                status, batch = await asyncio.to_thread(self._poll, reader, self.offset)
+                for ev in batch:
+                    self.offset = ev.seq + 1
+                    self._fanout(("event", self.offset, ev.raw))
+
+                if status.get("state") in TERMINAL_STATES:
+                    self._fanout(("status", self.offset, status))
+                    self.subscribers.clear()
+                    break
+
+                await asyncio.sleep(POLL_S)
+        finally:
+            reader.close()
+        if self._hub._feeds.get(self.run_dir) is self:
+            self._stop()
+
+    def _fanout(self, item: Item) -> None:
+        for sub in list(self.subscribers):
+            if not sub.push(item):
+                self.subscribers.discard(sub)
+
+
+class EventHub:
+    """Process-wide SSE fan-out.
+
+    Each active run is polled by one `RunFeed` no matter how many clients
+    (per-run streams and per-user multiplexed streams) watch it. Run
+    lifecycle notifications are pushed from run threads into per-user
+    channels.
+    """
+
+    def __init__(self) -> None:
+        self._feeds: dict[Path, RunFeed] = {}
+        self._users: dict[str, set[Subscriber]] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def subscribe_run(self, run_dir: Path, sub: Subscriber, *, since: int = 0) -> RunFeed:
+        self._loop = asyncio.get_running_loop()
+        feed = self._feeds.get(run_dir)
+        if feed is None:
+            feed = self._feeds[run_dir] = RunFeed(self, run_dir)
+        feed.attach(sub, since)
+        return feed
+
+    def _drop_feed(self, feed: RunFeed) -> None:
+        if self._feeds.get(feed.run_dir) is feed:
+            del self._feeds[feed.run_dir]
+
+    def subscribe_user(self, user_id: str, sub: Subscriber) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._users.setdefault(user_id, set()).add(sub)
+
+    def unsubscribe_user(self, user_id: str, sub: Subscriber) -> None:
+        subs = self._users.get(user_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._users[user_id]
+
+    def publish_lifecycle(self, user_id: str, notice: dict[str, Any]) -> None:
+        """Thread-safe: called from run threads with queued/started/finished notices."""
+
+        loop = self._loop
+        if loop is None or loop.is_closed() or user_id not in self._users:
+            return
+        loop.call_soon_threadsafe(self._deliver_lifecycle, user_id, notice)
+
+    def _deliver_lifecycle(self, user_id: str, notice: dict[str, Any]) -> None:
+        for sub in list(self._users.get(user_id, ())):
+            sub.push(("lifecycle", 0, notice))
+
+
+_hub = EventHub()
+
+
+def get_event_hub() -> EventHub:
+    return _hub
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import dataclasses
+from pathlib import Path
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from .auth import get_user_id
+from .bootstrap import ensure_cc3_importable
+from .storage import blob_store, conversation_root, kb_file, kb_refs_dir
+
+repo_root = ensure_cc3_importable()
+
+from cc3.blobstore import BlobInfo, BlobStore, BlobWriter, is_digest  # noqa: E402
+
+router = APIRouter()
+
+# Upper bound for one kb document.
+KB_MAX_BYTES = 512 * 1024 * 1024
+
+
+def _kb_target(request: Request, conversation_id: str, kb_path: str) -> tuple[str, Path, Path]:
+    """(user_id, kb file, its blob reference)."""
+
+    user_id = get_user_id(request)
+    ws = conversation_root(repo_root, user_id, conversation_id)
+    if not ws.exists():
+        raise HTTPException(status_code=404, detail="conversation not found")
+    target = kb_file(ws, kb_path)
+    if target is None:
+        raise HTTPException(status_code=400, detail="invalid kb path")
+    ref = kb_refs_dir(repo_root, user_id, conversation_id) / target.relative_to(ws / "kb")
+    return user_id, target, ref
+
+
+@router.put("/v1/conversations/{conversation_id}/kb/{kb_path:path}")
+async def kb_put(request: Request, conversation_id: str, kb_path: str, sha256: str | None = None) -> JSONResponse:
+    """Store a kb document; the request body is the raw file content.
+
+    The body is hashed while it is written to the user's blob store; the
+    conversation gets its own copy (a reflink where supported), so the agent
+    may edit it without touching the blob. With `?sha256=<hex>` of content
+    the user has uploaded before, the document is copied from the store
+    without reading the body (send it empty); for unknown content the body
+    is required and must match the digest.
+    """
+
+    user_id, target, ref = _kb_target(request, conversation_id, kb_path)
+    store = blob_store(repo_root, user_id)
+
+    if sha256 is not None:
+        sha256 = sha256.lower()
+        if not is_digest(sha256):
+            raise HTTPException(status_code=400, detail="sha256 must be a hex digest")
+        if store.has(sha256):
+            try:
+                size = await run_in_threadpool(_checkout, store, sha256, ref, target)
+            except FileNotFoundError:
+                pass  # collected concurrently: fall back to the upload below
+            else:
+                return _stored(kb_path, sha256, size, deduplicated=True)
+        if request.headers.get("content-length") == "0":
+            raise HTTPException(status_code=404, detail="unknown content; upload the body")
+
+    w = store.writer()
+    try:
+        async for chunk in request.stream():
+            if w.size + len(chunk) > KB_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=f"kb documents are limited to {KB_MAX_BYTES} bytes")
+            await run_in_threadpool(w.write, chunk)
+        if sha256 is not None and w.digest != sha256:
+            raise HTTPException(status_code=400, detail="body does not match sha256")
+    except BaseException:
+        w.abort()
+        raise
+    info = await run_in_threadpool(_commit, store, w, ref, target)
+    return _stored(kb_path, info.digest, info.size, deduplicated=not info.created)
+
+
+# Blob store calls block (file IO, the store's file lock, gc walking every blob),
+# so kb_put runs them off the event loop. Replacing an existing document's
+# reference may drop its blob's last one; only then is a gc needed.
+
+
+def _checkout(store: BlobStore, digest: str, ref: Path, target: Path) -> int:
+    replaced = ref.exists()
+    store.checkout(digest, ref, target)
+    if replaced:
+        store.gc()
+    return target.stat().st_size
+
+
+def _commit(store: BlobStore, w: BlobWriter, ref: Path, target: Path) -> BlobInfo:
+    replaced = ref.exists()
+    info = w.commit(ref=ref)
+    store.copy(info.digest, target)
+    if replaced:
+        store.gc()
+    return info
+
+
+def _stored(kb_path: str, digest: str, size: int, *, deduplicated: bool) -> JSONResponse:
+    return JSONResponse(
+        status_code=201,
+        content={"path": kb_path, "sha256": digest, "size": size, "deduplicated": deduplicated},
+    )
+
+
+@router.delete("/v1/conversations/{conversation_id}/kb/{kb_path:path}")
+def kb_delete(request: Request, conversation_id: str, kb_path: str) -> dict[str, Any]:
+    user_id, target, ref = _kb_target(request, conversation_id, kb_path)
+    # The agent may have removed the file itself; its reference still counts.
+    if not target.is_file() and not ref.is_file():
+        raise HTTPException(status_code=404, detail="kb document not found")
+    target.unlink(missing_ok=True)
+    ref.unlink(missing_ok=True)
+    gc = blob_store(repo_root, user_id).gc()
+    return {"path": kb_path, "deleted": True, "gc": dataclasses.asdict(gc)}
@@ -2,9 +2,17 @@ from __future__ import annotations
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 
-from .routes import router as api_router
-from .sse_routes import router as sse_router
+from .bootstrap import ensure_cc3_importable
+
+ensure_cc3_importable()
+
+from cc3 import metrics  # noqa: E402
+
+from .kb_routes import router as kb_router  # noqa: E402
+from .routes import router as api_router  # noqa: E402
+from .sse_routes import router as sse_router  # noqa: E402
 
 
 def create_app() -> FastAPI:
@@ -20,10 +28,20 @@ def create_app() -> FastAPI:
         allow_credentials=False,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Read by the frontend for incremental message fetches.
+        expose_headers=["ETag", "X-Messages-Cursor"],
     )
 
     app.include_router(api_router)
     app.include_router(sse_router)
+    app.include_router(kb_router)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics_endpoint() -> Response:
+        # Prometheus text exposition; runs execute in-process so executor
+        # series (run duration, live processes, ...) are included.
+        return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
     return app
 
 
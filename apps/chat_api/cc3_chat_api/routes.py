@@ -1,24 +1,35 @@
 from __future__ import annotations
 
+import dataclasses
+import math
+import os
+import re
 import time
 from typing import Any
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
 
 from .auth import get_user_id
 from .bootstrap import ensure_cc3_importable
 
 repo_root = ensure_cc3_importable()
 
-from cc3.locking import acquire_workspace_lock  # noqa: E402
+from cc3.budget import parse_budget  # noqa: E402
 
+from .event_hub import get_event_hub  # noqa: E402
 from .run_manager import RunManager, RunRequest  # noqa: E402
 from .storage import (  # noqa: E402
     append_message,
+    conversation_lock,
     conversation_root,
+    conversations_etag,
     create_conversation,
+    fork_conversation,
     list_conversations,
-    load_messages,
+    load_conversation_meta,
+    load_messages_page,
+    messages_etag,
     new_message_id,
     new_run_id,
     run_dir,
@@ -26,34 +37,121 @@ from .storage import (  # noqa: E402
 
 router = APIRouter()
 
-_run_manager = RunManager(repo_root=repo_root)
+_AGENT_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Per-user budget over all agents (agent budgets live in agent.yaml). A run
+# whose budget frees up within CC3_BUDGET_MAX_DELAY_S is queued until then;
+# otherwise the message is rejected with 429.
+_USER_BUDGET = parse_budget(
+    {
+        "tokens": os.environ.get("CC3_USER_BUDGET_TOKENS"),
+        "cost_usd": os.environ.get("CC3_USER_BUDGET_USD"),
+        "window_s": os.environ.get("CC3_BUDGET_WINDOW_S"),
+    }
+)
+BUDGET_MAX_DELAY_S = float(os.environ.get("CC3_BUDGET_MAX_DELAY_S", "30"))
+
+_run_manager = RunManager(repo_root=repo_root, on_lifecycle=get_event_hub().publish_lifecycle, user_budget=_USER_BUDGET)
+
+
+def get_run_manager() -> RunManager:
+    return _run_manager
+
+
+# Header carrying the `after=` cursor of GET .../messages.
+MESSAGES_CURSOR_HEADER = "X-Messages-Cursor"
 
 
-@router.get("/v1/conversations")
-def conversations(request: Request) -> list[dict[str, Any]]:
+def _validators(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    # Revalidate every time (cheap), and keep users' cached copies apart.
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["Vary"] = "X-User-Id"
+
+
+def _not_modified(request: Request, etag: str) -> Response | None:
+    """A 304 response if the client's If-None-Match already matches `etag`."""
+
+    inm = request.headers.get("if-none-match")
+    if inm is None:
+        return None
+    tags = {t.strip().removeprefix("W/") for t in inm.split(",")}
+    if "*" not in tags and etag not in tags:
+        return None
+    resp = Response(status_code=304)
+    _validators(resp, etag)
+    return resp
+
+
+@router.get("/v1/conversations", response_model=None)
+def conversations(request: Request, response: Response) -> list[dict[str, Any]] | Response:
     user_id = get_user_id(request)
+    etag = conversations_etag(repo_root, user_id)
+    if (nm := _not_modified(request, etag)) is not None:
+        return nm
+    _validators(response, etag)
     return list_conversations(repo_root, user_id)
 
 
 @router.post("/v1/conversations")
 def conversations_create(request: Request, body: dict[str, Any] | None = None) -> dict[str, Any]:
     user_id = get_user_id(request)
+    title = None
+    agent_id = None
+    if isinstance(body, dict):
+        t = body.get("title")
+        title = t if isinstance(t, str) and t.strip() else None
+        a = body.get("agent_id")
+        if a is not None:
+            if not isinstance(a, str) or not _AGENT_ID_RE.match(a) or not _run_manager.service.has_profile(a):
+                raise HTTPException(status_code=400, detail="unknown agent_id")
+            agent_id = a
+    return create_conversation(repo_root, user_id, title, agent_id=agent_id)
+
+
+@router.post("/v1/conversations/{conversation_id}/fork")
+def conversations_fork(request: Request, conversation_id: str, body: dict[str, Any] | None = None) -> dict[str, Any]:
+    user_id = get_user_id(request)
+    ws = conversation_root(repo_root, user_id, conversation_id)
+    if not ws.exists():
+        raise HTTPException(status_code=404, detail="conversation not found")
+    # A run in progress would leave a half-written workspace in the fork.
+    if any(r.conversation_id == conversation_id for r in _run_manager.active_runs(user_id)):
+        raise HTTPException(status_code=409, detail="conversation has an active run")
+
     title = None
     if isinstance(body, dict):
         t = body.get("title")
         title = t if isinstance(t, str) and t.strip() else None
-    return create_conversation(repo_root, user_id, title)
+    meta, stats = fork_conversation(repo_root, user_id, conversation_id, title=title)
+    return {**meta, "clone": dataclasses.asdict(stats)}
 
 
-@router.get("/v1/conversations/{conversation_id}/messages")
-def messages(request: Request, conversation_id: str, limit: int = 200) -> list[dict[str, Any]]:
+@router.get("/v1/conversations/{conversation_id}/messages", response_model=None)
+def messages(
+    request: Request,
+    response: Response,
+    conversation_id: str,
+    limit: int = 200,
+    after: int | None = None,
+) -> list[dict[str, Any]] | Response:
+    """Message history; `after=<X-Messages-Cursor of a previous response>` returns only newer messages."""
+
     user_id = get_user_id(request)
     ws = conversation_root(repo_root, user_id, conversation_id)
     if not ws.exists():
         raise HTTPException(status_code=404, detail="conversation not found")
 
+    limit = min(max(limit, 1), 1000)
+    etag = messages_etag(ws, limit, *([] if after is None else [after]))
+    if (nm := _not_modified(request, etag)) is not None:
+        return nm
+
     # No lock for read (append-only file); acceptable for MVP.
-    return load_messages(ws, limit=min(max(limit, 1), 1000))
+    msgs, cursor = load_messages_page(ws, limit=limit, after=after)
+    _validators(response, etag)
+    response.headers[MESSAGES_CURSOR_HEADER] = str(cursor)
+    return msgs
 
 
 @router.post("/v1/conversations/{conversation_id}/messages")
@@ -68,12 +166,22 @@ def messages_post(request: Request, conversation_id: str, body: dict[str, Any])
     if not ws.exists():
         raise HTTPException(status_code=404, detail="conversation not found")
 
+    agent_id = load_conversation_meta(ws).get("agent_id")
+    wait = _run_manager.budget_wait(user_id, agent_id)
+    if wait is not None and wait.retry_after_s > BUDGET_MAX_DELAY_S:
+        retry_after = math.ceil(wait.retry_after_s)
+        raise HTTPException(
+            status_code=429,
+            detail={"error": "budget exhausted", "scope": wait.scope, "retry_after_s": retry_after},
+            headers={"Retry-After": str(retry_after)},
+        )
+
     run_id = new_run_id()
     msg_id = new_message_id()
     now = time.time()
 
-    # Serialize mutation under conversation workspace lock.
-    h = acquire_workspace_lock(ws, timeout_s=10.0)
+    # Serialize mutation under the conversation lock (not held during runs).
+    h = conversation_lock(ws, timeout_s=10.0)
     try:
         append_message(
             ws,
@@ -97,10 +205,33 @@ def messages_post(request: Request, conversation_id: str, body: dict[str, Any])
             workspace=ws,
             run_id=run_id,
             content=content,
+            message_id=msg_id,
+            agent_id=agent_id,
+            not_before=now + wait.retry_after_s if wait is not None else None,
         )
     )
 
-    return {"run_id": run_id, "user_message_id": msg_id}
+    out: dict[str, Any] = {"run_id": run_id, "user_message_id": msg_id}
+    if wait is not None:
+        out["delayed_s"] = round(wait.retry_after_s, 3)
+    return out
+
+
+@router.get("/v1/usage")
+def usage(request: Request) -> dict[str, Any]:
+    """The user's usage within their budget window."""
+
+    user_id = get_user_id(request)
+    budget = _run_manager.user_budget
+    used = _run_manager.ledger.usage(budget, user_id=user_id)
+    return {
+        "window_s": budget.window_s,
+        "tokens": used.tokens,
+        "cost_usd": used.cost_usd,
+        "limit_tokens": budget.tokens,
+        "limit_cost_usd": budget.cost_usd,
+        "retry_after_s": round(used.retry_after_s, 3),
+    }
 
 
 @router.get("/v1/conversations/{conversation_id}/runs/{run_id}")
@@ -115,3 +246,38 @@ def run_status(request: Request, conversation_id: str, run_id: str) -> dict[str,
         raise HTTPException(status_code=404, detail="run not found")
 
     return _run_manager.status(ws, run_id)
+
+
+@router.get("/v1/conversations/{conversation_id}/runs/{run_id}/result")
+def run_result(request: Request, conversation_id: str, run_id: str) -> FileResponse:
+    """The full result text of a finished run; supports `Range: bytes=...`."""
+
+    user_id = get_user_id(request)
+    ws = conversation_root(repo_root, user_id, conversation_id)
+    if not ws.exists():
+        raise HTTPException(status_code=404, detail="conversation not found")
+
+    p = run_dir(ws, run_id) / "result.txt"
+    if not p.is_file():
+        raise HTTPException(status_code=404, detail="result not found")
+
+    return FileResponse(p, media_type="text/plain; charset=utf-8")
+
+
+@router.delete("/v1/conversations/{conversation_id}/runs/{run_id}")
+def run_cancel(request: Request, conversation_id: str, run_id: str) -> dict[str, Any]:
+    user_id = get_user_id(request)
+    ws = conversation_root(repo_root, user_id, conversation_id)
+    if not ws.exists():
+        raise HTTPException(status_code=404, detail="conversation not found")
+
+    rd = run_dir(ws, run_id)
+    if not rd.exists():
+        raise HTTPException(status_code=404, detail="run not found")
+
+    if not _run_manager.cancel(run_id):
+        raise HTTPException(status_code=409, detail="run is not active")
+
+    # The final `cancelled` state is written by the run thread; SSE subscribers
+    # receive it as their terminal status event.
+    return {"run_id": run_id, "cancel_requested": True}
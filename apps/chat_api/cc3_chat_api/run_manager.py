@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import logging
 import threading
 import time
 import traceback
-from dataclasses import dataclass
+from collections.abc import Callable
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
@@ -11,18 +13,29 @@ from .bootstrap import ensure_cc3_importable
 
 _repo_root = ensure_cc3_importable()
 
-from cc3.locking import acquire_workspace_lock  # noqa: E402
-from cc3.runner import RunConfig, run_one_step  # noqa: E402
+from cc3 import metrics  # noqa: E402
+from cc3.budget import Budget, BudgetLedger  # noqa: E402
+from cc3.config import AgentConfig  # noqa: E402
+from cc3.orchestrator.service import OrchestratorService  # noqa: E402
+from cc3.rollover import context_tokens, seeded_goal, should_roll_over, summarize_session  # noqa: E402
+from cc3.runner import cancel_run  # noqa: E402
 
 from .storage import (  # noqa: E402
     append_message,
+    conversation_lock,
+    is_fork_pending,
+    load_session,
     load_session_id,
+    new_run_id,
     read_run_status,
+    roll_over_session,
     run_dir,
     save_session_id,
     write_run_status,
 )
 
+_log = logging.getLogger(__name__)
+
 
 @dataclass(frozen=True)
 class RunRequest:
@@ -31,109 +44,272 @@ class RunRequest:
     workspace: Path
     run_id: str
     content: str
+    # The user message this run answers (linked from the assistant reply).
+    message_id: str | None = None
+    # Agent profile under agents/<id>; None uses CHAT_DEFAULT_PROFILE.
+    agent_id: str | None = None
+    # Monotonic submission time, for the queue-wait histogram.
+    submitted_at: float = field(default_factory=time.monotonic)
+    # Wall-clock time before which the run must not start (budget admission).
+    not_before: float | None = None
+
+
+# Profile for conversations created without an agent_id: the chat UI has no
+# permission prompts, so claude runs with full tool access. Long conversations
+# roll over to a fresh session (seeded with a summary) after ~1M tokens.
+CHAT_DEFAULT_PROFILE = AgentConfig(
+    agent_id="chat", policy_preset="open", permission_mode="bypassPermissions", session_max_tokens=1_000_000
+)
+
+
+@dataclass(frozen=True)
+class BudgetWait:
+    # "user" or "agent": the exhausted budget that frees up last.
+    scope: str
+    retry_after_s: float
+
+
+# (user_id, notice) with notice = {conversation_id, run_id, phase, state};
+# phase is one of queued / started / finished.
+LifecycleListener = Callable[[str, dict[str, Any]], None]
 
 
 class RunManager:
     """Run coordinator.
 
-    MVP: uses a background thread per run. This keeps FastAPI endpoints simple
-    (sync handlers) and avoids event-loop/threadpool edge cases.
+    MVP: uses a background worker thread per busy conversation. This keeps
+    FastAPI endpoints simple (sync handlers) and avoids event-loop/threadpool
+    edge cases.
     """
 
-    def __init__(self, *, repo_root: Path):
+    def __init__(
+        self,
+        *,
+        repo_root: Path,
+        on_lifecycle: LifecycleListener | None = None,
+        service: OrchestratorService | None = None,
+        user_budget: Budget | None = None,
+        ledger: BudgetLedger | None = None,
+    ):
         self._repo_root = repo_root
-        self._threads: dict[str, threading.Thread] = {}
+        # Shared across runs: cached agent profiles, executors and graphs.
+        self.service = service or OrchestratorService(repo_root, default_profile=CHAT_DEFAULT_PROFILE)
+        # Usage of finished runs, for per-user (all agents) and per-agent (all users) budgets.
+        self.user_budget = user_budget or Budget()
+        self.ledger = ledger or BudgetLedger(repo_root / ".cc3" / "usage.ndjson")
+        self._on_lifecycle = on_lifecycle
+        # Per-conversation FIFO: pending runs and the thread draining them.
+        self._pending: dict[tuple[str, str], list[RunRequest]] = {}
+        self._workers: dict[tuple[str, str], threading.Thread] = {}
+        self._requests: dict[str, RunRequest] = {}
+        self._cancel_events: dict[str, threading.Event] = {}
+        # SSE subscriber bookkeeping for auto-cancel on disconnect.
+        self._subscribers: dict[str, int] = {}
+        self._auto_cancel: set[str] = set()
         self._lock = threading.Lock()
 
     def start(self, req: RunRequest) -> None:
+        """Queue a run behind the conversation's active run (FIFO).
+
+        Each conversation has at most one worker thread. Messages that pile
+        up while a run is in progress are dispatched together as one run.
+        """
+
         with self._lock:
-            if req.run_id in self._threads:
+            if req.run_id in self._requests:
                 return
-            t = threading.Thread(target=self._run_sync, args=(req,), daemon=True)
-            self._threads[req.run_id] = t
-            t.start()
+            self._requests[req.run_id] = req
+            self._cancel_events[req.run_id] = threading.Event()
+        self._notify(req, "queued", "queued", **({"not_before": req.not_before} if req.not_before else {}))
 
-    def _run_sync(self, req: RunRequest) -> None:
-        started_at = time.time()
-        try:
-            # Read session id + set running under lock.
-            h = acquire_workspace_lock(req.workspace, timeout_s=10.0)
+        key = (req.user_id, req.conversation_id)
+        with self._lock:
+            self._pending.setdefault(key, []).append(req)
+            if key not in self._workers:
+                t = threading.Thread(target=self._drain, args=(key,), daemon=True)
+                self._workers[key] = t
+                t.start()
+
+    def budget_wait(self, user_id: str, agent_id: str | None) -> BudgetWait | None:
+        """How long a new run of this user/agent must wait for its budgets; None if it may start now."""
+
+        cfg = self.service.profile(agent_id)
+        waits: list[BudgetWait] = []
+        if self.user_budget.enabled:
+            u = self.ledger.usage(self.user_budget, user_id=user_id)
+            waits.append(BudgetWait("user", u.retry_after_s))
+        if cfg.budget.enabled:
+            u = self.ledger.usage(cfg.budget, agent_id=cfg.agent_id)
+            waits.append(BudgetWait("agent", u.retry_after_s))
+        longest = max(waits, key=lambda w: w.retry_after_s, default=None)
+        return longest if longest is not None and longest.retry_after_s > 0 else None
+
+    def is_active(self, run_id: str) -> bool:
+        with self._lock:
+            return run_id in self._requests
+
+    def active_runs(self, user_id: str) -> list[RunRequest]:
+        """Queued or running runs of one user, oldest first."""
+
+        with self._lock:
+            reqs = [r for r in self._requests.values() if r.user_id == user_id]
+        return sorted(reqs, key=lambda r: r.submitted_at)
+
+    def _notify(self, req: RunRequest, phase: str, state: str | None, **extra: Any) -> None:
+        if self._on_lifecycle is None:
+            return
+        self._on_lifecycle(
+            req.user_id,
+            {
+                "conversation_id": req.conversation_id,
+                "run_id": req.run_id,
+                "phase": phase,
+                "state": state,
+                **extra,
+            },
+        )
+
+    def cancel(self, run_id: str) -> bool:
+        """Cancel an active run; returns False if it is not (or no longer) active.
+
+        The run thread records the `cancelled` state once the executor has
+        killed claude and written its artifacts.
+        """
+
+        with self._lock:
+            ev = self._cancel_events.get(run_id)
+        if ev is None:
+            return False
+        ev.set()
+        cancel_run(repo_root=self._repo_root, run_id=run_id)
+        return True
+
+    def subscribe(self, run_id: str, *, auto_cancel: bool = False) -> None:
+        with self._lock:
+            self._subscribers[run_id] = self._subscribers.get(run_id, 0) + 1
+            if auto_cancel:
+                self._auto_cancel.add(run_id)
+
+    def unsubscribe(self, run_id: str) -> None:
+        """Drop an SSE subscriber; cancel the run if it was the last one and opted in."""
+
+        with self._lock:
+            n = self._subscribers.get(run_id, 0) - 1
+            if n > 0:
+                self._subscribers[run_id] = n
+                return
+            self._subscribers.pop(run_id, None)
+            if run_id not in self._auto_cancel:
+                return
+            self._auto_cancel.discard(run_id)
+        self.cancel(run_id)
+
+    def _drain(self, key: tuple[str, str]) -> None:
+        # A due rollover waits until no turn is queued, so that the
+        # summarization never delays a reply.
+        roll_over: RunRequest | None = None
+        while True:
+            with self._lock:
+                batch = self._pending.pop(key, [])
+                if not batch and roll_over is None:
+                    self._workers.pop(key, None)
+                    return
+            if not batch:
+                assert roll_over is not None
+                self._roll_over_idle(roll_over)
+                roll_over = None
+                continue
+            started_at = time.time()
             try:
-                session_id = load_session_id(req.workspace)
-                write_run_status(
-                    req.workspace,
-                    req.run_id,
-                    {
-                        "run_id": req.run_id,
-                        "state": "running",
-                        "started_at": started_at,
-                    },
-                )
+                self._wait_not_before(batch)
+                started_at = time.time()
+                self._run_guarded(batch, started_at)
+            except Exception as e:
+                self._fail(batch, started_at, e)
             finally:
-                h.release()
-
-            result = run_one_step(
-                repo_root=self._repo_root,
-                workspace=req.workspace,
-                instruction=req.content,
-                session_id=session_id,
-                run_id=req.run_id,
-                fork=False,
-                run_cfg=RunConfig(policy_preset="open", permission_mode="bypassPermissions"),
-                timeout_s=600.0,
-                lock_timeout_s=30.0,
-            )
+                for req in batch:
+                    self._finish(req)
+            roll_over = batch[0]
 
-            finished_at = time.time()
+    def _roll_over_idle(self, req: RunRequest) -> None:
+        try:
+            self._maybe_roll_over(req)
+        except Exception:
+            # The session stays as is; the next turn tries again.
+            metrics.ROLLOVER_FAILURES.inc()
+            _log.exception("session rollover failed for conversation %s", req.conversation_id)
 
-            state = "completed" if result.exit_code == 0 and not result.timed_out else "failed"
+    def _maybe_roll_over(self, req: RunRequest) -> None:
+        """Summarize and retire the conversation's claude session once it is too large."""
 
-            # Persist assistant message + session update under lock.
-            h2 = acquire_workspace_lock(req.workspace, timeout_s=10.0)
-            try:
-                # Even on failure, write something user-visible (stderr fallback is
-                # handled in the executor when no stream output is produced).
-                append_message(
-                    req.workspace,
-                    {
-                        "message_id": f"asst-{req.run_id}",
-                        "role": "assistant",
-                        "content": result.final_text,
-                        "created_at": finished_at,
-                        "run_id": req.run_id,
-                    },
-                )
+        cfg = self.service.profile(req.agent_id)
+        ws = req.workspace
+        session = load_session(ws)
+        session_id = session.get("claude_session_id")
+        if not session_id or not should_roll_over(cfg, session.get("session_tokens") or 0):
+            return
 
-                if state == "completed":
-                    save_session_id(req.workspace, result.session_id_after, last_run_id=req.run_id)
+        summary_run_id = new_run_id()
+        summary, res = summarize_session(
+            self.service.executor(), cfg=cfg, workspace=ws, session_id=session_id, run_id=summary_run_id
+        )
+        if res.usage is not None:
+            self.ledger.record(
+                user_id=req.user_id,
+                agent_id=cfg.agent_id,
+                tokens=res.usage.total_tokens,
+                cost_usd=res.usage.cost_usd,
+            )
+        if summary is None:
+            return
+        h = conversation_lock(ws, timeout_s=10.0)
+        try:
+            # A fork or another writer may have moved the session on meanwhile.
+            if load_session_id(ws) == session_id:
+                roll_over_session(ws, summary=summary, summary_run_id=summary_run_id)
+        finally:
+            h.release()
 
-                status_obj: dict[str, Any] = {
-                    "run_id": req.run_id,
-                    "state": state,
-                    "started_at": started_at,
-                    "finished_at": finished_at,
-                    "exit_code": result.exit_code,
-                    "timed_out": result.timed_out,
-                    "session_id_after": result.session_id_after,
-                }
-                if state == "failed":
-                    status_obj["error"] = "claude CLI exited non-zero"
+    def _wait_not_before(self, batch: list[RunRequest]) -> None:
+        """Hold a batch until its budgets admit it (a cancel of all its runs ends the wait).
 
-                write_run_status(req.workspace, req.run_id, status_obj)
-            finally:
-                h2.release()
+        The delay given at submission only counts the runs finished by then;
+        other conversations' runs that finished while this batch waited or sat
+        in the queue count too, so the budgets are checked again right before
+        the start and may push it back.
+        """
 
-        except Exception as e:
-            finished_at = time.time()
-            tb = traceback.format_exc()
+        not_before = max((r.not_before or 0.0 for r in batch), default=0.0)
+        with self._lock:
+            events = [self._cancel_events[r.run_id] for r in batch]
+        while not all(ev.is_set() for ev in events):
+            if (remaining := not_before - time.time()) > 0:
+                time.sleep(min(0.25, remaining))
+                continue
+            wait = self.budget_wait(batch[0].user_id, batch[0].agent_id)
+            if wait is None:
+                return
+            not_before = time.time() + wait.retry_after_s
+            for r in batch:
+                self._notify(r, "queued", "queued", not_before=not_before)
 
-            h3 = acquire_workspace_lock(req.workspace, timeout_s=10.0)
-            try:
+    def _fail(self, batch: list[RunRequest], started_at: float, e: Exception) -> None:
+        finished_at = time.time()
+        tb = traceback.format_exc()
+        with self._lock:
+            # Requests already finished (e.g. coalesced) keep their status.
+            unfinished = [r for r in batch if r.run_id in self._requests]
+        if not unfinished:
+            return
+
+        h = conversation_lock(batch[0].workspace, timeout_s=10.0)
+        try:
+            for r in unfinished:
                 write_run_status(
-                    req.workspace,
-                    req.run_id,
+                    r.workspace,
+                    r.run_id,
                     {
-                        "run_id": req.run_id,
+                        "run_id": r.run_id,
                         "state": "failed",
                         "started_at": started_at,
                         "finished_at": finished_at,
@@ -141,8 +317,166 @@ class RunManager:
                         "traceback": tb,
                     },
                 )
-            finally:
-                h3.release()
+        finally:
+            h.release()
+
+    def _finish(self, req: RunRequest) -> None:
+        with self._lock:
+            if self._requests.pop(req.run_id, None) is None:
+                return
+            self._cancel_events.pop(req.run_id, None)
+            self._auto_cancel.discard(req.run_id)
+        status = self.status(req.workspace, req.run_id)
+        extra = {"merged_into": status["merged_into"]} if "merged_into" in status else {}
+        self._notify(req, "finished", status.get("state"), **extra)
+
+    def _run_guarded(self, batch: list[RunRequest], started_at: float) -> None:
+        """Run a batch of queued turns of one conversation as a single claude run.
+
+        The first live request becomes the primary run; the others are marked
+        `coalesced` with `merged_into` pointing at it, and their messages are
+        appended to its instruction.
+        """
+
+        ws = batch[0].workspace
+        with self._lock:
+            cancel_events = {r.run_id: self._cancel_events[r.run_id] for r in batch}
+
+        # Read session id + set statuses under lock.
+        h = conversation_lock(ws, timeout_s=10.0)
+        try:
+            live: list[RunRequest] = []
+            for r in batch:
+                if cancel_events[r.run_id].is_set():
+                    write_run_status(
+                        ws,
+                        r.run_id,
+                        {
+                            "run_id": r.run_id,
+                            "state": "cancelled",
+                            "started_at": started_at,
+                            "finished_at": time.time(),
+                        },
+                    )
+                else:
+                    live.append(r)
+            if not live:
+                return
+            req, merged = live[0], live[1:]
+            session_id = load_session_id(ws)
+            fork = session_id is not None and is_fork_pending(ws)
+            # The first turn after a rollover carries the retired session's summary.
+            seed = load_session(ws).get("seed_summary") if session_id is None else None
+            for r in live:
+                metrics.QUEUE_WAIT.observe(time.monotonic() - r.submitted_at)
+            for r in merged:
+                write_run_status(
+                    ws,
+                    r.run_id,
+                    {
+                        "run_id": r.run_id,
+                        "state": "coalesced",
+                        "merged_into": req.run_id,
+                        "finished_at": time.time(),
+                    },
+                )
+            write_run_status(
+                ws,
+                req.run_id,
+                {
+                    "run_id": req.run_id,
+                    "state": "running",
+                    "started_at": started_at,
+                    **({"merged_runs": [r.run_id for r in merged]} if merged else {}),
+                },
+            )
+        finally:
+            h.release()
+        for r in merged:
+            self._finish(r)
+        self._notify(req, "started", "running")
+
+        goal = "\n\n".join(r.content for r in live)
+        final = self.service.run(
+            workspace=ws,
+            goal=seeded_goal(seed, goal) if seed else goal,
+            agent_id=req.agent_id,
+            session_id=session_id,
+            run_id=req.run_id,
+            fork=fork,
+            cancel_event=cancel_events[req.run_id],
+        )
+
+        finished_at = time.time()
+
+        usage = final.get("usage")
+        if usage:
+            self.ledger.record(
+                user_id=req.user_id,
+                agent_id=self.service.profile(req.agent_id).agent_id,
+                tokens=usage["total_tokens"],
+                cost_usd=usage["cost_usd"],
+            )
+
+        if final["cancelled"]:
+            state = "cancelled"
+        elif final["exit_code"] == 0 and not final["timed_out"]:
+            state = "completed"
+        else:
+            state = "failed"
+
+        # Persist assistant message + session update under lock.
+        h2 = conversation_lock(ws, timeout_s=10.0)
+        try:
+            # Even on failure, write something user-visible (stderr fallback is
+            # handled in the executor when no stream output is produced).
+            # A cancelled run keeps whatever partial text it streamed.
+            if state != "cancelled" or final["final_text"].strip():
+                msg: dict[str, Any] = {
+                    "message_id": f"asst-{req.run_id}",
+                    "role": "assistant",
+                    "content": final["final_text"],
+                    "created_at": finished_at,
+                    "run_id": req.run_id,
+                }
+                if final["result_chars"] > len(final["final_text"]):
+                    # Large results are not copied into messages.ndjson: the
+                    # content is a preview, the full text is served from
+                    # GET .../runs/{run_id}/result.
+                    msg["truncated"] = True
+                    msg["content_chars"] = final["result_chars"]
+                reply_to = [r.message_id for r in live if r.message_id]
+                if reply_to:
+                    msg["in_reply_to"] = reply_to
+                append_message(ws, msg)
+
+            if state == "completed":
+                save_session_id(
+                    ws,
+                    final["claude_session_id"],
+                    last_run_id=req.run_id,
+                    context_tokens=context_tokens(usage),
+                )
+
+            status_obj: dict[str, Any] = {
+                "run_id": req.run_id,
+                "state": state,
+                "started_at": started_at,
+                "finished_at": finished_at,
+                "exit_code": final["exit_code"],
+                "timed_out": final["timed_out"],
+                "cancelled": final["cancelled"],
+                "session_id_after": final["claude_session_id"],
+                "usage": usage,
+            }
+            if merged:
+                status_obj["merged_runs"] = [r.run_id for r in merged]
+            if state == "failed":
+                status_obj["error"] = "claude CLI exited non-zero"
+
+            write_run_status(ws, req.run_id, status_obj)
+        finally:
+            h2.release()
 
     def status(self, workspace: Path, run_id: str) -> dict[str, Any]:
         return read_run_status(workspace, run_id)
@@ -2,24 +2,33 @@ from __future__ import annotations
 
 import asyncio
 import json
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import AsyncIterator
+from typing import Any, AsyncIterator
 
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 
 from .auth import get_user_id
 from .bootstrap import ensure_cc3_importable
+from .event_hub import Queued, RunFeed, Subscriber, get_event_hub, new_queue
+from .routes import get_run_manager
 from .storage import conversation_root, run_dir
 
 repo_root = ensure_cc3_importable()
 
+from cc3 import metrics  # noqa: E402
+from cc3.events import normalize_event  # noqa: E402
+
 router = APIRouter()
 
 
-def _format_sse(data: str, *, event: str | None = None) -> bytes:
+def _format_sse(data: str, *, event: str | None = None, event_id: str | None = None) -> bytes:
     # Basic SSE framing.
     out = []
+    if event_id is not None:
+        out.append(f"id: {event_id}\n")
     if event:
         out.append(f"event: {event}\n")
     for line in data.splitlines() or [""]:
@@ -28,46 +37,295 @@ def _format_sse(data: str, *, event: str | None = None) -> bytes:
     return "".join(out).encode("utf-8")
 
 
-async def _tail_events_ndjson(events_path: Path, status_path: Path) -> AsyncIterator[bytes]:
+@dataclass(frozen=True)
+class StreamOptions:
+    """Server-side shaping of a run's event stream."""
+
+    # Only forward events whose normalized kind is listed (None = all).
+    kinds: frozenset[str] | None = None
+    # Send normalized fields instead of the raw claude JSON.
+    compact: bool = False
+    # Merge compact deltas arriving within this window into one frame.
+    coalesce_ms: int = 0
+
+    @property
+    def needs_parse(self) -> bool:
+        return self.compact or self.kinds is not None
+
+
+RAW_STREAM = StreamOptions()
+
+
+def _project(line: str) -> tuple[str, dict[str, Any] | None]:
+    """Return (normalized kind, compact payload) for one raw stream-json line."""
+
+    try:
+        obj = json.loads(line)
+    except json.JSONDecodeError:
+        obj = None
+    if not isinstance(obj, dict):
+        return "parse_error", {"kind": "parse_error"}
+    norm = normalize_event(obj)
+    payload = {
+        "kind": norm.kind,
+        "session_id": norm.session_id,
+        "text_delta": norm.text_delta,
+        "result_text": norm.result_text,
+        "api_key_source": norm.api_key_source,
+    }
+    return norm.kind, {k: v for k, v in payload.items() if v is not None}
+
+
+class _DeltaCoalescer:
+    """Buffers compact delta text until the coalescing window closes."""
+
+    def __init__(self, window_ms: int):
+        self._window_s = window_ms / 1000
+        self._parts: list[str] = []
+        self._end = 0
+        self._opened_at = 0.0
+
+    def add(self, text: str, end: int) -> None:
+        if not self._parts:
+            self._opened_at = time.monotonic()
+        self._parts.append(text)
+        self._end = end
+
+    def due_in(self) -> float | None:
+        if not self._parts:
+            return None
+        return max(0.0, self._opened_at + self._window_s - time.monotonic())
+
+    def flush(self) -> tuple[str, int] | None:
+        if not self._parts:
+            return None
+        data = json.dumps({"kind": "delta", "text_delta": "".join(self._parts)}, ensure_ascii=True)
+        self._parts = []
+        return data, self._end
+
+
+class _RunShaper:
+    """Applies `StreamOptions` to one run's lines; yields (data, resume offset)."""
+
+    def __init__(self, options: StreamOptions, *, since: int = 0):
+        self._options = options
+        self._since = since
+        self._coalescer = _DeltaCoalescer(options.coalesce_ms) if options.coalesce_ms > 0 else None
+
+    def event(self, end: int, line: str) -> list[tuple[str, int]]:
+        # A shared feed may still be behind a reconnecting client's offset.
+        if end <= self._since:
+            return []
+        if not self._options.needs_parse:
+            return [(line, end)]
+
+        kind, payload = _project(line)
+        if self._options.kinds is not None and kind not in self._options.kinds:
+            return []
+        if self._coalescer is not None and payload and payload.get("text_delta"):
+            self._coalescer.add(payload["text_delta"], end)
+            return []
+        out = [f] if (f := self.flush()) else []
+        out.append((json.dumps(payload, ensure_ascii=True) if self._options.compact else line, end))
+        return out
+
+    def due_in(self) -> float | None:
+        return None if self._coalescer is None else self._coalescer.due_in()
+
+    def flush(self) -> tuple[str, int] | None:
+        return None if self._coalescer is None else self._coalescer.flush()
+
+
+async def _next_item(queue: asyncio.Queue[Queued], timeout: float | None) -> Queued | None:
+    """Next hub item, or None when `timeout` (a coalescing deadline) passes first."""
+
+    if timeout is None:
+        return await queue.get()
+    try:
+        return await asyncio.wait_for(queue.get(), timeout)
+    except TimeoutError:
+        return None
+
+
+async def _tail_events(
+    rd: Path,
+    *,
+    offset: int = 0,
+    options: StreamOptions = RAW_STREAM,
+) -> AsyncIterator[bytes]:
+    """Stream a run's events as SSE starting at sequence number `offset`.
+
+    Each frame's `id` is the sequence number just past its (last) event, so a
+    client that reconnects with `Last-Event-ID` (or `?since=`) resumes exactly
+    there. The event store is polled once per run by the shared `RunFeed`,
+    however many clients are watching.
+    """
+
     # Initial comment to establish connection.
     yield b": connected\n\n"
 
-    offset = 0
-    while True:
-        if events_path.exists():
-            with events_path.open("r", encoding="utf-8", errors="replace") as f:
-                f.seek(offset)
-                # Avoid mixing file iteration (`for line in f`) with tell(); on
-                # some platforms/Python versions that raises:
-                # "OSError: telling position disabled by next() call".
-                while True:
-                    line = f.readline()
-                    if not line:
-                        break
-                    offset = f.tell()
-                    line = line.rstrip("\n")
-                    if not line:
-                        continue
-                    yield _format_sse(line)
-
-        status = {}
-        if status_path.exists():
-            try:
-                status = json.loads(status_path.read_text(encoding="utf-8"))
-            except json.JSONDecodeError:
-                status = {}
-
-        state = status.get("state")
-        if state in {"completed", "failed"}:
-            # Send final status event, then exit.
-            yield _format_sse(json.dumps(status, ensure_ascii=True), event="status")
+    sub = Subscriber()
+    feed = get_event_hub().subscribe_run(rd, sub, since=offset)
+    shaper = _RunShaper(options, since=offset)
+    try:
+        while True:
+            item = await _next_item(sub.queue, shaper.due_in())
+            if item is None:
+                if flushed := shaper.flush():
+                    yield _format_sse(flushed[0], event_id=str(flushed[1]))
+                continue
+
+            _, kind, end, payload = item
+            if kind == "event":
+                for data, data_end in shaper.event(end, payload):
+                    yield _format_sse(data, event_id=str(data_end))
+                continue
+
+            if flushed := shaper.flush():
+                yield _format_sse(flushed[0], event_id=str(flushed[1]))
+            if kind == "status":
+                # Send final status event, then exit.
+                yield _format_sse(json.dumps(payload, ensure_ascii=True), event="status", event_id=str(end))
+            # "overflow": close; the client reconnects from its last id.
             break
+    finally:
+        feed.detach(sub)
+
+
+def _mux_frame(conversation_id: str, run_id: str, end: int, data: str) -> bytes:
+    # `data` is already JSON (raw claude line or compact payload); splice it in
+    # rather than re-parsing. Undecodable raw lines are sent as a string.
+    if not (data.startswith("{") and data.endswith("}")):
+        data = json.dumps(data, ensure_ascii=True)
+    head = json.dumps({"conversation_id": conversation_id, "run_id": run_id, "offset": end}, ensure_ascii=True)
+    return _format_sse(f'{head[:-1]}, "event": {data}}}', event="run_event")
+
 
-        await asyncio.sleep(0.25)
+@dataclass
+class _MuxRun:
+    conversation_id: str
+    feed: RunFeed
+    sub: Subscriber
+    shaper: _RunShaper
+
+
+async def _user_stream(user_id: str, options: StreamOptions) -> AsyncIterator[bytes]:
+    """Multiplex every active run of `user_id` plus run lifecycle notices.
+
+    Frames: `run_event` (one run event tagged with conversation_id, run_id and
+    its resume offset), `run_status` (final status of a run; no more run_event
+    frames follow for it) and `lifecycle` (queued / started / finished). Runs
+    already active on connect are replayed from their first event; use the
+    per-run endpoint with `since=<offset>` to resume a single run.
+    """
+
+    yield b": connected\n\n"
+
+    hub = get_event_hub()
+    queue = new_queue()
+    lifecycle = Subscriber(queue=queue)
+    # Subscribe before listing active runs so none can slip through between.
+    hub.subscribe_user(user_id, lifecycle)
+    runs: dict[str, _MuxRun] = {}
+
+    def attach(conversation_id: str, run_id: str) -> None:
+        if run_id in runs:
+            return
+        sub = Subscriber(queue=queue, key=run_id)
+        rd = run_dir(conversation_root(repo_root, user_id, conversation_id), run_id)
+        feed = hub.subscribe_run(rd, sub)
+        runs[run_id] = _MuxRun(conversation_id, feed, sub, _RunShaper(options))
+
+    def flush(run_id: str, run: _MuxRun) -> bytes | None:
+        if flushed := run.shaper.flush():
+            return _mux_frame(run.conversation_id, run_id, flushed[1], flushed[0])
+        return None
+
+    try:
+        for req in get_run_manager().active_runs(user_id):
+            attach(req.conversation_id, req.run_id)
+
+        while True:
+            dues = [d for r in runs.values() if (d := r.shaper.due_in()) is not None]
+            item = await _next_item(queue, min(dues) if dues else None)
+            if item is None:
+                for run_id, run in list(runs.items()):
+                    if (d := run.shaper.due_in()) is not None and d <= 0 and (frame := flush(run_id, run)):
+                        yield frame
+                continue
+
+            key, kind, end, payload = item
+            if kind == "lifecycle":
+                if payload.get("phase") in ("queued", "started"):
+                    attach(payload["conversation_id"], payload["run_id"])
+                yield _format_sse(json.dumps(payload, ensure_ascii=True), event="lifecycle")
+                continue
+            if kind == "overflow":
+                break
+
+            run = runs.get(key)
+            if run is None:
+                continue
+            if kind == "event":
+                for data, data_end in run.shaper.event(end, payload):
+                    yield _mux_frame(run.conversation_id, key, data_end, data)
+            elif kind == "status":
+                if frame := flush(key, run):
+                    yield frame
+                status = {"conversation_id": run.conversation_id, "run_id": key, "offset": end, "status": payload}
+                yield _format_sse(json.dumps(status, ensure_ascii=True), event="run_status")
+                del runs[key]
+    finally:
+        hub.unsubscribe_user(user_id, lifecycle)
+        for run in runs.values():
+            run.feed.detach(run.sub)
+
+
+def _stream_options(kinds: str | None, view: str, coalesce_ms: int) -> StreamOptions:
+    if view not in ("raw", "compact"):
+        raise HTTPException(status_code=400, detail="view must be raw or compact")
+    if coalesce_ms < 0 or coalesce_ms > 10_000:
+        raise HTTPException(status_code=400, detail="coalesce_ms must be within 0..10000")
+    if coalesce_ms and view != "compact":
+        raise HTTPException(status_code=400, detail="coalesce_ms requires view=compact")
+    kind_set = frozenset(k.strip() for k in kinds.split(",") if k.strip()) if kinds else None
+    return StreamOptions(kinds=kind_set, compact=(view == "compact"), coalesce_ms=coalesce_ms)
+
+
+def _resume_offset(request: Request, since: int | None) -> int:
+    if since is not None:
+        return max(since, 0)
+    last_id = request.headers.get("Last-Event-ID")
+    if last_id and last_id.isdigit():
+        return int(last_id)
+    return 0
+
+
+async def _tracked(stream: AsyncIterator[bytes], run_id: str, *, auto_cancel: bool) -> AsyncIterator[bytes]:
+    rm = get_run_manager()
+    rm.subscribe(run_id, auto_cancel=auto_cancel)
+    metrics.SSE_STREAMS.inc()
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        metrics.SSE_STREAMS.dec()
+        # Runs on normal completion and on client disconnect alike; the run
+        # manager only cancels runs that are still active.
+        rm.unsubscribe(run_id)
 
 
 @router.get("/v1/conversations/{conversation_id}/runs/{run_id}/events.sse")
-async def run_events(request: Request, conversation_id: str, run_id: str):
+async def run_events(
+    request: Request,
+    conversation_id: str,
+    run_id: str,
+    auto_cancel: bool = False,
+    since: int | None = None,
+    kinds: str | None = None,
+    view: str = "raw",
+    coalesce_ms: int = 0,
+):
     # EventSource cannot set headers; allow query param for SSE.
     user_id = get_user_id(request, allow_query_param=True)
 
@@ -79,11 +337,51 @@ async def run_events(request: Request, conversation_id: str, run_id: str):
     if not rd.exists():
         raise HTTPException(status_code=404, detail="run not found")
 
-    events_path = rd / "events.ndjson"
-    status_path = rd / "status.json"
+    # Reconnects resume from `Last-Event-ID` (sent automatically by
+    # EventSource) or an explicit `?since=<event offset>`.
+    offset = _resume_offset(request, since)
+
+    # `kinds=delta,result` filters by normalized kind, `view=compact` sends
+    # normalized fields instead of raw claude JSON, and `coalesce_ms=N`
+    # merges compact deltas arriving within N ms into one frame.
+    options = _stream_options(kinds, view, coalesce_ms)
+
+    stream = _tail_events(rd, offset=offset, options=options)
+
+    # `auto_cancel=true`: cancel the run once its last subscriber disconnects
+    # (e.g. the user navigated away) so it stops holding a claude slot.
+    return StreamingResponse(
+        _tracked(stream, run_id, auto_cancel=auto_cancel),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@router.get("/v1/events.sse")
+async def user_events(
+    request: Request,
+    kinds: str | None = None,
+    view: str = "raw",
+    coalesce_ms: int = 0,
+):
+    """All of the user's runs on one connection (see `_user_stream`)."""
+
+    user_id = get_user_id(request, allow_query_param=True)
+    options = _stream_options(kinds, view, coalesce_ms)
+
+    async def counted() -> AsyncIterator[bytes]:
+        metrics.SSE_STREAMS.inc()
+        try:
+            async for chunk in _user_stream(user_id, options):
+                yield chunk
+        finally:
+            metrics.SSE_STREAMS.dec()
 
     return StreamingResponse(
-        _tail_events_ndjson(events_path, status_path),
+        counted(),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import os
 import time
 from dataclasses import dataclass
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 from typing import Any
 from uuid import uuid4
 
@@ -11,7 +13,9 @@ from .bootstrap import ensure_cc3_importable
 
 _repo_root = ensure_cc3_importable()
 
-from cc3.locking import acquire_workspace_lock  # noqa: E402
+from cc3.blobstore import BlobStore  # noqa: E402
+from cc3.fsclone import CloneStats, clone_claude_session, clone_file, clone_tree  # noqa: E402
+from cc3.locking import LockHandle, acquire_workspace_lock  # noqa: E402
 
 
 @dataclass(frozen=True)
@@ -37,6 +41,27 @@ def conversation_root(repo_root: Path, user_id: str, conversation_id: str) -> Pa
     return conversations_root(repo_root, user_id) / conversation_id
 
 
+def blob_store(repo_root: Path, user_id: str) -> BlobStore:
+    """The user's content-addressed store; conversation kb/ files are private copies of its blobs."""
+
+    return BlobStore(user_root(repo_root, user_id) / "blobs")
+
+
+def kb_refs_dir(repo_root: Path, user_id: str, conversation_id: str) -> Path:
+    """Blob references of a conversation's kb/ files, mirroring kb/ (outside the workspace)."""
+
+    return blob_store(repo_root, user_id).root / "refs" / conversation_id
+
+
+def kb_file(ws: Path, rel: str) -> Path | None:
+    """`ws/kb/<rel>`, or None if `rel` is not a plain relative path."""
+
+    parts = PurePosixPath(rel).parts
+    if not parts or rel.startswith("/") or any(p.startswith(".") or len(p) > 255 or "\0" in p for p in parts):
+        return None
+    return ws.joinpath("kb", *parts)
+
+
 def ensure_conversation_workspace(repo_root: Path, user_id: str, conversation_id: str) -> ConversationRef:
     ws = conversation_root(repo_root, user_id, conversation_id)
     (ws / "runs").mkdir(parents=True, exist_ok=True)
@@ -74,6 +99,16 @@ def _read_json(path: Path) -> dict[str, Any]:
     return data if isinstance(data, dict) else {}
 
 
+def conversation_lock(ws: Path, *, timeout_s: float) -> LockHandle:
+    """Guards conversation.json, session.json, messages and run statuses.
+
+    Separate from the workspace lock, which claude holds for a whole run, so
+    posting a message never waits for the active run.
+    """
+
+    return acquire_workspace_lock(ws, timeout_s=timeout_s, name="conversation")
+
+
 def conversation_meta_path(ws: Path) -> Path:
     return ws / "conversation.json"
 
@@ -94,6 +129,29 @@ def run_status_path(ws: Path, run_id: str) -> Path:
     return run_dir(ws, run_id) / "status.json"
 
 
+def _stat_tag(st: os.stat_result) -> str:
+    return f"{st.st_size:x}-{st.st_mtime_ns:x}"
+
+
+def conversations_etag(repo_root: Path, user_id: str) -> str:
+    """Validator of `list_conversations`: changes whenever a conversation is added or its meta rewritten.
+
+    Only stats files, so a matching If-None-Match costs no reads or parsing.
+    """
+
+    root = conversations_root(repo_root, user_id)
+    try:
+        parts = [_stat_tag(root.stat())]
+    except FileNotFoundError:
+        return '"c-empty"'
+    for d in sorted(root.iterdir(), key=lambda p: p.name):
+        try:
+            parts.append(f"{d.name}:{_stat_tag(conversation_meta_path(d).stat())}")
+        except (FileNotFoundError, NotADirectoryError):
+            parts.append(d.name)
+    return '"c-' + hashlib.sha256("|".join(parts).encode()).hexdigest()[:32] + '"'
+
+
 def list_conversations(repo_root: Path, user_id: str) -> list[dict[str, Any]]:
     root = conversations_root(repo_root, user_id)
     if not root.exists():
@@ -111,20 +169,25 @@ def list_conversations(repo_root: Path, user_id: str) -> list[dict[str, Any]]:
     return out
 
 
-def create_conversation(repo_root: Path, user_id: str, title: str | None) -> dict[str, Any]:
+def create_conversation(
+    repo_root: Path, user_id: str, title: str | None, *, agent_id: str | None = None
+) -> dict[str, Any]:
     cid = new_conversation_id()
     ref = ensure_conversation_workspace(repo_root, user_id, cid)
 
-    meta = {
+    meta: dict[str, Any] = {
         "user_id": user_id,
         "conversation_id": cid,
         "title": title or "New conversation",
         "created_at": time.time(),
         "updated_at": time.time(),
     }
+    if agent_id:
+        # Agent profile under agents/<id>; None uses the chat default profile.
+        meta["agent_id"] = agent_id
 
     # Initialize files under lock.
-    h = acquire_workspace_lock(ref.workspace, timeout_s=5.0)
+    h = conversation_lock(ref.workspace, timeout_s=5.0)
     try:
         _atomic_write_json(conversation_meta_path(ref.workspace), meta)
         _atomic_write_json(session_path(ref.workspace), {"claude_session_id": None, "updated_at": time.time()})
@@ -135,12 +198,105 @@ def create_conversation(repo_root: Path, user_id: str, title: str | None) -> dic
     return meta
 
 
-def load_messages(ws: Path, *, limit: int = 200) -> list[dict[str, Any]]:
-    p = messages_path(ws)
-    if not p.exists():
-        return []
+# Per-conversation bookkeeping, rewritten (not cloned) for a fork.
+_FORK_EXCLUDE = frozenset({"runs", ".locks", "conversation.json", "session.json", "messages.ndjson"})
+
+
+def fork_conversation(
+    repo_root: Path, user_id: str, parent_id: str, *, title: str | None = None
+) -> tuple[dict[str, Any], CloneStats]:
+    """Create a conversation whose workspace is a copy-on-write clone of the parent's.
+
+    Files, kb/ included, are reflinked where the filesystem supports it and
+    copied elsewhere (see `cc3.fsclone`), so either side may edit them in
+    place. The child's first run resumes the parent's claude session with
+    `--fork-session`.
+    """
+
+    parent = conversation_root(repo_root, user_id, parent_id)
+    cid = new_conversation_id()
+    ref = ensure_conversation_workspace(repo_root, user_id, cid)
+
+    h = conversation_lock(parent, timeout_s=10.0)
+    try:
+        parent_meta = _read_json(conversation_meta_path(parent))
+        parent_session = _read_json(session_path(parent))
+        stats = clone_tree(parent, ref.workspace, exclude=_FORK_EXCLUDE)
+        blob_store(repo_root, user_id).link_refs(
+            kb_refs_dir(repo_root, user_id, parent_id), kb_refs_dir(repo_root, user_id, cid)
+        )
+        if messages_path(parent).exists():
+            clone_file(messages_path(parent), messages_path(ref.workspace))
+    finally:
+        h.release()
+
+    session_id = parent_session.get("claude_session_id")
+    if not isinstance(session_id, str) or not session_id:
+        session_id = None
+    elif not clone_claude_session(session_id, src_cwd=parent, dst_cwd=ref.workspace):
+        # claude resumes only sessions recorded for its cwd; without the
+        # transcript the fork starts a fresh session instead of failing.
+        session_id = None
+
+    now = time.time()
+    meta: dict[str, Any] = {
+        "user_id": user_id,
+        "conversation_id": cid,
+        "title": title or f"{parent_meta.get('title') or parent_id} (fork)",
+        "created_at": now,
+        "updated_at": now,
+        "forked_from": {
+            "conversation_id": parent_id,
+            "run_id": parent_session.get("last_run_id"),
+            "claude_session_id": session_id,
+        },
+    }
+    if parent_meta.get("agent_id"):
+        meta["agent_id"] = parent_meta["agent_id"]
+
+    h = conversation_lock(ref.workspace, timeout_s=5.0)
+    try:
+        _atomic_write_json(conversation_meta_path(ref.workspace), meta)
+        session: dict[str, Any] = {
+            "claude_session_id": session_id,
+            "fork_pending": session_id is not None,
+            "updated_at": now,
+        }
+        if session_id is not None:
+            session["session_tokens"] = parent_session.get("session_tokens") or 0
+        elif parent_session.get("seed_summary") and parent_session.get("claude_session_id") is None:
+            # The parent is between a rollover and its next run.
+            session["seed_summary"] = parent_session["seed_summary"]
+        if parent_session.get("lineage"):
+            session["lineage"] = parent_session["lineage"]
+        _atomic_write_json(session_path(ref.workspace), session)
+        messages_path(ref.workspace).touch(exist_ok=True)
+    finally:
+        h.release()
+
+    return meta, stats
+
+
+def load_conversation_meta(ws: Path) -> dict[str, Any]:
+    return _read_json(conversation_meta_path(ws))
+
+
+def messages_etag(ws: Path, *variant: object) -> str:
+    """Validator of the message history (messages.ndjson only ever grows).
+
+    `variant` distinguishes representations of the same history, e.g. pages.
+    """
+
+    try:
+        tag = _stat_tag(messages_path(ws).stat())
+    except FileNotFoundError:
+        tag = "empty"
+    return '"' + "-".join(["m", tag, *(str(v) for v in variant)]) + '"'
+
+
+def _parse_messages(data: bytes) -> list[dict[str, Any]]:
     msgs: list[dict[str, Any]] = []
-    for line in p.read_text(encoding="utf-8").splitlines():
+    for line in data.decode("utf-8").splitlines():
         if not line.strip():
             continue
         try:
@@ -149,7 +305,43 @@ def load_messages(ws: Path, *, limit: int = 200) -> list[dict[str, Any]]:
             continue
         if isinstance(obj, dict):
             msgs.append(obj)
-    return msgs[-limit:]
+    return msgs
+
+
+def load_messages(ws: Path, *, limit: int = 200) -> list[dict[str, Any]]:
+    return load_messages_page(ws, limit=limit)[0]
+
+
+def load_messages_page(ws: Path, *, limit: int = 200, after: int | None = None) -> tuple[list[dict[str, Any]], int]:
+    """Messages and the cursor to pass as `after` to fetch only later ones.
+
+    The cursor is a byte offset into messages.ndjson (append-only), so an
+    incremental fetch reads just the bytes appended since. Without `after`,
+    returns the last `limit` messages; with it, the first `limit` messages
+    past the cursor (page forward until nothing is returned).
+    """
+
+    p = messages_path(ws)
+    if not p.exists():
+        return [], 0
+    with p.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        start = min(max(after or 0, 0), size)
+        f.seek(start)
+        data = f.read(size - start)
+    # A line still being appended is left for the next fetch.
+    data = data[: data.rfind(b"\n") + 1]
+    if after is None:
+        return _parse_messages(data)[-limit:], start + len(data)
+
+    end = start
+    msgs: list[dict[str, Any]] = []
+    for line in data.splitlines(keepends=True):
+        if len(msgs) >= limit:
+            break
+        end += len(line)
+        msgs.extend(_parse_messages(line))
+    return msgs, end
 
 
 def append_message(ws: Path, msg: dict[str, Any]) -> None:
@@ -166,13 +358,63 @@ def load_session_id(ws: Path) -> str | None:
     return sid if isinstance(sid, str) and sid else None
 
 
-def save_session_id(ws: Path, session_id: str | None, *, last_run_id: str | None = None) -> None:
-    obj = {
+def is_fork_pending(ws: Path) -> bool:
+    """True until the first run of a forked conversation has completed."""
+
+    return bool(_read_json(session_path(ws)).get("fork_pending"))
+
+
+def load_session(ws: Path) -> dict[str, Any]:
+    """session.json: claude_session_id, session_tokens, lineage, seed_summary, ..."""
+
+    return _read_json(session_path(ws))
+
+
+def save_session_id(
+    ws: Path, session_id: str | None, *, last_run_id: str | None = None, context_tokens: int = 0
+) -> None:
+    """Record a completed run; `session_tokens` becomes its context size (see cc3.rollover).
+
+    Clears `fork_pending` and a rollover's `seed_summary`: the run consumed them.
+    """
+
+    prev = load_session(ws)
+    obj: dict[str, Any] = {
         "claude_session_id": session_id,
+        "session_tokens": context_tokens,
         "updated_at": time.time(),
     }
     if last_run_id:
         obj["last_run_id"] = last_run_id
+    if prev.get("lineage"):
+        obj["lineage"] = prev["lineage"]
+    _atomic_write_json(session_path(ws), obj)
+
+
+def roll_over_session(ws: Path, *, summary: str, summary_run_id: str) -> None:
+    """Retire the current claude session; the next run starts fresh from `summary`."""
+
+    prev = load_session(ws)
+    now = time.time()
+    lineage = [
+        *(prev.get("lineage") or []),
+        {
+            "claude_session_id": prev.get("claude_session_id"),
+            "tokens": prev.get("session_tokens") or 0,
+            "last_run_id": prev.get("last_run_id"),
+            "summary_run_id": summary_run_id,
+            "rolled_over_at": now,
+        },
+    ]
+    obj = {
+        "claude_session_id": None,
+        "session_tokens": 0,
+        "seed_summary": summary,
+        "lineage": lineage,
+        "updated_at": now,
+    }
+    if prev.get("last_run_id"):
+        obj["last_run_id"] = prev["last_run_id"]
     _atomic_write_json(session_path(ws), obj)
 
 
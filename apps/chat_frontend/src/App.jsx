@@ -1,6 +1,9 @@
 import React, { useEffect, useMemo, useRef, useState } from 'react'
 import {
+  cancelRun,
   createConversation,
+  forkConversation,
+  getRunResult,
   getUserId,
   listConversations,
   listMessages,
@@ -11,6 +14,7 @@ import {
 
 function extractDelta(obj) {
   if (!obj || typeof obj !== 'object') return null
+  if (typeof obj.text_delta === 'string' && obj.text_delta) return obj.text_delta
   const d = obj.delta
   if (typeof d === 'string' && d) return d
   if (d && typeof d === 'object' && typeof d.text === 'string' && d.text) return d.text
@@ -34,6 +38,9 @@ export default function App() {
   const [streamText, setStreamText] = useState('')
   const [statusText, setStatusText] = useState('')
   const esRef = useRef(null)
+  // Message cursor of the conversation whose messages are loaded.
+  const cursorRef = useRef({ conversationId: '', cursor: null })
+  const [activeRunId, setActiveRunId] = useState('')
 
   const canUse = userId.trim().length > 0
 
@@ -48,7 +55,25 @@ export default function App() {
 
   async function refreshMessages(conversationId) {
     if (!canUse || !conversationId) return
-    const list = await listMessages(userId, conversationId)
+    const prev = cursorRef.current
+    if (prev.conversationId === conversationId && prev.cursor !== null) {
+      // Same conversation: only fetch what was appended since.
+      const { messages: added, cursor } = await listMessages(userId, conversationId, prev.cursor)
+      const cur = cursorRef.current
+      if (cur.conversationId !== conversationId) return // switched conversations meanwhile
+      // Refreshes can overlap: never move the cursor back, and keep one copy of a message.
+      if (Number(cursor) > Number(cur.cursor)) cursorRef.current = { conversationId, cursor }
+      if (added.length) {
+        setMessages((list) => {
+          const seen = new Set(list.map((m) => m.message_id))
+          const fresh = added.filter((m) => !seen.has(m.message_id))
+          return fresh.length ? [...list, ...fresh] : list
+        })
+      }
+      return
+    }
+    const { messages: list, cursor } = await listMessages(userId, conversationId)
+    cursorRef.current = { conversationId, cursor }
     setMessages(list)
   }
 
@@ -68,6 +93,13 @@ export default function App() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [activeConversationId])
 
+  async function onLoadFullResult(m) {
+    const text = await getRunResult(userId, activeConversationId, m.run_id)
+    setMessages((prev) =>
+      prev.map((x) => (x.message_id === m.message_id ? { ...x, content: text, truncated: false } : x)),
+    )
+  }
+
   async function onNewConversation() {
     if (!canUse) return
     setStatusText('Creating conversation...')
@@ -77,33 +109,47 @@ export default function App() {
     setStatusText('')
   }
 
+  async function onForkConversation() {
+    if (!canUse || !activeConversationId) return
+    setStatusText('Forking conversation...')
+    try {
+      const meta = await forkConversation(userId, activeConversationId)
+      await refreshConversations()
+      setActiveConversationId(meta.conversation_id)
+      setStatusText('')
+    } catch (e) {
+      setStatusText(String(e))
+    }
+  }
+
   function stopStream() {
     if (esRef.current) {
       esRef.current.close()
       esRef.current = null
     }
+    setActiveRunId('')
   }
 
-  async function onSend() {
-    if (!canUse || !activeConversationId) return
-    const content = input.trim()
-    if (!content) return
-
-    stopStream()
-    setStreamText('')
-    setStatusText('Sending...')
-
-    setInput('')
-
-    const { run_id } = await postMessage(userId, activeConversationId, content)
+  async function onStop() {
+    if (!activeRunId) return
+    setStatusText('Cancelling...')
+    await cancelRun(userId, activeConversationId, activeRunId)
+  }
 
-    const url = runEventsUrl(userId, activeConversationId, run_id)
+  function followRun(runId) {
+    const url = runEventsUrl(userId, activeConversationId, runId)
     const es = new EventSource(url)
     esRef.current = es
+    setActiveRunId(runId)
 
     es.onmessage = (evt) => {
       try {
         const obj = JSON.parse(evt.data)
+        // The executor is retrying: drop the failed attempt's partial output.
+        if (obj.kind === 'retry') {
+          setStreamText('')
+          return
+        }
         const delta = extractDelta(obj)
         const resText = extractResultText(obj)
         if (delta) setStreamText((t) => t + delta)
@@ -115,8 +161,19 @@ export default function App() {
     }
 
     es.addEventListener('status', (evt) => {
-      setStatusText('Done')
+      let status = {}
+      try {
+        status = JSON.parse(evt.data)
+      } catch {
+        // ignore
+      }
       stopStream()
+      if (status.state === 'coalesced' && status.merged_into) {
+        // Sent while another run was in progress: answered by the merged run.
+        followRun(status.merged_into)
+        return
+      }
+      setStatusText(status.state === 'cancelled' ? 'Cancelled' : 'Done')
       refreshMessages(activeConversationId).catch((e) => setStatusText(String(e)))
     })
 
@@ -128,6 +185,21 @@ export default function App() {
     setStatusText('Running...')
   }
 
+  async function onSend() {
+    if (!canUse || !activeConversationId) return
+    const content = input.trim()
+    if (!content) return
+
+    stopStream()
+    setStreamText('')
+    setStatusText('Sending...')
+
+    setInput('')
+
+    const { run_id } = await postMessage(userId, activeConversationId, content)
+    followRun(run_id)
+  }
+
   return (
     <div className="layout">
       <aside className="sidebar">
@@ -146,6 +218,14 @@ export default function App() {
           New conversation
         </button>
 
+        <button
+          className="button"
+          onClick={onForkConversation}
+          disabled={!canUse || !activeConversationId || !!activeRunId}
+        >
+          Fork conversation
+        </button>
+
         <div className="sectionTitle">Conversations</div>
         <div className="convList">
           {conversations.map((c) => (
@@ -176,6 +256,11 @@ export default function App() {
             <div key={m.message_id} className={'msg ' + m.role}>
               <div className="role">{m.role}</div>
               <div className="content">{m.content}</div>
+              {m.truncated ? (
+                <button className="button" onClick={() => onLoadFullResult(m).catch((e) => setStatusText(String(e)))}>
+                  Show full result ({m.content_chars} chars)
+                </button>
+              ) : null}
             </div>
           ))}
 
@@ -198,6 +283,11 @@ export default function App() {
           <button className="button" onClick={onSend} disabled={!canUse || !activeConversationId}>
             Send
           </button>
+          {activeRunId ? (
+            <button className="button" onClick={() => onStop().catch((e) => setStatusText(String(e)))}>
+              Stop
+            </button>
+          ) : null}
         </div>
       </main>
     </div>
@@ -33,14 +33,26 @@ export async function createConversation(userId, title) {
   return await res.json()
 }
 
-export async function listMessages(userId, conversationId) {
-  const res = await fetch(`${API_BASE}/v1/conversations/${conversationId}/messages`, {
+export async function forkConversation(userId, conversationId) {
+  const res = await fetch(`${API_BASE}/v1/conversations/${conversationId}/fork`, {
+    method: 'POST',
     headers: headers(userId),
+    body: JSON.stringify({}),
   })
   if (!res.ok) throw new Error(await res.text())
   return await res.json()
 }
 
+export async function listMessages(userId, conversationId, after = null) {
+  // `after`: the cursor of a previous call, to fetch only newer messages.
+  // Unchanged histories are revalidated by the browser cache (ETag -> 304).
+  const base = `${API_BASE}/v1/conversations/${conversationId}/messages`
+  const url = after !== null ? `${base}?after=${encodeURIComponent(after)}` : base
+  const res = await fetch(url, { headers: headers(userId) })
+  if (!res.ok) throw new Error(await res.text())
+  return { messages: await res.json(), cursor: res.headers.get('X-Messages-Cursor') }
+}
+
 export async function postMessage(userId, conversationId, content) {
   const res = await fetch(`${API_BASE}/v1/conversations/${conversationId}/messages`, {
     method: 'POST',
@@ -51,9 +63,32 @@ export async function postMessage(userId, conversationId, content) {
   return await res.json()
 }
 
+export async function cancelRun(userId, conversationId, runId) {
+  const res = await fetch(`${API_BASE}/v1/conversations/${conversationId}/runs/${runId}`, {
+    method: 'DELETE',
+    headers: headers(userId),
+  })
+  if (!res.ok && res.status !== 409) throw new Error(await res.text())
+  return res.ok ? await res.json() : null
+}
+
+export async function getRunResult(userId, conversationId, runId) {
+  // Full text of a result that messages only carry a preview of.
+  const res = await fetch(`${API_BASE}/v1/conversations/${conversationId}/runs/${runId}/result`, {
+    headers: headers(userId),
+  })
+  if (!res.ok) throw new Error(await res.text())
+  return await res.text()
+}
+
 export function runEventsUrl(userId, conversationId, runId) {
   // EventSource can't set custom headers, so pass user_id in query.
   const u = new URL(`${API_BASE}/v1/conversations/${conversationId}/runs/${runId}/events.sse`)
   u.searchParams.set('user_id', userId)
+  // Only what the UI renders: normalized deltas (merged per 50 ms), retry
+  // markers and the result.
+  u.searchParams.set('view', 'compact')
+  u.searchParams.set('kinds', 'delta,retry,result')
+  u.searchParams.set('coalesce_ms', '50')
   return u.toString()
 }
@@ -0,0 +1,46 @@
+"""`ClaudeCliExecutor.execute` throughput against the fake claude stub."""
+
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from common import ensure_importable, fake_claude, timed
+
+ensure_importable()
+
+from cc3.config import AgentConfig  # noqa: E402
+from cc3.executor import ClaudeCliExecutor  # noqa: E402
+
+
+def run(*, quick: bool = False) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    cases = [(200, 32), (2000, 32), (500, 4096)] if not quick else [(200, 32)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        ws = root / "workspaces" / "bench"
+        ws.mkdir(parents=True)
+        ex = ClaudeCliExecutor(repo_root=root, timeout_s=120.0, lock_timeout_s=5.0)
+        cfg = AgentConfig(agent_id="bench")
+
+        for n_events, payload in cases:
+            with fake_claude(events=n_events, payload_bytes=payload, rate=0):
+                stats = timed(
+                    lambda: ex.execute(instruction="bench", workspace=ws, cfg=cfg, session_id=None),
+                    repeat=3 if quick else 5,
+                )
+            # init + deltas + result
+            n_lines = n_events + 2
+            results[f"execute_{n_events}x{payload}B"] = {
+                "events_per_s": n_lines / stats["median"],
+                "run_s": stats,
+            }
+    return results
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(run(), indent=2))
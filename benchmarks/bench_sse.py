@@ -0,0 +1,74 @@
+"""SSE delivery lag: time from an event being appended to the run event store
+until the SSE tail yields it. Requires the chat API dependencies (fastapi)."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from common import ensure_importable, percentile
+
+ensure_importable()
+
+
+def _writer(run_dir: Path, n: int, rate: float) -> None:
+    from cc3.event_store import EventWriter
+
+    interval = 1.0 / rate
+    with EventWriter(run_dir) as w:
+        for i in range(n):
+            w.append(json.dumps({"type": "delta", "delta": {"text": "x"}, "seq": i, "t": time.time()}), t_ms=0.0)
+            time.sleep(interval)
+    (run_dir / "status.json").write_text(json.dumps({"state": "completed"}), encoding="utf-8")
+
+
+async def _consume(run_dir: Path) -> list[float]:
+    from cc3_chat_api.sse_routes import _tail_events
+
+    lags: list[float] = []
+    async for chunk in _tail_events(run_dir):
+        now = time.time()
+        for line in chunk.decode("utf-8").splitlines():
+            if not line.startswith("data: "):
+                continue
+            try:
+                obj = json.loads(line[len("data: "):])
+            except json.JSONDecodeError:
+                continue
+            if isinstance(obj, dict) and "t" in obj:
+                lags.append(now - obj["t"])
+    return lags
+
+
+def run(*, quick: bool = False) -> dict[str, Any]:
+    try:
+        import fastapi  # noqa: F401
+    except ImportError:
+        return {"skipped": "fastapi not installed"}
+
+    n, rate = (100, 200.0) if quick else (500, 200.0)
+    with tempfile.TemporaryDirectory() as tmp:
+        rd = Path(tmp) / "runs" / "r1"
+        rd.mkdir(parents=True)
+        t = threading.Thread(target=_writer, args=(rd, n, rate))
+        t.start()
+        lags = sorted(asyncio.run(_consume(rd)))
+        t.join()
+
+    return {
+        "sse_delivery_lag": {
+            "events": len(lags),
+            "lag_ms_p50": percentile(lags, 50) * 1000,
+            "lag_ms_p95": percentile(lags, 95) * 1000,
+            "lag_ms_max": lags[-1] * 1000 if lags else None,
+        }
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
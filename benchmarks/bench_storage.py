@@ -0,0 +1,62 @@
+"""Chat storage latency: `load_messages` / `list_conversations` vs data size."""
+
+from __future__ import annotations
+
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from common import ensure_importable, timed
+
+ensure_importable()
+
+from cc3_chat_api import storage  # noqa: E402
+
+
+def _populate_messages(ws: Path, n: int, content_bytes: int) -> None:
+    body = "x" * content_bytes
+    with storage.messages_path(ws).open("a", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(
+                json.dumps(
+                    {
+                        "message_id": f"m{i}",
+                        "role": "user" if i % 2 == 0 else "assistant",
+                        "content": body,
+                        "created_at": time.time(),
+                        "run_id": f"r{i // 2}",
+                    }
+                )
+                + "\n"
+            )
+
+
+def run(*, quick: bool = False) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    msg_counts = [100, 1000] if quick else [100, 1000, 10000]
+    conv_counts = [10, 100] if quick else [10, 100, 1000]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+
+        for n in msg_counts:
+            meta = storage.create_conversation(root, "bench", f"msgs-{n}")
+            ws = storage.conversation_root(root, "bench", meta["conversation_id"])
+            _populate_messages(ws, n, 512)
+            stats = timed(lambda: storage.load_messages(ws, limit=200), repeat=5)
+            results[f"load_messages_{n}"] = {"latency_s": stats}
+
+        for n in conv_counts:
+            user = f"bench{n}"
+            for i in range(n):
+                storage.create_conversation(root, user, f"c{i}")
+            stats = timed(lambda: storage.list_conversations(root, user), repeat=5)
+            results[f"list_conversations_{n}"] = {"latency_s": stats}
+
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,43 @@
+"""`iter_stream_json_lines` and `normalize_event` throughput (MB/s)."""
+
+from __future__ import annotations
+
+import io
+import json
+from typing import Any
+
+from common import FIXTURES_DIR, ensure_importable, timed
+
+ensure_importable()
+
+from cc3.events import normalize_event  # noqa: E402
+from cc3.stream_parser import iter_stream_json_lines  # noqa: E402
+
+
+def _corpus(target_mb: float) -> str:
+    # Recorded fixture plus synthetic deltas, repeated up to the target size.
+    fixture = (FIXTURES_DIR / "kb_search.ndjson").read_text(encoding="utf-8")
+    deltas = "".join(
+        json.dumps({"type": "delta", "session_id": "s", "delta": {"text": "token " * 8}}) + "\n" for _ in range(50)
+    )
+    unit = fixture + deltas
+    reps = max(1, int(target_mb * 1024 * 1024 / len(unit)))
+    return unit * reps
+
+
+def run(*, quick: bool = False) -> dict[str, Any]:
+    text = _corpus(2.0 if quick else 16.0)
+    mb = len(text.encode("utf-8")) / (1024 * 1024)
+    objs = [sl.obj for sl in iter_stream_json_lines(io.StringIO(text)) if sl.obj is not None]
+
+    parse = timed(lambda: sum(1 for _ in iter_stream_json_lines(io.StringIO(text))), repeat=3)
+    norm = timed(lambda: [normalize_event(o) for o in objs], repeat=3)
+
+    return {
+        "iter_stream_json_lines": {"mb_per_s": mb / parse["median"], "lines": len(objs), "run_s": parse},
+        "normalize_event": {"mb_per_s": mb / norm["median"], "events_per_s": len(objs) / norm["median"], "run_s": norm},
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
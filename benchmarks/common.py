@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+FAKE_BIN_DIR = BENCH_DIR / "bin"
+FIXTURES_DIR = BENCH_DIR / "fixtures"
+
+
+def ensure_importable() -> None:
+    """Make `cc3` and `cc3_chat_api` importable without installing either."""
+
+    for p in (REPO_ROOT / "src", REPO_ROOT / "apps" / "chat_api"):
+        if str(p) not in sys.path:
+            sys.path.insert(0, str(p))
+
+
+@contextmanager
+def fake_claude(**opts: Any) -> Iterator[None]:
+    """Put the fake `claude` first on PATH and set FAKE_CLAUDE_* options.
+
+    `fake_claude(events=1000, rate=0)` sets FAKE_CLAUDE_EVENTS / FAKE_CLAUDE_RATE.
+    """
+
+    saved = {k: os.environ.get(k) for k in ("PATH", "FAKE_CLAUDE_PYTHON", *(f"FAKE_CLAUDE_{k.upper()}" for k in opts))}
+    os.environ["PATH"] = f"{FAKE_BIN_DIR}{os.pathsep}{os.environ.get('PATH', '')}"
+    os.environ["FAKE_CLAUDE_PYTHON"] = sys.executable
+    for k, v in opts.items():
+        os.environ[f"FAKE_CLAUDE_{k.upper()}"] = str(v)
+    try:
+        yield
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def timed(fn: Callable[[], Any], *, repeat: int = 5, warmup: int = 1) -> dict[str, float]:
+    """Run `fn` repeatedly and summarize wall times in seconds."""
+
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples)
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    s = sorted(samples)
+    return {
+        "n": len(s),
+        "min": s[0],
+        "median": statistics.median(s),
+        "p95": percentile(s, 95),
+        "max": s[-1],
+    }
+
+
+def percentile(sorted_samples: list[float], pct: float) -> float:
+    if not sorted_samples:
+        return float("nan")
+    k = (len(sorted_samples) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_samples) - 1)
+    return sorted_samples[lo] + (sorted_samples[hi] - sorted_samples[lo]) * (k - lo)
+
+
+def environment() -> dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=False,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.time(),
+    }
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Scriptable stand-in for the `claude` CLI (stream-json output only).
+
+Accepts (and mostly ignores) the same argv as `claude -p --output-format
+stream-json`, drains the prompt from stdin and replays a stream-json fixture
+or a synthesized stream on stdout. Behaviour is configured through env vars,
+because the executor owns argv:
+
+  FAKE_CLAUDE_FIXTURE        NDJSON file to replay (default: synthesize)
+  FAKE_CLAUDE_EVENTS         number of delta events to synthesize (default 20)
+  FAKE_CLAUDE_PAYLOAD_BYTES  text size of each synthesized delta (default 32)
+  FAKE_CLAUDE_RATE           events per second, 0 = as fast as possible (default 0)
+  FAKE_CLAUDE_STALL_AT       stall before emitting event #N (default: never)
+  FAKE_CLAUDE_STALL_S        stall duration in seconds (default 0)
+  FAKE_CLAUDE_EXIT_CODE      process exit code (default 0)
+  FAKE_CLAUDE_STDERR         text written to stderr before exiting
+  FAKE_CLAUDE_ERROR          emit an error result instead of success, e.g. "overloaded_error"
+
+Put `benchmarks/bin` first on PATH to make the executor spawn this script.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+import uuid
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, ""))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, ""))
+    except ValueError:
+        return default
+
+
+def _arg_value(argv: list[str], flag: str) -> str | None:
+    if flag in argv:
+        i = argv.index(flag)
+        if i + 1 < len(argv):
+            return argv[i + 1]
+    return None
+
+
+def synthesize(session_id: str, *, n_events: int, payload_bytes: int, error: str | None) -> list[dict]:
+    chunk = ("lorem ipsum " * (payload_bytes // 12 + 1))[:payload_bytes]
+    events: list[dict] = [
+        {
+            "type": "system",
+            "subtype": "init",
+            "session_id": session_id,
+            "apiKeySource": "fake",
+            "permissionMode": "dontAsk",
+            "tools": ["Read", "Grep", "Glob"],
+            "model": "fake-model",
+        }
+    ]
+    for _ in range(n_events):
+        events.append({"type": "delta", "session_id": session_id, "delta": {"text": chunk}})
+
+    if error:
+        events.append(
+            {
+                "type": "result",
+                "subtype": "error",
+                "is_error": True,
+                "session_id": session_id,
+                "result": f"API Error: {error}",
+                "error": {"type": error},
+                "usage": {},
+            }
+        )
+    else:
+        events.append(
+            {
+                "type": "result",
+                "subtype": "success",
+                "is_error": False,
+                "session_id": session_id,
+                "result": chunk * n_events,
+                "usage": {"input_tokens": 10, "output_tokens": max(1, n_events * payload_bytes // 4)},
+                "total_cost_usd": 0.0,
+            }
+        )
+    return events
+
+
+def main(argv: list[str]) -> int:
+    # Drain the prompt like the real CLI does in print mode.
+    sys.stdin.read()
+
+    resume = _arg_value(argv, "--resume")
+    session_id = resume if resume and "--fork-session" not in argv else str(uuid.uuid4())
+
+    fixture = os.environ.get("FAKE_CLAUDE_FIXTURE")
+    if fixture:
+        with open(fixture, encoding="utf-8") as f:
+            lines = [line.rstrip("\n") for line in f if line.strip()]
+    else:
+        events = synthesize(
+            session_id,
+            n_events=_env_int("FAKE_CLAUDE_EVENTS", 20),
+            payload_bytes=_env_int("FAKE_CLAUDE_PAYLOAD_BYTES", 32),
+            error=os.environ.get("FAKE_CLAUDE_ERROR") or None,
+        )
+        lines = [json.dumps(e, separators=(",", ":")) for e in events]
+
+    rate = _env_float("FAKE_CLAUDE_RATE", 0.0)
+    interval = 1.0 / rate if rate > 0 else 0.0
+    stall_at = _env_int("FAKE_CLAUDE_STALL_AT", -1)
+    stall_s = _env_float("FAKE_CLAUDE_STALL_S", 0.0)
+
+    out = sys.stdout
+    next_t = time.monotonic()
+    for i, line in enumerate(lines):
+        if i == stall_at and stall_s > 0:
+            time.sleep(stall_s)
+            next_t = time.monotonic()
+        if interval:
+            next_t += interval
+            delay = next_t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        out.write(line)
+        out.write("\n")
+        out.flush()
+
+    err = os.environ.get("FAKE_CLAUDE_STDERR")
+    if err:
+        sys.stderr.write(err.rstrip("\n") + "\n")
+    return _env_int("FAKE_CLAUDE_EXIT_CODE", 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
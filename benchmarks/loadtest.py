@@ -0,0 +1,397 @@
+"""Load test for the chat API with simulated users, on one Linux box.
+
+Starts `uvicorn cc3_chat_api.main:app` against a scratch data root with the
+fake `claude` on PATH, then runs N asyncio users. Each user creates a
+conversation and, per turn, POSTs a message and holds the run's SSE stream
+until its terminal status event.
+
+    python benchmarks/loadtest.py --users 20 --turns 5 --out load.json
+    python benchmarks/loadtest.py --url http://127.0.0.1:8000 --server-pid 1234
+
+Reports p50/p95/p99 of POST latency, time to first SSE event (from POST
+start), end-to-end turn time, error/timeout rates, and the server's CPU%
+and RSS sampled from /proc over time.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from common import FAKE_BIN_DIR, REPO_ROOT, environment, percentile  # noqa: E402
+
+
+# -- minimal HTTP/1.1 client (one connection per request) -----------------
+
+
+class HttpError(Exception):
+    pass
+
+
+@dataclass
+class Target:
+    host: str
+    port: int
+
+    @classmethod
+    def parse(cls, url: str) -> "Target":
+        u = urlsplit(url)
+        return cls(host=u.hostname or "127.0.0.1", port=u.port or 80)
+
+
+async def _open(target: Target, method: str, path: str, headers: dict[str, str], body: bytes | None):
+    reader, writer = await asyncio.open_connection(target.host, target.port)
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {target.host}:{target.port}", "Connection: close"]
+    lines += [f"{k}: {v}" for k, v in headers.items()]
+    if body is not None:
+        lines.append(f"Content-Length: {len(body)}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+    await writer.drain()
+
+    status_line = await reader.readline()
+    parts = status_line.decode("latin-1").split(" ", 2)
+    if len(parts) < 2:
+        writer.close()
+        raise HttpError(f"bad status line: {status_line!r}")
+    status = int(parts[1])
+    resp_headers: dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        k, _, v = line.decode("latin-1").partition(":")
+        resp_headers[k.strip().lower()] = v.strip()
+    return status, resp_headers, reader, writer
+
+
+async def _iter_body(reader: asyncio.StreamReader, headers: dict[str, str]):
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b";")[0].strip() or b"0", 16)
+            if size == 0:
+                await reader.readline()
+                return
+            data = await reader.readexactly(size)
+            await reader.readexactly(2)
+            yield data
+    elif "content-length" in headers:
+        yield await reader.readexactly(int(headers["content-length"]))
+    else:
+        while chunk := await reader.read(65536):
+            yield chunk
+
+
+async def request_json(target: Target, method: str, path: str, *, user_id: str, body: Any = None) -> Any:
+    headers = {"X-User-Id": user_id, "Content-Type": "application/json"}
+    payload = json.dumps(body).encode("utf-8") if body is not None else None
+    status, resp_headers, reader, writer = await _open(target, method, path, headers, payload)
+    try:
+        data = b"".join([c async for c in _iter_body(reader, resp_headers)])
+    finally:
+        writer.close()
+    if status >= 400:
+        raise HttpError(f"{method} {path}: HTTP {status}: {data[:200]!r}")
+    return json.loads(data) if data else None
+
+
+async def sse_until_status(target: Target, path: str, on_first_event) -> dict[str, Any]:
+    """Consume an SSE stream until its `status` event; returns the status payload."""
+
+    status, headers, reader, writer = await _open(target, "GET", path, {"Accept": "text/event-stream"}, None)
+    if status >= 400:
+        writer.close()
+        raise HttpError(f"GET {path}: HTTP {status}")
+    buf = b""
+    event, data_lines, seen_data = None, [], False
+    try:
+        async for chunk in _iter_body(reader, headers):
+            buf += chunk
+            while b"\n" in buf:
+                raw, buf = buf.split(b"\n", 1)
+                line = raw.decode("utf-8", errors="replace").rstrip("\r")
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data_lines.append(line[5:].lstrip())
+                    if not seen_data:
+                        seen_data = True
+                        on_first_event()
+                elif line == "":
+                    if event == "status":
+                        return json.loads("\n".join(data_lines) or "{}")
+                    event, data_lines = None, []
+    finally:
+        writer.close()
+    raise HttpError("stream ended without status event")
+
+
+# -- simulation -------------------------------------------------------------
+
+
+@dataclass
+class Stats:
+    post_s: list[float] = field(default_factory=list)
+    first_event_s: list[float] = field(default_factory=list)
+    turn_s: list[float] = field(default_factory=list)
+    turns: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    failed_runs: int = 0
+    error_samples: list[str] = field(default_factory=list)
+
+    def error(self, msg: str) -> None:
+        self.errors += 1
+        if len(self.error_samples) < 10:
+            self.error_samples.append(msg)
+
+
+async def one_turn(target: Target, user_id: str, cid: str, i: int, stats: Stats) -> None:
+    t0 = time.perf_counter()
+    resp = await request_json(
+        target, "POST", f"/v1/conversations/{cid}/messages", user_id=user_id, body={"content": f"turn {i}"}
+    )
+    stats.post_s.append(time.perf_counter() - t0)
+
+    def first() -> None:
+        stats.first_event_s.append(time.perf_counter() - t0)
+
+    path = f"/v1/conversations/{cid}/runs/{resp['run_id']}/events.sse?user_id={user_id}"
+    status = await sse_until_status(target, path, first)
+    stats.turn_s.append(time.perf_counter() - t0)
+    if status.get("state") != "completed":
+        stats.failed_runs += 1
+
+
+async def simulate_user(target: Target, user_id: str, turns: int, turn_timeout: float, think_s: float, stats: Stats):
+    try:
+        conv = await request_json(target, "POST", "/v1/conversations", user_id=user_id, body={"title": "load"})
+    except (OSError, HttpError) as e:
+        stats.error(f"create: {e}")
+        return
+    for i in range(turns):
+        stats.turns += 1
+        try:
+            await asyncio.wait_for(one_turn(target, user_id, conv["conversation_id"], i, stats), turn_timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+        except (OSError, HttpError, asyncio.IncompleteReadError, ValueError) as e:
+            stats.error(f"turn: {e}")
+        if think_s:
+            await asyncio.sleep(think_s)
+
+
+# -- server process + resource sampling ------------------------------------
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, data_root: Path, fake_opts: dict[str, str]) -> subprocess.Popen[bytes]:
+    env = dict(os.environ)
+    env["PATH"] = f"{FAKE_BIN_DIR}{os.pathsep}{env.get('PATH', '')}"
+    env["FAKE_CLAUDE_PYTHON"] = sys.executable
+    env["CC3_REPO_ROOT"] = str(data_root)
+    env.update(fake_opts)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "cc3_chat_api.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=str(REPO_ROOT / "apps" / "chat_api"),
+        env=env,
+    )
+
+
+async def wait_ready(target: Target, timeout_s: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            status, headers, reader, writer = await _open(target, "GET", "/metrics", {}, None)
+            writer.close()
+            if status == 200:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def _proc_sample(pid: int) -> tuple[float, int] | None:
+    """(cpu seconds, rss bytes) of the server process from /proc; claude children are excluded."""
+
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    # Fields after the comm: utime=12th, stime=13th (0-based 11, 12).
+    cpu_s = (int(stat[11]) + int(stat[12])) / ticks
+    rss = 0
+    for line in status.splitlines():
+        if line.startswith("VmRSS:"):
+            rss = int(line.split()[1]) * 1024
+    return cpu_s, rss
+
+
+async def sample_resources(pid: int, interval_s: float, out: list[dict[str, float]], stop: asyncio.Event) -> None:
+    prev = _proc_sample(pid)
+    t_prev = time.monotonic()
+    t_start = t_prev
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), interval_s)
+        except asyncio.TimeoutError:
+            pass
+        cur = _proc_sample(pid)
+        now = time.monotonic()
+        if cur is None or prev is None:
+            break
+        out.append(
+            {
+                "t_s": round(now - t_start, 3),
+                "cpu_pct": round(100 * (cur[0] - prev[0]) / max(now - t_prev, 1e-9), 1),
+                "rss_mb": round(cur[1] / (1024 * 1024), 1),
+            }
+        )
+        prev, t_prev = cur, now
+
+
+# -- report -----------------------------------------------------------------
+
+
+def _pcts(samples: list[float]) -> dict[str, float | None]:
+    s = sorted(samples)
+    if not s:
+        return {"n": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+    return {
+        "n": len(s),
+        "p50_ms": round(percentile(s, 50) * 1000, 2),
+        "p95_ms": round(percentile(s, 95) * 1000, 2),
+        "p99_ms": round(percentile(s, 99) * 1000, 2),
+    }
+
+
+def build_report(args: argparse.Namespace, stats: Stats, resources: list[dict[str, float]], wall_s: float) -> dict:
+    turns = max(stats.turns, 1)
+    return {
+        "env": environment(),
+        "config": {
+            "users": args.users,
+            "turns": args.turns,
+            "events": args.events,
+            "event_rate": args.event_rate,
+            "think_s": args.think_s,
+        },
+        "wall_s": round(wall_s, 3),
+        "throughput_turns_per_s": round(len(stats.turn_s) / wall_s, 3) if wall_s else None,
+        "post_latency": _pcts(stats.post_s),
+        "time_to_first_sse_event": _pcts(stats.first_event_s),
+        "turn_time": _pcts(stats.turn_s),
+        "error_rate": round(stats.errors / turns, 4),
+        "timeout_rate": round(stats.timeouts / turns, 4),
+        "failed_run_rate": round(stats.failed_runs / turns, 4),
+        "error_samples": stats.error_samples,
+        "server": {
+            "cpu_pct_mean": round(sum(r["cpu_pct"] for r in resources) / len(resources), 1) if resources else None,
+            "cpu_pct_max": max((r["cpu_pct"] for r in resources), default=None),
+            "rss_mb_max": max((r["rss_mb"] for r in resources), default=None),
+            "samples": resources,
+        },
+    }
+
+
+async def amain(args: argparse.Namespace) -> dict:
+    server: subprocess.Popen[bytes] | None = None
+    tmp: tempfile.TemporaryDirectory[str] | None = None
+    if args.url:
+        target = Target.parse(args.url)
+        pid = args.server_pid
+    else:
+        tmp = tempfile.TemporaryDirectory(prefix="cc3-load-")
+        port = _free_port()
+        target = Target("127.0.0.1", port)
+        server = start_server(
+            port,
+            Path(tmp.name),
+            {
+                "FAKE_CLAUDE_EVENTS": str(args.events),
+                "FAKE_CLAUDE_RATE": str(args.event_rate),
+                "FAKE_CLAUDE_PAYLOAD_BYTES": str(args.payload_bytes),
+            },
+        )
+        pid = server.pid
+
+    try:
+        await wait_ready(target)
+        stats = Stats()
+        resources: list[dict[str, float]] = []
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(sample_resources(pid, args.sample_s, resources, stop)) if pid else None
+
+        t0 = time.perf_counter()
+        await asyncio.gather(
+            *(
+                simulate_user(target, f"load{i}", args.turns, args.turn_timeout_s, args.think_s, stats)
+                for i in range(args.users)
+            )
+        )
+        wall = time.perf_counter() - t0
+
+        stop.set()
+        if sampler:
+            await sampler
+        return build_report(args, stats, resources, wall)
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        if tmp is not None:
+            tmp.cleanup()
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--users", type=int, default=10)
+    ap.add_argument("--turns", type=int, default=3, help="messages per user")
+    ap.add_argument("--think-s", type=float, default=0.0, help="pause between a user's turns")
+    ap.add_argument("--turn-timeout-s", type=float, default=120.0)
+    ap.add_argument("--events", type=int, default=40, help="fake claude deltas per run")
+    ap.add_argument("--event-rate", type=float, default=50.0, help="fake claude events/s (0 = unthrottled)")
+    ap.add_argument("--payload-bytes", type=int, default=32)
+    ap.add_argument("--sample-s", type=float, default=0.5, help="server CPU/RSS sampling interval")
+    ap.add_argument("--url", help="target an already running server instead of starting one")
+    ap.add_argument("--server-pid", type=int, help="pid to sample when using --url")
+    ap.add_argument("--out", type=Path, help="write JSON report here (default: stdout)")
+    args = ap.parse_args(argv)
+
+    report = asyncio.run(amain(args))
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(text + "\n", encoding="utf-8")
+        summary = {k: report[k] for k in ("post_latency", "time_to_first_sse_event", "turn_time", "error_rate")}
+        print(json.dumps(summary, indent=2))
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Run the cc3 benchmark suite and emit JSON results.
+
+    python benchmarks/run.py --out bench.json
+    python benchmarks/run.py --quick --only stream,storage
+    python benchmarks/run.py --compare old.json --out new.json
+
+Metrics ending in `_per_s` are higher-is-better; `_s` / `_ms*` are
+lower-is-better. `--compare` prints the ratio new/old for each of them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from common import environment  # noqa: E402
+
+SUITES = ("executor", "stream", "storage", "sse")
+
+
+def _flatten(obj: Any, prefix: str = "") -> dict[str, float]:
+    out: dict[str, float] = {}
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            out.update(_flatten(v, f"{prefix}.{k}" if prefix else str(k)))
+    elif isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        out[prefix] = float(obj)
+    return out
+
+
+def _direction(key: str) -> int | None:
+    leaf = key.rsplit(".", 1)[-1]
+    parent = key.rsplit(".", 2)[-2] if key.count(".") >= 1 else ""
+    if leaf.endswith("_per_s"):
+        return 1
+    if leaf.startswith("lag_ms") or (parent.endswith("_s") and leaf in {"median", "p95"}):
+        return -1
+    return None
+
+
+def compare(old: dict[str, Any], new: dict[str, Any]) -> list[str]:
+    a, b = _flatten(old.get("results", {})), _flatten(new.get("results", {}))
+    lines = [f"{'metric':<60}{'old':>14}{'new':>14}{'new/old':>10}"]
+    for key in sorted(set(a) & set(b)):
+        d = _direction(key)
+        if d is None or not a[key]:
+            continue
+        ratio = b[key] / a[key]
+        better = (ratio > 1) if d > 0 else (ratio < 1)
+        flag = "" if abs(ratio - 1) < 0.05 else ("  better" if better else "  WORSE")
+        lines.append(f"{key:<60}{a[key]:>14.4g}{b[key]:>14.4g}{ratio:>10.2f}{flag}")
+    return lines
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--only", default=",".join(SUITES), help="comma-separated suites: " + ",".join(SUITES))
+    ap.add_argument("--quick", action="store_true", help="smaller inputs, fewer repeats")
+    ap.add_argument("--out", type=Path, help="write JSON results here (default: stdout)")
+    ap.add_argument("--compare", type=Path, help="previous results JSON to compare against")
+    args = ap.parse_args(argv)
+
+    results: dict[str, Any] = {}
+    for name in [s.strip() for s in args.only.split(",") if s.strip()]:
+        if name not in SUITES:
+            ap.error(f"unknown suite: {name}")
+        print(f"running {name} ...", file=sys.stderr)
+        results[name] = importlib.import_module(f"bench_{name}").run(quick=args.quick)
+
+    doc = {"env": environment(), "quick": args.quick, "results": results}
+    text = json.dumps(doc, indent=2)
+    if args.out:
+        args.out.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    if args.compare:
+        old = json.loads(args.compare.read_text(encoding="utf-8"))
+        print("\n".join(compare(old, doc)), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""Content-addressed blob store backing workspace `kb/` files.
+
+Blobs live at `<root>/sha256/<aa>/<digest>` and are read-only. References
+are hardlinks the caller places (normally under `<root>/refs/`), so a blob's
+link count is its reference count: `st_nlink - 1` references point at it,
+and a blob with a link count of 1 is garbage.
+
+What a workspace sees under its `kb/` is a private copy of the blob (a
+reflink where the filesystem supports it, so the same document in many
+workspaces costs its size once there), never a hardlink: the agent may edit
+its copy in place without touching the blob or other workspaces.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import stat
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from uuid import uuid4
+
+from .fsclone import clone_file
+from .locking import LockHandle, acquire_workspace_lock
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+_LOCK_TIMEOUT_S = 10.0
+
+
+def is_digest(s: str) -> bool:
+    return bool(_DIGEST_RE.match(s))
+
+
+@dataclass(frozen=True)
+class BlobInfo:
+    digest: str
+    size: int
+    # False if the content was already stored (the upload was deduplicated).
+    created: bool
+
+
+@dataclass(frozen=True)
+class GcStats:
+    removed: int
+    freed_bytes: int
+
+
+class BlobWriter:
+    """Streams one upload into a temp file, hashing as it goes."""
+
+    def __init__(self, store: BlobStore):
+        self._store = store
+        self._h = hashlib.sha256()
+        self._size = 0
+        self._tmp = store.root / "tmp" / uuid4().hex
+        self._tmp.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self._tmp.open("wb")
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def digest(self) -> str:
+        """Digest of the data written so far."""
+
+        return self._h.hexdigest()
+
+    def write(self, chunk: bytes) -> None:
+        self._h.update(chunk)
+        self._f.write(chunk)
+        self._size += len(chunk)
+
+    def commit(self, ref: Path | None = None) -> BlobInfo:
+        """Move the upload into the store (a blob with the same digest wins).
+
+        With `ref`, also reference the blob from there, in the same critical
+        section so that a concurrent gc() never sees it unreferenced.
+        """
+
+        self._f.close()
+        digest = self._h.hexdigest()
+        dst = self._store.path(digest)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        os.chmod(self._tmp, 0o444)
+        h = self._store.lock()
+        try:
+            # link, not rename: replacing an existing blob would orphan its views.
+            os.link(self._tmp, dst)
+            created = True
+        except FileExistsError:
+            created = False
+        try:
+            if ref is not None:
+                self._store._link_locked(digest, ref)
+        finally:
+            h.release()
+            self._tmp.unlink(missing_ok=True)
+        return BlobInfo(digest=digest, size=self._size, created=created)
+
+    def abort(self) -> None:
+        self._f.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+class BlobStore:
+    def __init__(self, root: Path):
+        self.root = root
+
+    def path(self, digest: str) -> Path:
+        if not is_digest(digest):
+            raise ValueError(f"not a sha256 hex digest: {digest!r}")
+        return self.root / "sha256" / digest[:2] / digest
+
+    def has(self, digest: str) -> bool:
+        return is_digest(digest) and self.path(digest).is_file()
+
+    def refcount(self, digest: str) -> int:
+        return self.path(digest).stat().st_nlink - 1
+
+    def writer(self) -> BlobWriter:
+        return BlobWriter(self)
+
+    def put(self, chunks: Iterable[bytes]) -> BlobInfo:
+        w = self.writer()
+        try:
+            for chunk in chunks:
+                w.write(chunk)
+        except BaseException:
+            w.abort()
+            raise
+        return w.commit()
+
+    def link(self, digest: str, ref: Path) -> None:
+        """Reference a blob from `ref`, a hardlink on the store's filesystem (atomically replacing what is there)."""
+
+        # Under the store lock so that gc() cannot drop the blob mid-link.
+        h = self.lock()
+        try:
+            self._link_locked(digest, ref)
+        finally:
+            h.release()
+
+    def _link_locked(self, digest: str, ref: Path) -> None:
+        src = self.path(digest)
+        if not src.is_file():
+            raise FileNotFoundError(f"unknown blob: {digest}")
+        ref.parent.mkdir(parents=True, exist_ok=True)
+        tmp = ref.with_name(f".{ref.name}.{uuid4().hex[:8]}.tmp")
+        os.link(src, tmp)
+        os.replace(tmp, ref)
+
+    def copy(self, digest: str, dst: Path) -> None:
+        """Write a private, writable copy of a blob to `dst` (atomically replacing what is there).
+
+        The blob must be referenced (or otherwise kept from gc()) meanwhile.
+        """
+
+        src = self.path(digest)
+        if not src.is_file():
+            raise FileNotFoundError(f"unknown blob: {digest}")
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dst.with_name(f".{dst.name}.{uuid4().hex[:8]}.tmp")
+        try:
+            clone_file(src, tmp)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, dst)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def checkout(self, digest: str, ref: Path, dst: Path) -> None:
+        """Reference a blob from `ref` and copy it to `dst`."""
+
+        self.link(digest, ref)
+        self.copy(digest, dst)
+
+    def link_refs(self, src: Path, dst: Path) -> int:
+        """Duplicate the references under directory `src` into `dst`; returns how many."""
+
+        n = 0
+        for root, _dirs, files in os.walk(src):
+            out = dst / Path(root).relative_to(src)
+            out.mkdir(parents=True, exist_ok=True)
+            for name in files:
+                os.link(Path(root) / name, out / name)
+                n += 1
+        return n
+
+    def lock(self) -> LockHandle:
+        """Serializes linking against gc()."""
+
+        return acquire_workspace_lock(self.root, timeout_s=_LOCK_TIMEOUT_S, name="blobs")
+
+    def _blobs(self) -> Iterator[Path]:
+        base = self.root / "sha256"
+        if not base.is_dir():
+            return
+        for shard in base.iterdir():
+            for p in shard.iterdir():
+                if is_digest(p.name):
+                    yield p
+
+    def gc(self) -> GcStats:
+        """Remove blobs nothing references any more."""
+
+        removed = freed = 0
+        h = self.lock()
+        try:
+            for p in self._blobs():
+                st = p.lstat()
+                if stat.S_ISREG(st.st_mode) and st.st_nlink == 1:
+                    p.unlink()
+                    removed += 1
+                    freed += st.st_size
+        finally:
+            h.release()
+        return GcStats(removed=removed, freed_bytes=freed)
@@ -0,0 +1,166 @@
+"""Rolling token/cost budgets backed by a local usage ledger.
+
+Every finished run appends one line (user, agent, tokens, cost) to an NDJSON
+ledger. Budgets are sliding windows over that ledger: a budget is exhausted
+while the usage recorded within the last `window_s` seconds reaches its
+limit. `BudgetLedger.usage` also tells how long until enough usage has aged
+out of the window for a new run to be admitted.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+# Ledger entries older than this are dropped; budget windows are capped to it.
+RETENTION_S = 7 * 24 * 3600.0
+
+
+@dataclass(frozen=True)
+class Budget:
+    # None: no limit on that figure.
+    tokens: int | None = None
+    cost_usd: float | None = None
+    window_s: float = 3600.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.tokens is not None or self.cost_usd is not None
+
+
+def _positive(v: Any) -> float | None:
+    if isinstance(v, str):
+        try:
+            v = float(v)
+        except ValueError:
+            return None
+    if isinstance(v, bool) or not isinstance(v, (int, float)) or v <= 0:
+        return None
+    return float(v)
+
+
+def parse_budget(v: Any) -> Budget:
+    """A `budget:` mapping ({tokens, cost_usd, window_s}); anything else means no budget."""
+
+    if not isinstance(v, Mapping):
+        return Budget()
+    tokens = _positive(v.get("tokens"))
+    return Budget(
+        tokens=int(tokens) if tokens is not None else None,
+        cost_usd=_positive(v.get("cost_usd")),
+        window_s=min(RETENTION_S, _positive(v.get("window_s")) or Budget.window_s),
+    )
+
+
+@dataclass(frozen=True)
+class _Entry:
+    t: float
+    user_id: str
+    agent_id: str
+    tokens: int
+    cost_usd: float
+
+
+@dataclass(frozen=True)
+class WindowUsage:
+    tokens: int
+    cost_usd: float
+    # Seconds until a run would be admitted again; 0 if it is now.
+    retry_after_s: float
+
+
+class BudgetLedger:
+    """Usage per user and per agent over sliding windows (thread-safe).
+
+    The file is append-only while the process runs; entries past
+    `RETENTION_S` are compacted away when it is loaded.
+    """
+
+    def __init__(self, path: Path, *, clock: Callable[[], float] = time.time):
+        self._path = path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: deque[_Entry] = deque()
+        self._load()
+
+    def _load(self) -> None:
+        if not self._path.exists():
+            return
+        cutoff = self._clock() - RETENTION_S
+        dropped = 0
+        for line in self._path.read_text(encoding="utf-8").splitlines():
+            try:
+                d = json.loads(line)
+                e = _Entry(
+                    t=float(d["t"]),
+                    user_id=str(d["user_id"]),
+                    agent_id=str(d["agent_id"]),
+                    tokens=int(d["tokens"]),
+                    cost_usd=float(d["cost_usd"]),
+                )
+            except (ValueError, KeyError, TypeError):
+                dropped += 1
+                continue
+            if e.t < cutoff:
+                dropped += 1
+                continue
+            self._entries.append(e)
+        if dropped > len(self._entries):
+            self._rewrite()
+
+    def _rewrite(self) -> None:
+        tmp = self._path.with_suffix(".tmp")
+        tmp.write_text("".join(self._line(e) for e in self._entries), encoding="utf-8")
+        os.replace(tmp, self._path)
+
+    @staticmethod
+    def _line(e: _Entry) -> str:
+        d = {"t": e.t, "user_id": e.user_id, "agent_id": e.agent_id, "tokens": e.tokens, "cost_usd": e.cost_usd}
+        return json.dumps(d, ensure_ascii=True) + "\n"
+
+    def record(self, *, user_id: str, agent_id: str, tokens: int, cost_usd: float) -> None:
+        e = _Entry(t=self._clock(), user_id=user_id, agent_id=agent_id, tokens=tokens, cost_usd=cost_usd)
+        with self._lock:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with self._path.open("a", encoding="utf-8") as f:
+                f.write(self._line(e))
+            self._entries.append(e)
+            cutoff = e.t - RETENTION_S
+            while self._entries and self._entries[0].t < cutoff:
+                self._entries.popleft()
+
+    def usage(self, budget: Budget, *, user_id: str | None = None, agent_id: str | None = None) -> WindowUsage:
+        """Usage within `budget`'s window of one user or one agent."""
+
+        now = self._clock()
+        since = now - budget.window_s
+        with self._lock:
+            entries = [
+                e
+                for e in self._entries
+                if e.t > since
+                and (user_id is None or e.user_id == user_id)
+                and (agent_id is None or e.agent_id == agent_id)
+            ]
+        tokens = sum(e.tokens for e in entries)
+        cost = sum(e.cost_usd for e in entries)
+
+        # Age out the oldest entries until both figures are under their limits.
+        retry_after = 0.0
+        t_left, c_left = tokens, cost
+        for e in entries:
+            over_t = budget.tokens is not None and t_left >= budget.tokens
+            over_c = budget.cost_usd is not None and c_left >= budget.cost_usd
+            if not (over_t or over_c):
+                break
+            t_left -= e.tokens
+            c_left -= e.cost_usd
+            retry_after = e.t + budget.window_s - now
+        return WindowUsage(tokens=tokens, cost_usd=round(float(cost), 6), retry_after_s=max(0.0, retry_after))
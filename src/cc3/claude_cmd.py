@@ -31,8 +31,8 @@ def build_claude_argv(
     resume: str | None,
     fork: bool,
     add_dirs: list[Path],
-    system_prompt: str | None,
-    append_system_prompt: str | None,
+    system_prompt_file: Path | None,
+    append_system_prompt_file: Path | None,
 ) -> ClaudeInvocation:
     argv: list[str] = [
         "claude",
@@ -57,11 +57,13 @@ def build_claude_argv(
     for d in add_dirs:
         argv.extend(["--add-dir", str(d)])
 
-    if system_prompt:
-        argv.extend(["--system-prompt", system_prompt])
+    # Prompts go by file (see cc3.prompts), always in this order so that the
+    # assembled prefix is byte-identical across runs.
+    if system_prompt_file is not None:
+        argv.extend(["--system-prompt-file", str(system_prompt_file)])
 
-    if append_system_prompt:
-        argv.extend(["--append-system-prompt", append_system_prompt])
+    if append_system_prompt_file is not None:
+        argv.extend(["--append-system-prompt-file", str(append_system_prompt_file)])
 
     # Provide the prompt via stdin (more robust than a positional arg when
     # options like --tools accept multiple values).
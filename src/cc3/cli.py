@@ -1,15 +1,19 @@
 from __future__ import annotations
 
+import json
+import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import typer
 
-from .config import load_agent_config
-from .executor import ClaudeCliExecutor
-from .orchestrator.graph import build_graph
 from .paths import find_repo_root
-from .scaffold import init_agent as init_agent_scaffold
-from .session import SessionManager
+
+if TYPE_CHECKING:
+    from .events import NormalizedEvent
+
+# Subcommands import their dependencies lazily so that `cc3 --help` and cheap
+# commands do not pay for LangGraph, yaml or the executor.
 
 app = typer.Typer(add_completion=False, help="cc3: LangGraph + Claude Code CLI executor")
 
@@ -24,6 +28,8 @@ def init_agent(
     ),
     overwrite: bool = typer.Option(False, "--overwrite", help="Overwrite existing templates"),
 ) -> None:
+    from .scaffold import init_agent as init_agent_scaffold
+
     repo_root = (root.resolve() if root else find_repo_root())
 
     try:
@@ -50,43 +56,290 @@ def run(
     fork: bool = typer.Option(False, "--fork", help="Fork a session (requires resume id)"),
     timeout_s: float = typer.Option(600.0, "--timeout-s", help="Kill claude run after this many seconds"),
     lock_timeout_s: float = typer.Option(30.0, "--lock-timeout-s", help="Seconds to wait for workspace lock"),
+    no_daemon: bool = typer.Option(False, "--no-daemon", help="Run in-process even if `cc3 serve` is running"),
+    stream: bool = typer.Option(False, "--stream", help="Print text deltas as they arrive"),
 ) -> None:
     repo_root = (root.resolve() if root else find_repo_root())
 
-    sm = SessionManager(repo_root)
-    rec = sm.load_or_create(agent)
+    params = {
+        "agent": agent,
+        "goal": goal,
+        "mode": mode,
+        "resume": resume,
+        "fork": fork,
+        "timeout_s": timeout_s,
+        "lock_timeout_s": lock_timeout_s,
+    }
 
-    cfg = load_agent_config(repo_root=repo_root, agent_id=agent)
-    cfg.policy_preset = mode
+    def on_delta(text: str) -> None:
+        typer.echo(text, nl=False)
 
-    # Default to stored session id unless overridden.
-    session_id = resume if resume is not None else rec.claude_session_id
-    if fork and not session_id:
-        typer.secho("--fork requires an existing session id (use --resume or run once first)", fg=typer.colors.RED)
-        raise typer.Exit(code=2)
+    final_state = None
+    if not no_daemon:
+        from .daemon import DaemonError, DaemonUnavailable, run_remote, socket_path
 
-    executor = ClaudeCliExecutor(repo_root=repo_root, timeout_s=timeout_s, lock_timeout_s=lock_timeout_s)
-    graph = build_graph(executor=executor, cfg=cfg, workspace=rec.workspace_path)
-
-    final_state = graph.invoke(
-        {
-            "agent_id": agent,
-            "workspace_path": str(rec.workspace_path),
-            "goal": goal,
-            "claude_session_id": session_id,
-            "fork": fork,
-        }
-    )
+        try:
+            final_state = run_remote(
+                socket_path(repo_root), repo_root=repo_root, on_delta=on_delta if stream else None, **params
+            )
+        except DaemonUnavailable:
+            pass  # also a daemon serving another repo root
+        except DaemonError as e:
+            typer.secho(str(e), fg=typer.colors.RED)
+            raise typer.Exit(code=e.exit_code) from e
+
+    if final_state is None:
+        # No daemon (for this repo root): run in-process.
+        from .runner import run_agent_goal
+
+        def on_event(raw: str, norm: NormalizedEvent | None) -> None:
+            if norm is not None and norm.text_delta:
+                on_delta(norm.text_delta)
 
-    rec.claude_session_id = final_state.get("claude_session_id")
-    sm.save(rec)
+        try:
+            final_state = run_agent_goal(repo_root=repo_root, on_event=on_event if stream else None, **params)
+        except ValueError as e:
+            typer.secho(str(e), fg=typer.colors.RED)
+            raise typer.Exit(code=2) from e
 
-    typer.echo(final_state.get("final_text", ""))
     run_dir = final_state.get("run_dir")
+    if stream:
+        typer.echo("")
+    elif run_dir and final_state.get("result_chars", 0) > len(final_state.get("final_text", "")):
+        # Large results only carry a preview; print the full text from the run.
+        with (Path(run_dir) / "result.txt").open(encoding="utf-8") as f:
+            for chunk in iter(lambda: f.read(1 << 16), ""):
+                typer.echo(chunk, nl=False)
+        typer.echo("")
+    else:
+        typer.echo(final_state.get("final_text", ""))
     if run_dir:
         typer.secho(f"Artifacts: {run_dir}", fg=typer.colors.GREEN)
 
 
+@app.command()
+def serve(
+    root: Path | None = typer.Option(
+        None,
+        "--root",
+        help="Repository root (defaults to auto-detect via pyproject.toml)",
+    ),
+    socket: Path | None = typer.Option(None, "--socket", help="Unix socket path (default: <root>/.cc3/daemon.sock)"),
+) -> None:
+    """Keep cc3 warm in a local daemon; `cc3 run` forwards to it when running."""
+
+    import signal
+
+    from .daemon import DaemonError
+    from .daemon import serve as serve_daemon
+
+    repo_root = (root.resolve() if root else find_repo_root())
+
+    def on_term(signum, frame) -> None:
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, on_term)
+
+    def ready(server) -> None:
+        typer.secho(f"cc3 daemon listening on {server.server_address}", fg=typer.colors.GREEN)
+
+    try:
+        serve_daemon(repo_root, socket, ready=ready)
+    except DaemonError as e:
+        typer.secho(str(e), fg=typer.colors.RED)
+        raise typer.Exit(code=2) from e
+    except KeyboardInterrupt:
+        pass
+
+
+@app.command()
+def profile(
+    run_id: str = typer.Argument(..., help="Run id (directory name under runs/)"),
+    agent: str | None = typer.Option(None, "--agent", "-a", help="Only look in workspaces/<agent>/runs"),
+    run_dir: Path | None = typer.Option(None, "--run-dir", help="Explicit run directory (skips lookup)"),
+    root: Path | None = typer.Option(
+        None,
+        "--root",
+        help="Repository root (defaults to auto-detect via pyproject.toml)",
+    ),
+    top_gaps: int = typer.Option(5, "--top-gaps", help="Show the N largest gaps between events"),
+) -> None:
+    """Render the phase timeline and tool_use -> tool_result gaps of a run."""
+
+    from .profile import find_run_dir, load_profile, render_profile
+
+    repo_root = (root.resolve() if root else find_repo_root())
+
+    rd = run_dir or find_run_dir(repo_root, run_id, agent=agent)
+    if rd is None or not rd.is_dir():
+        typer.secho(f"Run not found: {run_id}", fg=typer.colors.RED)
+        raise typer.Exit(code=2)
+
+    typer.echo(render_profile(load_profile(rd), top_gaps=top_gaps))
+
+
+@app.command()
+def events(
+    run_id: str = typer.Argument(..., help="Run id (directory name under runs/)"),
+    agent: str | None = typer.Option(None, "--agent", "-a", help="Only look in workspaces/<agent>/runs"),
+    run_dir: Path | None = typer.Option(None, "--run-dir", help="Explicit run directory (skips lookup)"),
+    root: Path | None = typer.Option(
+        None,
+        "--root",
+        help="Repository root (defaults to auto-detect via pyproject.toml)",
+    ),
+    normalized: bool = typer.Option(False, "--normalized", help="Export normalized records instead of raw lines"),
+    start: int = typer.Option(0, "--start", help="First sequence number"),
+    tail: int | None = typer.Option(None, "--tail", help="Only the last N events"),
+    out: Path | None = typer.Option(None, "--out", "-o", help="Write to a file instead of stdout"),
+) -> None:
+    """Export a run's stored events as NDJSON."""
+
+    from .event_store import RunReader
+    from .profile import find_run_dir
+
+    repo_root = (root.resolve() if root else find_repo_root())
+
+    rd = run_dir or find_run_dir(repo_root, run_id, agent=agent)
+    if rd is None or not RunReader.has_events(rd):
+        typer.secho(f"No events for run: {run_id}", fg=typer.colors.RED)
+        raise typer.Exit(code=2)
+
+    with RunReader(rd) as reader:
+        if tail is not None:
+            start = max(start, len(reader) - tail)
+        if out is None:
+            reader.export_ndjson(sys.stdout, normalized=normalized, start=start)
+        else:
+            with out.open("w", encoding="utf-8") as f:
+                n = reader.export_ndjson(f, normalized=normalized, start=start)
+            typer.secho(f"Wrote {n} events to {out}", fg=typer.colors.GREEN, err=True)
+
+
+@app.command()
+def tools(
+    agent: str | None = typer.Option(None, "--agent", "-a", help="Only runs of workspaces/<agent>/runs"),
+    root: Path | None = typer.Option(
+        None,
+        "--root",
+        help="Repository root (defaults to auto-detect via pyproject.toml)",
+    ),
+    top: int = typer.Option(10, "--top", help="Show the N slowest tool calls"),
+) -> None:
+    """Aggregate tool-call latency over runs: per-tool stats, slowest calls, tool vs model time."""
+
+    from .replay import iter_run_dirs
+    from .tools import load_run_tools, render_tools_report, tools_report
+
+    repo_root = (root.resolve() if root else find_repo_root())
+
+    report = tools_report((load_run_tools(rd) for rd in iter_run_dirs(repo_root, agent=agent)), top=top)
+    if report.runs == 0:
+        typer.secho("No runs found", fg=typer.colors.RED)
+        raise typer.Exit(code=2)
+    typer.echo(render_tools_report(report))
+
+
+@app.command()
+def replay(
+    run_ids: list[str] | None = typer.Argument(None, help="Run ids to replay (default: every recorded run)"),
+    agent: str | None = typer.Option(None, "--agent", "-a", help="Only look in workspaces/<agent>/runs"),
+    root: Path | None = typer.Option(
+        None,
+        "--root",
+        help="Repository root (defaults to auto-detect via pyproject.toml)",
+    ),
+    jobs: int | None = typer.Option(None, "--jobs", "-j", help="Worker processes (default: CPU count)"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Report changes without rewriting artifacts"),
+    report: Path | None = typer.Option(None, "--report", help="Write per-run field changes as NDJSON"),
+    speed: float | None = typer.Option(
+        None,
+        "--speed",
+        help="Instead of re-deriving, re-time each stream through the parser at this multiple of its recorded pace "
+        "(0 = as fast as possible)",
+    ),
+) -> None:
+    """Re-derive result.txt and stream-derived meta/step fields of recorded runs with the current normalizer."""
+
+    from .profile import find_run_dir
+    from .replay import iter_run_dirs, replay_runs, retime
+
+    repo_root = (root.resolve() if root else find_repo_root())
+
+    if run_ids:
+        run_dirs = []
+        for run_id in run_ids:
+            rd = find_run_dir(repo_root, run_id, agent=agent)
+            if rd is None:
+                typer.secho(f"Run not found: {run_id}", fg=typer.colors.RED)
+                raise typer.Exit(code=2)
+            run_dirs.append(rd)
+    else:
+        run_dirs = list(iter_run_dirs(repo_root, agent=agent))
+
+    if speed is not None:
+        for rd in run_dirs:
+            st = retime(rd, speed=speed)
+            typer.echo(
+                f"{rd.name}: {st.events} events, recorded {st.recorded_s}s, replayed {st.wall_s}s, "
+                f"lag p50 {st.lag_p50_ms}ms p95 {st.lag_p95_ms}ms max {st.lag_max_ms}ms"
+            )
+        return
+
+    changed = failed = 0
+    out = report.open("w", encoding="utf-8") if report else None
+    try:
+        for diff in replay_runs(run_dirs, jobs=jobs, write=not dry_run):
+            if diff.error:
+                failed += 1
+                typer.secho(f"{diff.run_dir}: {diff.error}", fg=typer.colors.YELLOW, err=True)
+            elif diff.changes:
+                changed += 1
+                typer.echo(f"{diff.run_dir}: {', '.join(sorted(diff.changes))}")
+            if out is not None and (diff.changes or diff.error):
+                rec = {
+                    "run_dir": str(diff.run_dir),
+                    "error": diff.error,
+                    "changes": {k: {"old": old, "new": new} for k, (old, new) in diff.changes.items()},
+                }
+                out.write(json.dumps(rec, ensure_ascii=True) + "\n")
+    finally:
+        if out is not None:
+            out.close()
+
+    verb = "would change" if dry_run else "changed"
+    typer.secho(f"{len(run_dirs)} runs replayed, {changed} {verb}, {failed} skipped", fg=typer.colors.GREEN, err=True)
+
+
+@app.command()
+def export(
+    out: Path = typer.Argument(..., help="Output directory (events/ and runs/ datasets)"),
+    agent: str | None = typer.Option(None, "--agent", "-a", help="Only export workspaces/<agent>/runs"),
+    root: Path | None = typer.Option(
+        None,
+        "--root",
+        help="Repository root (defaults to auto-detect via pyproject.toml)",
+    ),
+    fmt: str = typer.Option("parquet", "--format", help="parquet|arrow"),
+) -> None:
+    """Append finished runs not yet exported to columnar event and run tables."""
+
+    from .export import export_runs
+
+    repo_root = (root.resolve() if root else find_repo_root())
+
+    try:
+        stats = export_runs(repo_root, out, fmt=fmt, agent=agent)
+    except (RuntimeError, ValueError) as e:
+        typer.secho(str(e), fg=typer.colors.RED)
+        raise typer.Exit(code=2) from e
+
+    typer.secho(
+        f"Exported {stats.runs} runs ({stats.events} events) to {out}; {stats.skipped} already exported",
+        fg=typer.colors.GREEN,
+    )
+
+
 def main() -> None:
     # Entry point for console script.
     app()
@@ -5,8 +5,8 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
-import yaml
-
+from .budget import Budget, parse_budget
+from .endpoints import Endpoint, parse_endpoints
 from .paths import agent_dir
 
 
@@ -29,6 +29,31 @@ class AgentConfig:
     # Extra directories allowed for tool access (translated to repeated `--add-dir`).
     add_dirs: list[Path] = field(default_factory=list)
 
+    # Orchestrator planner; "identity" (one step == the goal) skips LangGraph.
+    planner: str = "identity"
+
+    # Transient failures (overload, rate limits, 5xx) are retried with
+    # jittered exponential backoff, resuming the session; see cc3.retry.
+    retry_max_attempts: int = 3
+    retry_base_delay_s: float = 1.0
+    retry_max_delay_s: float = 30.0
+
+    # Start a second, forked claude process when the first has produced no
+    # output after this agent's p95 time-to-first-event; the first to
+    # respond is kept and the other killed.
+    hedge: bool = False
+
+    # Gateways/keys to spread attempts over (empty: use .env as is); see cc3.endpoints.
+    endpoints: list[Endpoint] = field(default_factory=list)
+
+    # Roll a resumed claude session over to a fresh, summary-seeded one once
+    # its context (rollover.context_tokens of its latest run) reaches this
+    # many tokens; None never rolls over. See cc3.rollover.
+    session_max_tokens: int | None = None
+
+    # Token/cost budget over all users of this agent; enforced by the chat API.
+    budget: Budget = field(default_factory=Budget)
+
 
 def _as_str(v: Any) -> str | None:
     return v if isinstance(v, str) and v else None
@@ -42,6 +67,12 @@ def _as_path(v: Any, *, base: Path) -> Path | None:
     return (base / p).resolve() if not p.is_absolute() else p
 
 
+def _as_number(v: Any, default: float, *, minimum: float = 0) -> float:
+    if isinstance(v, bool) or not isinstance(v, (int, float)):
+        return default
+    return max(minimum, v)
+
+
 def _as_path_list(v: Any, *, base: Path) -> list[Path]:
     if not isinstance(v, list):
         return []
@@ -61,6 +92,8 @@ def load_agent_config(*, repo_root: Path, agent_id: str) -> AgentConfig:
 
     data: dict[str, Any] = {}
     if yaml_path.exists():
+        import yaml  # deferred: only agent.yaml loading needs it
+
         loaded = yaml.safe_load(yaml_path.read_text(encoding="utf-8"))
         if isinstance(loaded, dict):
             data = loaded
@@ -70,6 +103,18 @@ def load_agent_config(*, repo_root: Path, agent_id: str) -> AgentConfig:
     cfg.model = _as_str(data.get("model"))
     cfg.permission_mode = _as_str(data.get("permission_mode")) or cfg.permission_mode
     cfg.policy_preset = _as_str(data.get("policy_preset")) or cfg.policy_preset
+    cfg.planner = _as_str(data.get("planner")) or cfg.planner
+
+    retry = data.get("retry")
+    if isinstance(retry, dict):
+        cfg.retry_max_attempts = int(_as_number(retry.get("max_attempts"), cfg.retry_max_attempts, minimum=1))
+        cfg.retry_base_delay_s = _as_number(retry.get("base_delay_s"), cfg.retry_base_delay_s)
+        cfg.retry_max_delay_s = _as_number(retry.get("max_delay_s"), cfg.retry_max_delay_s)
+    cfg.hedge = data.get("hedge") is True
+    cfg.endpoints = parse_endpoints(data.get("endpoints"))
+    cfg.budget = parse_budget(data.get("budget"))
+    max_tokens = _as_number(data.get("session_max_tokens"), 0)
+    cfg.session_max_tokens = int(max_tokens) if max_tokens > 0 else None
 
     cfg.system_prompt_path = _as_path(data.get("system_prompt_path"), base=repo_root)
     cfg.append_system_prompt_path = _as_path(data.get("append_system_prompt_path"), base=repo_root)
@@ -0,0 +1,274 @@
+"""Local `cc3 serve` daemon and its thin client.
+
+The daemon listens on a Unix domain socket and keeps an
+`OrchestratorService` (agent profiles, executors, compiled graphs) warm
+across runs. Runs of the same
+agent are serialized in-process instead of contending on the workspace
+filelock.
+
+Protocol: the client sends one JSON request line per connection; the daemon
+answers with NDJSON messages:
+
+  {"type": "event", "kind": "delta", "text_delta": "..."}   live claude events
+  {"type": "result", ...}                                  final message
+  {"type": "error", "message": "...", "exit_code": 1}      final message
+
+Run requests carry the client's `repo_root`; a daemon serving another root
+answers with an error whose `code` is "repo_mismatch", and the client runs
+in-process instead.
+
+This module imports only the stdlib at module level so that `cc3 run` stays
+cheap when it just forwards to a running daemon.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import socketserver
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .events import NormalizedEvent
+
+SOCKET_ENV = "CC3_SOCKET"
+# Error code of a run request for a repo root the daemon does not serve.
+REPO_MISMATCH = "repo_mismatch"
+
+
+class DaemonUnavailable(Exception):
+    """No daemon is listening on the socket."""
+
+
+class DaemonRepoMismatch(DaemonUnavailable):
+    """The daemon on the socket serves another repo root."""
+
+
+class DaemonError(Exception):
+    def __init__(self, message: str, *, exit_code: int = 1):
+        super().__init__(message)
+        self.exit_code = exit_code
+
+
+def socket_path(repo_root: Path) -> Path:
+    env = os.environ.get(SOCKET_ENV)
+    return Path(env) if env else repo_root / ".cc3" / "daemon.sock"
+
+
+# ---------------------------------------------------------------- client
+
+
+def _connect(path: Path) -> socket.socket:
+    if not hasattr(socket, "AF_UNIX"):
+        raise DaemonUnavailable("unix domain sockets are not supported on this platform")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except (FileNotFoundError, ConnectionRefusedError) as e:
+        sock.close()
+        raise DaemonUnavailable(f"no daemon at {path}") from e
+    return sock
+
+
+def call(
+    path: Path,
+    request: dict[str, Any],
+    *,
+    on_message: Callable[[dict[str, Any]], None] | None = None,
+) -> dict[str, Any]:
+    """Send one request and return the final `result` message.
+
+    Raises `DaemonUnavailable` if nothing listens on `path` (or the daemon
+    serves another repo root) and `DaemonError` for other `error` replies.
+    """
+
+    with _connect(path) as sock:
+        sock.sendall((json.dumps(request, ensure_ascii=True) + "\n").encode("utf-8"))
+        with sock.makefile("r", encoding="utf-8") as f:
+            for line in f:
+                msg = json.loads(line)
+                kind = msg.get("type")
+                if kind == "result":
+                    return msg
+                if kind == "error":
+                    message = str(msg.get("message") or "daemon error")
+                    if msg.get("code") == REPO_MISMATCH:
+                        raise DaemonRepoMismatch(message)
+                    raise DaemonError(message, exit_code=int(msg.get("exit_code") or 1))
+                if on_message is not None:
+                    on_message(msg)
+    raise DaemonError("daemon closed the connection without a result")
+
+
+def ping(path: Path) -> bool:
+    try:
+        return call(path, {"op": "ping"}).get("type") == "result"
+    except (DaemonUnavailable, DaemonError, OSError):
+        return False
+
+
+def run_remote(
+    path: Path,
+    *,
+    repo_root: Path,
+    on_delta: Callable[[str], None] | None = None,
+    **params: Any,
+) -> dict[str, Any]:
+    """Run a goal on the daemon (same parameters as `runner.run_agent_goal`); returns the final state."""
+
+    def on_message(msg: dict[str, Any]) -> None:
+        if on_delta is not None and msg.get("text_delta"):
+            on_delta(msg["text_delta"])
+
+    request = {"op": "run", "repo_root": str(repo_root.resolve()), **params}
+    return call(path, request, on_message=on_message)["state"]
+
+
+# ---------------------------------------------------------------- server
+
+_RUN_PARAMS = ("agent", "goal", "mode", "resume", "fork", "timeout_s", "lock_timeout_s")
+
+
+class _WarmState:
+    """Objects reused across daemon connections."""
+
+    def __init__(self, repo_root: Path):
+        from .orchestrator.service import OrchestratorService
+
+        self.repo_root = repo_root
+        self.service = OrchestratorService(repo_root)
+        self._lock = threading.Lock()
+        self._agent_locks: dict[str, threading.Lock] = {}
+
+    def agent_lock(self, agent: str) -> threading.Lock:
+        with self._lock:
+            return self._agent_locks.setdefault(agent, threading.Lock())
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: _DaemonServer
+
+    def _send(self, msg: dict[str, Any]) -> bool:
+        try:
+            self.wfile.write((json.dumps(msg, ensure_ascii=True) + "\n").encode("utf-8"))
+            self.wfile.flush()
+            return True
+        except OSError:
+            return False
+
+    def handle(self) -> None:
+        try:
+            req = json.loads(self.rfile.readline())
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            self._send({"type": "error", "message": "invalid request", "exit_code": 2})
+            return
+        op = req.get("op") if isinstance(req, dict) else None
+        if op == "ping":
+            self._send({"type": "result", "pid": os.getpid(), "repo_root": str(self.server.warm.repo_root)})
+        elif op == "run":
+            self._run(req)
+        else:
+            self._send({"type": "error", "message": f"unknown op: {op!r}", "exit_code": 2})
+
+    def _run(self, req: dict[str, Any]) -> None:
+        from .runner import run_agent_goal
+
+        params = {k: req[k] for k in _RUN_PARAMS if req.get(k) is not None}
+        agent = params.get("agent")
+        if not isinstance(agent, str) or not isinstance(params.get("goal"), str):
+            self._send({"type": "error", "message": "run requires agent and goal", "exit_code": 2})
+            return
+
+        warm = self.server.warm
+        root = req.get("repo_root")
+        if not isinstance(root, str) or Path(root).resolve() != warm.repo_root.resolve():
+            self._send(
+                {
+                    "type": "error",
+                    "code": REPO_MISMATCH,
+                    "message": f"daemon serves {warm.repo_root}, not {root}",
+                    "exit_code": 2,
+                }
+            )
+            return
+        cancel_event = threading.Event()
+
+        def on_event(raw: str, norm: NormalizedEvent | None) -> None:
+            if norm is None:
+                return
+            msg: dict[str, Any] = {"type": "event", "kind": norm.kind}
+            if norm.text_delta:
+                msg["text_delta"] = norm.text_delta
+            if not self._send(msg):
+                # The client went away (e.g. Ctrl-C): stop claude.
+                cancel_event.set()
+
+        try:
+            with warm.agent_lock(agent):
+                state = run_agent_goal(
+                    repo_root=warm.repo_root,
+                    cfg=warm.service.profile(agent),
+                    executor=warm.service.executor(
+                        timeout_s=params.pop("timeout_s", None), lock_timeout_s=params.pop("lock_timeout_s", None)
+                    ),
+                    on_event=on_event,
+                    cancel_event=cancel_event,
+                    **params,
+                )
+        except ValueError as e:
+            self._send({"type": "error", "message": str(e), "exit_code": 2})
+            return
+        except Exception as e:
+            self._send({"type": "error", "message": f"{type(e).__name__}: {e}", "exit_code": 1})
+            return
+        self._send({"type": "result", "state": dict(state)})
+
+
+class _DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: Path, warm: _WarmState):
+        self.warm = warm
+        super().__init__(str(path), _Handler)
+
+
+def serve(
+    repo_root: Path,
+    path: Path | None = None,
+    *,
+    ready: Callable[[socketserver.BaseServer], None] | None = None,
+) -> None:
+    """Serve until interrupted (or `server.shutdown()` from `ready`'s argument).
+
+    Refuses to start if another daemon owns the socket.
+    """
+
+    path = path or socket_path(repo_root)
+    if ping(path):
+        raise DaemonError(f"a daemon is already listening on {path}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # A socket left behind by a daemon that died without cleaning up.
+    path.unlink(missing_ok=True)
+
+    # Pre-import what runs need (including LangGraph for non-identity
+    # planners) so the first request is as fast as the rest.
+    from . import runner  # noqa: F401
+    from .orchestrator import graph  # noqa: F401
+
+    warm = _WarmState(repo_root)
+    old_umask = os.umask(0o177)  # socket is owner-only: it runs agents on the caller's behalf
+    try:
+        server = _DaemonServer(path, warm)
+    finally:
+        os.umask(old_umask)
+    try:
+        if ready is not None:
+            ready(server)
+        server.serve_forever()
+    finally:
+        server.server_close()
+        path.unlink(missing_ok=True)
@@ -0,0 +1,228 @@
+"""Pools of API endpoints (gateway base URL + key) with health-aware routing.
+
+An agent may declare several endpoints in `agent.yaml`; every claude attempt
+is routed to one of them. `EndpointHealth` tracks each member process-wide:
+runs in flight, and a rolling window of recent outcomes (errors and
+time-to-first-event). A member is picked by least load relative to its
+weight, then by error rate and latency. A member that keeps failing is taken
+out of rotation by a circuit breaker: after a cooldown one probe run is let
+through, and its outcome closes the circuit or re-opens it for longer.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+# Outcomes kept per member.
+WINDOW = 20
+# Circuit breaking: open after this many consecutive failures, or once the
+# window holds at least MIN_SAMPLES outcomes and the error rate reaches
+# ERROR_RATE_OPEN.
+CONSECUTIVE_FAILURES_OPEN = 3
+MIN_SAMPLES = 5
+ERROR_RATE_OPEN = 0.5
+COOLDOWN_S = 10.0
+MAX_COOLDOWN_S = 300.0
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    name: str
+    base_url: str | None = None
+    # Name of the variable (in .env or the process env) holding the API key,
+    # so that keys stay out of agent.yaml.
+    api_key_env: str | None = None
+    # Relative share of runs when members are equally loaded.
+    weight: float = 1.0
+    # Extra variables for claude; they take precedence over .env and the process env.
+    env: Mapping[str, str] = field(default_factory=dict)
+
+    def apply(self, base: Mapping[str, str]) -> dict[str, str]:
+        """`base` with this endpoint's base URL, key and variables overlaid."""
+
+        out = dict(base)
+        if self.base_url:
+            out["ANTHROPIC_BASE_URL"] = self.base_url
+        if self.api_key_env:
+            key = base.get(self.api_key_env)
+            if key:
+                out["ANTHROPIC_API_KEY"] = key
+        out.update(self.env)
+        return out
+
+
+def parse_endpoints(v: Any) -> list[Endpoint]:
+    """The `endpoints:` list of agent.yaml; malformed entries are skipped."""
+
+    if not isinstance(v, list):
+        return []
+    out: list[Endpoint] = []
+    for i, item in enumerate(v):
+        if not isinstance(item, dict):
+            continue
+        env = item.get("env")
+        weight = item.get("weight", 1.0)
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight <= 0:
+            weight = 1.0
+        out.append(
+            Endpoint(
+                name=str(item.get("name") or item.get("base_url") or f"endpoint-{i}"),
+                base_url=item.get("base_url") if isinstance(item.get("base_url"), str) else None,
+                api_key_env=item.get("api_key_env") if isinstance(item.get("api_key_env"), str) else None,
+                weight=float(weight),
+                env={str(k): str(val) for k, val in env.items()} if isinstance(env, dict) else {},
+            )
+        )
+    return out
+
+
+class _Member:
+    def __init__(self) -> None:
+        self.in_flight = 0
+        # (ok, time-to-first-event seconds or None)
+        self.window: deque[tuple[bool, float | None]] = deque(maxlen=WINDOW)
+        self.consecutive_failures = 0
+        self.open_until: float | None = None
+        self.cooldown_s = COOLDOWN_S
+        # Half-open: the single probe run is in flight.
+        self.probing = False
+
+    def error_rate(self) -> float:
+        if not self.window:
+            return 0.0
+        return sum(1 for ok, _ in self.window if not ok) / len(self.window)
+
+    def latency_s(self) -> float:
+        samples = sorted(t for _, t in self.window if t is not None)
+        return samples[len(samples) // 2] if samples else 0.0
+
+
+@dataclass(frozen=True)
+class MemberStats:
+    name: str
+    in_flight: int
+    error_rate: float
+    latency_s: float
+    state: str  # closed / open / half_open
+
+
+class Lease:
+    """One attempt's claim on an endpoint; report its outcome with `release`."""
+
+    def __init__(self, health: EndpointHealth, endpoint: Endpoint, *, probe: bool):
+        self.endpoint = endpoint
+        self._health = health
+        self._probe = probe
+        self._released = False
+
+    def release(self, ok: bool | None = None, *, ttfe_s: float | None = None) -> None:
+        """Give the endpoint back; `ok=None` records no outcome (e.g. cancelled)."""
+
+        if self._released:
+            return
+        self._released = True
+        self._health._release(self.endpoint, ok, ttfe_s, probe=self._probe)
+
+
+class EndpointHealth:
+    """Process-wide load and health of endpoints, keyed by name and base URL."""
+
+    def __init__(self, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._members: dict[tuple[str, str | None], _Member] = {}
+
+    def _member(self, ep: Endpoint) -> _Member:
+        return self._members.setdefault((ep.name, ep.base_url), _Member())
+
+    def acquire(self, pool: list[Endpoint], *, avoid: Endpoint | None = None) -> Lease:
+        """Lease the best member of `pool` (which must not be empty).
+
+        `avoid` (e.g. the member the other side of a hedge runs on) is only
+        used when nothing else is available. When every circuit is open, the
+        member closest to its next probe is used rather than failing the run.
+        """
+
+        if not pool:
+            raise ValueError("empty endpoint pool")
+        with self._lock:
+            now = self._clock()
+            candidates: list[tuple[tuple[float, ...], Endpoint, bool]] = []
+            for ep in pool:
+                m = self._member(ep)
+                probe = False
+                if m.open_until is not None:
+                    if now < m.open_until or m.probing:
+                        continue
+                    probe = True
+                score = (
+                    1.0 if ep == avoid else 0.0,
+                    (m.in_flight + 1) / ep.weight,
+                    m.error_rate(),
+                    m.latency_s(),
+                )
+                candidates.append((score, ep, probe))
+            if candidates:
+                _, ep, probe = min(candidates, key=lambda c: c[0])
+            else:
+                ep = min(pool, key=lambda e: self._member(e).open_until or 0.0)
+                probe = False
+            m = self._member(ep)
+            m.in_flight += 1
+            if probe:
+                m.probing = True
+        return Lease(self, ep, probe=probe)
+
+    def _release(self, ep: Endpoint, ok: bool | None, ttfe_s: float | None, *, probe: bool) -> None:
+        with self._lock:
+            m = self._member(ep)
+            m.in_flight -= 1
+            if probe:
+                m.probing = False
+            if ok is None:
+                return
+            m.window.append((ok, ttfe_s))
+            if ok:
+                m.consecutive_failures = 0
+                if probe:
+                    m.open_until = None
+                    m.cooldown_s = COOLDOWN_S
+                    # Start the closed circuit from a clean slate.
+                    m.window.clear()
+                    m.window.append((ok, ttfe_s))
+                return
+            m.consecutive_failures += 1
+            if probe:
+                m.cooldown_s = min(MAX_COOLDOWN_S, m.cooldown_s * 2)
+                m.open_until = self._clock() + m.cooldown_s
+            elif m.open_until is None and (
+                m.consecutive_failures >= CONSECUTIVE_FAILURES_OPEN
+                or (len(m.window) >= MIN_SAMPLES and m.error_rate() >= ERROR_RATE_OPEN)
+            ):
+                m.open_until = self._clock() + m.cooldown_s
+
+    def stats(self, pool: list[Endpoint]) -> list[MemberStats]:
+        with self._lock:
+            now = self._clock()
+            out = []
+            for ep in pool:
+                m = self._member(ep)
+                if m.open_until is None:
+                    state = "closed"
+                else:
+                    state = "open" if now < m.open_until else "half_open"
+                out.append(
+                    MemberStats(
+                        name=ep.name,
+                        in_flight=m.in_flight,
+                        error_rate=m.error_rate(),
+                        latency_s=m.latency_s(),
+                        state=state,
+                    )
+                )
+            return out
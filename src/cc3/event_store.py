@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+import zlib
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, TextIO
+
+from .events import NormalizedEvent, normalize_event
+
+# Per-run event store:
+#
+#   events.bin  records: <u32 payload length><u8 flags><payload>, payload is
+#               the raw stream-json line as UTF-8 (zlib-compressed if FLAG_ZLIB)
+#   events.idx  one <u64 record offset><f64 receive time ms> entry per record
+#
+# The writer appends the record before its index entry, so readers treat the
+# index as authoritative: event #seq is visible once its entry is complete.
+EVENTS_FILE = "events.bin"
+INDEX_FILE = "events.idx"
+# Pre-store runs wrote one JSON line per event (+ optional receive-time sidecar).
+LEGACY_EVENTS_FILE = "events.ndjson"
+LEGACY_TS_FILE = "events_ts.ndjson"
+
+FLAG_ZLIB = 0x01
+FLAG_PARSE_ERROR = 0x02
+
+_HEADER = struct.Struct("<IB")
+_ENTRY = struct.Struct("<Qd")
+
+# Lines at least this long are compressed when that actually saves space.
+DEFAULT_COMPRESS_MIN_BYTES = 2048
+
+
+@dataclass(frozen=True)
+class StoredEvent:
+    seq: int
+    # Monotonic ms since the run started when the line was received.
+    t_ms: float
+    raw: str
+    parse_error: bool = False
+
+    def obj(self) -> dict[str, Any] | None:
+        if self.parse_error:
+            return None
+        try:
+            obj = json.loads(self.raw)
+        except json.JSONDecodeError:
+            return None
+        return obj if isinstance(obj, dict) else None
+
+    def normalized(self) -> NormalizedEvent | None:
+        """Normalized view, computed on demand (None for unparseable lines)."""
+
+        obj = self.obj()
+        return normalize_event(obj) if obj is not None else None
+
+    @property
+    def kind(self) -> str:
+        norm = self.normalized()
+        return norm.kind if norm is not None else "parse_error"
+
+    def norm_dict(self) -> dict[str, Any]:
+        """The compact normalized record (formerly a line of events_norm.ndjson)."""
+
+        norm = self.normalized()
+        if norm is None:
+            return {"kind": "parse_error", "raw": self.raw}
+        return {
+            "kind": norm.kind,
+            "session_id": norm.session_id,
+            "text_delta": norm.text_delta,
+            "result_text": norm.result_text,
+            "api_key_source": norm.api_key_source,
+        }
+
+
+class EventWriter:
+    """Appends events of one run; a single writer per run."""
+
+    def __init__(self, run_dir: Path, *, compress_min_bytes: int = DEFAULT_COMPRESS_MIN_BYTES):
+        self._compress_min = compress_min_bytes
+        self._bin = (run_dir / EVENTS_FILE).open("wb")
+        self._idx = (run_dir / INDEX_FILE).open("wb")
+        self._offset = 0
+        self.count = 0
+
+    def append(self, raw: str, *, t_ms: float, parse_error: bool = False) -> int:
+        """Persist one raw line and return its sequence number."""
+
+        payload = raw.encode("utf-8")
+        flags = FLAG_PARSE_ERROR if parse_error else 0
+        if self._compress_min and len(payload) >= self._compress_min:
+            packed = zlib.compress(payload, 1)
+            if len(packed) < len(payload):
+                payload, flags = packed, flags | FLAG_ZLIB
+
+        self._bin.write(_HEADER.pack(len(payload), flags))
+        self._bin.write(payload)
+        self._bin.flush()
+        # Publish only after the record itself is on disk (see module comment).
+        self._idx.write(_ENTRY.pack(self._offset, t_ms))
+        self._idx.flush()
+
+        self._offset += _HEADER.size + len(payload)
+        seq = self.count
+        self.count += 1
+        return seq
+
+    def close(self) -> None:
+        self._bin.close()
+        self._idx.close()
+
+    def __enter__(self) -> EventWriter:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class RunReader:
+    """Random access to a run's events by sequence number.
+
+    Safe to use while the run is still being written: `len()` and the read
+    methods always reflect the events published so far. Runs recorded before
+    the store existed are read from their `events.ndjson`.
+    """
+
+    def __init__(self, run_dir: Path):
+        self.run_dir = run_dir
+        self._bin_fd: int | None = None
+        self._idx_fd: int | None = None
+        self._legacy: _LegacyEvents | None = None
+        if not (run_dir / INDEX_FILE).exists() and (run_dir / LEGACY_EVENTS_FILE).exists():
+            self._legacy = _LegacyEvents(run_dir)
+
+    @staticmethod
+    def has_events(run_dir: Path) -> bool:
+        return (run_dir / INDEX_FILE).exists() or (run_dir / LEGACY_EVENTS_FILE).exists()
+
+    def _fds(self) -> tuple[int, int] | None:
+        if self._idx_fd is None:
+            try:
+                self._idx_fd = os.open(self.run_dir / INDEX_FILE, os.O_RDONLY)
+            except FileNotFoundError:
+                return None
+            self._bin_fd = os.open(self.run_dir / EVENTS_FILE, os.O_RDONLY)
+        assert self._bin_fd is not None
+        return self._bin_fd, self._idx_fd
+
+    def __len__(self) -> int:
+        if self._legacy is not None:
+            return self._legacy.refresh()
+        fds = self._fds()
+        if fds is None:
+            return 0
+        return os.fstat(fds[1]).st_size // _ENTRY.size
+
+    def __getitem__(self, seq: int) -> StoredEvent:
+        n = len(self)
+        if seq < 0:
+            seq += n
+        if not 0 <= seq < n:
+            raise IndexError(f"event {seq} out of range (run has {n})")
+        return next(self.read(seq, seq + 1))
+
+    def read(self, start: int = 0, stop: int | None = None) -> Iterator[StoredEvent]:
+        """Events with start <= seq < stop (stop defaults to the current end)."""
+
+        n = len(self)
+        stop = n if stop is None else min(stop, n)
+        if start >= stop:
+            return
+        if self._legacy is not None:
+            yield from self._legacy.events[start:stop]
+            return
+
+        fds = self._fds()
+        assert fds is not None
+        bin_fd, idx_fd = fds
+        idx = os.pread(idx_fd, (stop - start) * _ENTRY.size, start * _ENTRY.size)
+        entries = list(_ENTRY.iter_unpack(idx))
+
+        # One read covering the whole contiguous span of records.
+        first = entries[0][0]
+        last = entries[-1][0]
+        last_len, _ = _HEADER.unpack(os.pread(bin_fd, _HEADER.size, last))
+        blob = os.pread(bin_fd, last + _HEADER.size + last_len - first, first)
+
+        for i, (offset, t_ms) in enumerate(entries):
+            pos = offset - first
+            length, flags = _HEADER.unpack_from(blob, pos)
+            payload = blob[pos + _HEADER.size : pos + _HEADER.size + length]
+            if flags & FLAG_ZLIB:
+                payload = zlib.decompress(payload)
+            yield StoredEvent(
+                seq=start + i,
+                t_ms=t_ms,
+                raw=payload.decode("utf-8", errors="replace"),
+                parse_error=bool(flags & FLAG_PARSE_ERROR),
+            )
+
+    def __iter__(self) -> Iterator[StoredEvent]:
+        return self.read()
+
+    def tail(self, k: int) -> list[StoredEvent]:
+        n = len(self)
+        return list(self.read(max(0, n - k), n))
+
+    def normalized(self, start: int = 0, stop: int | None = None) -> Iterator[tuple[int, NormalizedEvent | None]]:
+        for ev in self.read(start, stop):
+            yield ev.seq, ev.normalized()
+
+    def export_ndjson(self, out: TextIO, *, normalized: bool = False, start: int = 0, stop: int | None = None) -> int:
+        """Write events as NDJSON (raw lines, or normalized records); returns the count."""
+
+        n = 0
+        for ev in self.read(start, stop):
+            out.write(json.dumps(ev.norm_dict(), ensure_ascii=True) if normalized else ev.raw)
+            out.write("\n")
+            n += 1
+        return n
+
+    def close(self) -> None:
+        for fd in (self._bin_fd, self._idx_fd):
+            if fd is not None:
+                os.close(fd)
+        self._bin_fd = self._idx_fd = None
+
+    def __enter__(self) -> RunReader:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class _LegacyEvents:
+    """Incrementally loaded `events.ndjson` (+ `events_ts.ndjson` when present)."""
+
+    def __init__(self, run_dir: Path):
+        self._path = run_dir / LEGACY_EVENTS_FILE
+        self._offset = 0
+        self.events: list[StoredEvent] = []
+        self._stamps: dict[int, float] = {}
+        ts_path = run_dir / LEGACY_TS_FILE
+        if ts_path.exists():
+            for line in ts_path.read_text(encoding="utf-8").splitlines():
+                try:
+                    stamp = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(stamp, dict) and isinstance(stamp.get("seq"), int):
+                    self._stamps[stamp["seq"]] = float(stamp.get("t_ms") or 0.0)
+
+    def refresh(self) -> int:
+        with self._path.open("rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                # A line without "\n" is still being written.
+                if not line.endswith(b"\n"):
+                    break
+                self._offset += len(line)
+                raw = line.decode("utf-8", errors="replace").rstrip("\r\n")
+                if not raw:
+                    continue
+                seq = len(self.events)
+                ev = StoredEvent(seq=seq, t_ms=self._stamps.get(seq, 0.0), raw=raw)
+                if ev.obj() is None:
+                    ev = StoredEvent(seq=seq, t_ms=ev.t_ms, raw=raw, parse_error=True)
+                self.events.append(ev)
+        return len(self.events)
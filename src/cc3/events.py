@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import json
 from collections.abc import Iterable
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from typing import Any
 
+from .retry import RETRY_EVENT_TYPE
+
 
 def _walk(obj: Any) -> Iterable[Any]:
     """Yield all nested dict/list nodes (including obj itself)."""
@@ -79,11 +82,120 @@ def extract_skills(obj: dict[str, Any]) -> list[str] | None:
     return None
 
 
+def _json_size(v: Any) -> int:
+    if isinstance(v, str):
+        return len(v.encode("utf-8"))
+    return len(json.dumps(v, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+@dataclass(frozen=True)
+class ToolEvent:
+    """A `tool_use` or `tool_result` content block."""
+
+    kind: str  # "use" or "result"
+    tool_use_id: str
+    # tool_use only.
+    name: str | None = None
+    # Size of the tool input (use) or of the returned content (result), in bytes.
+    size_bytes: int = 0
+    # tool_result only.
+    is_error: bool | None = None
+
+
+def extract_tool_events(obj: dict[str, Any]) -> list[ToolEvent]:
+    """Every tool_use / tool_result block of an event, in no particular order."""
+
+    out: list[ToolEvent] = []
+    for node in _walk(obj):
+        if not isinstance(node, dict):
+            continue
+        t = node.get("type")
+        if t == "tool_use":
+            tid = node.get("id")
+            if isinstance(tid, str) and tid:
+                name = node.get("name")
+                out.append(
+                    ToolEvent(
+                        kind="use",
+                        tool_use_id=tid,
+                        name=name if isinstance(name, str) else "",
+                        size_bytes=_json_size(node.get("input", {})),
+                    )
+                )
+        elif t == "tool_result":
+            tid = node.get("tool_use_id")
+            if isinstance(tid, str) and tid:
+                content = node.get("content")
+                out.append(
+                    ToolEvent(
+                        kind="result",
+                        tool_use_id=tid,
+                        size_bytes=_json_size(content) if content is not None else 0,
+                        is_error=node.get("is_error") is True,
+                    )
+                )
+    return out
+
+
+@dataclass(frozen=True)
+class Usage:
+    """Token and cost figures of a claude invocation (from its result event)."""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cost_usd: float = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return (
+            self.input_tokens + self.output_tokens + self.cache_creation_input_tokens + self.cache_read_input_tokens
+        )
+
+    def __add__(self, other: Usage) -> Usage:
+        return Usage(
+            input_tokens=self.input_tokens + other.input_tokens,
+            output_tokens=self.output_tokens + other.output_tokens,
+            cache_creation_input_tokens=self.cache_creation_input_tokens + other.cache_creation_input_tokens,
+            cache_read_input_tokens=self.cache_read_input_tokens + other.cache_read_input_tokens,
+            cost_usd=self.cost_usd + other.cost_usd,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**asdict(self), "total_tokens": self.total_tokens}
+
+
+def _count(v: Any) -> int:
+    return v if isinstance(v, int) and not isinstance(v, bool) and v > 0 else 0
+
+
+def extract_usage(obj: dict[str, Any]) -> Usage | None:
+    """Usage of a result event: its `usage` block and `total_cost_usd`."""
+
+    u = obj.get("usage")
+    cost = obj.get("total_cost_usd", obj.get("cost_usd"))
+    has_cost = isinstance(cost, (int, float)) and not isinstance(cost, bool)
+    if not isinstance(u, dict) and not has_cost:
+        return None
+    u = u if isinstance(u, dict) else {}
+    return Usage(
+        input_tokens=_count(u.get("input_tokens")),
+        output_tokens=_count(u.get("output_tokens")),
+        cache_creation_input_tokens=_count(u.get("cache_creation_input_tokens")),
+        cache_read_input_tokens=_count(u.get("cache_read_input_tokens")),
+        cost_usd=max(0.0, float(cost)) if has_cost else 0.0,
+    )
+
+
 def guess_event_kind(obj: dict[str, Any]) -> str:
     # Best-effort classification for internal use.
     t = obj.get("type")
     if isinstance(t, str):
         low = t.lower()
+        if low == RETRY_EVENT_TYPE:
+            # Marker the executor stores before retrying a failed attempt.
+            return "retry"
         if "init" in low:
             return "init"
         if "result" in low:
@@ -117,6 +229,7 @@ class NormalizedEvent:
     result_text: str | None
     api_key_source: str | None
     raw: dict[str, Any]
+    usage: Usage | None = None
 
 
 def normalize_event(obj: dict[str, Any]) -> NormalizedEvent:
@@ -128,4 +241,5 @@ def normalize_event(obj: dict[str, Any]) -> NormalizedEvent:
         result_text=extract_result_text(obj) if kind == "result" else None,
         api_key_source=extract_api_key_source(obj) if kind == "init" else None,
         raw=obj,
+        usage=extract_usage(obj) if kind == "result" else None,
     )
@@ -1,19 +1,34 @@
 from __future__ import annotations
 
 import json
+import os
 import secrets
+import signal
 import subprocess
 import threading
-from dataclasses import dataclass
+import time
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import UTC, datetime
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, TextIO
 
-from .claude_cmd import build_claude_argv
+from . import metrics
+from .claude_cmd import ClaudeInvocation, build_claude_argv
 from .config import AgentConfig, env_for_claude, load_dotenv, merge_env
-from .events import normalize_event
-from .locking import acquire_workspace_lock
+from .endpoints import EndpointHealth, Lease
+from .event_store import EventWriter
+from .events import NormalizedEvent, Usage, normalize_event
+from .locking import LockHandle, acquire_workspace_lock
+from .prompts import PromptFiles
+from .retry import RETRY_EVENT_TYPE, Failure, RetryPolicy, classify_failure
 from .stream_parser import iter_stream_json_lines
+from .tools import ToolTracker, run_tools, write_tools_json
+
+
+# Called from the stdout reader thread for every event: (raw line, normalized
+# event or None for unparseable lines).
+EventCallback = Callable[[str, NormalizedEvent | None], None]
 
 
 @dataclass(frozen=True)
@@ -28,8 +43,273 @@ class ExecutionResult:
 
     api_key_source: str | None
 
+    # The full result, or only its first RESULT_PREVIEW_CHARS when it is
+    # longer than RESULT_INLINE_MAX_CHARS; result.txt always holds all of it.
     final_text: str
 
+    cancelled: bool = False
+    # Number of claude attempts (> 1 after transient-failure retries).
+    attempts: int = 1
+    # Tokens and cost summed over all attempts; None if claude reported none.
+    usage: Usage | None = None
+    # Length of the full result in characters.
+    result_chars: int = 0
+
+    @property
+    def final_text_truncated(self) -> bool:
+        return self.result_chars > len(self.final_text)
+
+
+@dataclass
+class _LiveRun:
+    cancel_event: threading.Event
+    # Current claude processes (two while a hedge races the original).
+    procs: list[subprocess.Popen[str]] = field(default_factory=list)
+
+
+class _ProcessRegistry:
+    """Process-wide registry of live claude runs keyed by run_id."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._runs: dict[str, _LiveRun] = {}
+
+    def register(self, run_id: str, cancel_event: threading.Event) -> _LiveRun:
+        with self._lock:
+            live = _LiveRun(cancel_event=cancel_event)
+            self._runs[run_id] = live
+            return live
+
+    def attach(self, live: _LiveRun, proc: subprocess.Popen[str]) -> None:
+        with self._lock:
+            live.procs.append(proc)
+        # A cancel that raced with spawning saw no process; honor it here.
+        if live.cancel_event.is_set():
+            _kill_process_group(proc)
+
+    def detach(self, live: _LiveRun, proc: subprocess.Popen[str]) -> None:
+        with self._lock:
+            if proc in live.procs:
+                live.procs.remove(proc)
+
+    def unregister(self, run_id: str, live: _LiveRun) -> None:
+        with self._lock:
+            if self._runs.get(run_id) is live:
+                del self._runs[run_id]
+
+    def cancel(self, run_id: str) -> bool:
+        with self._lock:
+            live = self._runs.get(run_id)
+            if live is None:
+                return False
+            live.cancel_event.set()
+            procs = list(live.procs)
+        for proc in procs:
+            _kill_process_group(proc)
+        return True
+
+    def live_run_ids(self) -> list[str]:
+        with self._lock:
+            return list(self._runs)
+
+
+# Popen.returncode of a SIGKILLed child; also used for runs cancelled before spawn.
+_KILLED_EXIT_CODE = -9
+
+_WAIT_SLICE_S = 0.25
+
+
+def _poll(proc: subprocess.Popen[str]) -> int | None:
+    try:
+        return proc.wait(timeout=0)
+    except subprocess.TimeoutExpired:
+        return None
+
+
+def _kill_process_group(proc: subprocess.Popen[str]) -> None:
+    """Kill claude together with any tool subprocesses it spawned."""
+
+    if os.name == "posix":
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+            return
+        except (ProcessLookupError, PermissionError):
+            pass
+    try:
+        proc.kill()
+    except ProcessLookupError:
+        pass
+
+
+# Phase marks recorded in meta.json `phases_ms`, in their expected order.
+RUN_PHASES = (
+    "lock_acquired",
+    "spawned",
+    "first_byte",
+    "init",
+    "first_delta",
+    "result",
+    "exit",
+    "artifacts_written",
+)
+
+
+class _PhaseClock:
+    """Monotonic phase marks (ms) relative to the start of `execute`."""
+
+    def __init__(self) -> None:
+        self._t0 = time.monotonic()
+        self._lock = threading.Lock()
+        self.marks: dict[str, float] = {}
+
+    def elapsed_ms(self) -> float:
+        return round((time.monotonic() - self._t0) * 1000, 3)
+
+    def mark(self, phase: str) -> float:
+        # First occurrence wins (e.g. the first `result`).
+        with self._lock:
+            return self.marks.setdefault(phase, self.elapsed_ms())
+
+    def since(self, phase: str) -> float | None:
+        with self._lock:
+            t = self.marks.get(phase)
+        return None if t is None else (self.elapsed_ms() - t) / 1000
+
+
+# Results longer than this are not held in memory: text deltas spill to a file
+# as they arrive, and ExecutionResult.final_text carries a preview only.
+RESULT_INLINE_MAX_CHARS = 64 * 1024
+RESULT_PREVIEW_CHARS = 4 * 1024
+
+
+class _DeltaSpool:
+    """Concatenated text deltas, kept in memory until they exceed RESULT_INLINE_MAX_CHARS."""
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._parts: list[str] = []
+        self._file: TextIO | None = None
+        self.chars = 0
+
+    def append(self, text: str) -> None:
+        self.chars += len(text)
+        if self._file is not None:
+            self._file.write(text)
+            return
+        self._parts.append(text)
+        if self.chars > RESULT_INLINE_MAX_CHARS:
+            self._file = self._path.open("w", encoding="utf-8")
+            self._file.write("".join(self._parts))
+            self._parts = []
+
+    def finish(self, dest: Path) -> str:
+        """Write the text to `dest`; returns it whole, or its preview if it was spilled."""
+
+        if self._file is None:
+            text = "".join(self._parts)
+            dest.write_text(text, encoding="utf-8")
+            return text
+        self._file.close()
+        os.replace(self._path, dest)
+        with dest.open(encoding="utf-8") as f:
+            return f.read(RESULT_PREVIEW_CHARS)
+
+    def discard(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._path.unlink(missing_ok=True)
+        self._parts = []
+
+
+# Hedging needs a latency baseline before it can fire.
+HEDGE_MIN_SAMPLES = 20
+
+
+class _TtfeHistory:
+    """Recent time-to-first-event samples per agent (process-wide)."""
+
+    def __init__(self, maxlen: int = 200) -> None:
+        self._lock = threading.Lock()
+        self._maxlen = maxlen
+        self._samples: dict[str, deque[float]] = {}
+
+    def add(self, agent_id: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(agent_id, deque(maxlen=self._maxlen)).append(seconds)
+
+    def p95(self, agent_id: str) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples.get(agent_id, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+class _Race:
+    """The first process to emit a line owns the attempt; the others are killed."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._spawned: list[tuple[subprocess.Popen[str], float]] = []
+        self.winner: subprocess.Popen[str] | None = None
+        self.ttfe_s: float | None = None
+
+    def add(self, proc: subprocess.Popen[str]) -> None:
+        with self._lock:
+            self._spawned.append((proc, time.monotonic()))
+
+    def index(self, proc: subprocess.Popen[str] | None) -> int | None:
+        with self._lock:
+            return next((i for i, (p, _) in enumerate(self._spawned) if p is proc), None)
+
+    def claim(self, proc: subprocess.Popen[str]) -> bool:
+        winner = self.winner
+        if winner is not None:
+            return winner is proc
+        with self._lock:
+            if self.winner is not None:
+                return self.winner is proc
+            self.winner = proc
+            self.ttfe_s = time.monotonic() - next(t for p, t in self._spawned if p is proc)
+            losers = [p for p, _ in self._spawned if p is not proc]
+        for p in losers:
+            _kill_process_group(p)
+        return True
+
+
+class _AttemptState:
+    """What the stdout reader learned during one attempt."""
+
+    def __init__(self, session_id: str | None, spool_path: Path) -> None:
+        self.lock = threading.Lock()
+        self.session_id_after = session_id
+        self.api_key_source: str | None = None
+        self.deltas = _DeltaSpool(spool_path)
+        self.result_text: str | None = None
+        # Error events and error results, for retry classification.
+        self.errors: list[str] = []
+        self.usage: Usage | None = None
+
+    def write_result(self, path: Path) -> tuple[str, int]:
+        """Write the attempt's result to `path`: (text or its preview, length in characters)."""
+
+        with self.lock:
+            if self.result_text is not None:
+                self.deltas.discard()
+                path.write_text(self.result_text, encoding="utf-8")
+                return self.result_text, len(self.result_text)
+            return self.deltas.finish(path), self.deltas.chars
+
+
+@dataclass(frozen=True)
+class _AttemptOutcome:
+    exit_code: int
+    timed_out: bool
+    # Index of the process that produced the output (0 = original, 1 = hedge).
+    winner: int | None
+    hedged: bool
+    ttfe_s: float | None
+
 
 def _now_utc() -> datetime:
     return datetime.now(UTC)
@@ -46,18 +326,44 @@ def _read_text_file(path: Path) -> str | None:
     return path.read_text(encoding="utf-8")
 
 
-def _jsonl_write(path: Path, obj: Any) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=True))
-        f.write("\n")
-
-
 class ClaudeCliExecutor:
+    # Shared across instances: servers build a fresh executor per run, but
+    # cancellation must reach any live process by run_id.
+    _registry = _ProcessRegistry()
+    _ttfe = _TtfeHistory()
+    _endpoints = EndpointHealth()
+
     def __init__(self, *, repo_root: Path, timeout_s: float = 600.0, lock_timeout_s: float = 30.0):
         self._repo_root = repo_root
         self._timeout_s = timeout_s
         self._lock_timeout_s = lock_timeout_s
+        self._prompts = PromptFiles(repo_root / ".cc3" / "prompts")
+
+    def cancel(self, run_id: str) -> bool:
+        """Cancel a live run: kill its process group and let `execute` finish.
+
+        `execute` still drains stdout, writes artifacts (with `cancelled: true`)
+        and releases the workspace lock. Returns False if no such run is live.
+        """
+
+        return self._registry.cancel(run_id)
+
+    @classmethod
+    def live_run_ids(cls) -> list[str]:
+        return cls._registry.live_run_ids()
+
+    def _acquire_lock(self, workspace: Path, cancel_event: threading.Event) -> LockHandle | None:
+        # Poll in short slices so a cancel while queued on the lock frees the
+        # caller immediately instead of after `lock_timeout_s`.
+        deadline = time.monotonic() + self._lock_timeout_s
+        while not cancel_event.is_set():
+            remaining = deadline - time.monotonic()
+            try:
+                return acquire_workspace_lock(workspace, timeout_s=max(0.0, min(0.1, remaining)))
+            except TimeoutError:
+                if remaining <= 0.1:
+                    raise
+        return None
 
     def execute(
         self,
@@ -69,11 +375,19 @@ class ClaudeCliExecutor:
         fork: bool = False,
         run_id: str | None = None,
         run_dir: Path | None = None,
+        cancel_event: threading.Event | None = None,
+        on_event: EventCallback | None = None,
     ) -> ExecutionResult:
         """Execute one Claude Code CLI run.
 
         `run_id`/`run_dir` can be provided by the caller (e.g. a web server) so that
-        clients can subscribe to artifacts immediately (SSE tailing `events.ndjson`).
+        clients can subscribe to artifacts immediately (SSE tailing the event store).
+
+        `cancel_event` lets the caller cancel a run before it is registered
+        (e.g. while still waiting to be dispatched); see `cancel`.
+
+        `on_event` observes events live; a callback that raises is dropped for
+        the rest of the run rather than failing it.
         """
 
         if run_id is None and run_dir is None:
@@ -89,16 +403,14 @@ class ClaudeCliExecutor:
 
         run_dir.mkdir(parents=True, exist_ok=True)
 
-        events_path = run_dir / "events.ndjson"
-        norm_events_path = run_dir / "events_norm.ndjson"
         stderr_path = run_dir / "stderr.log"
         meta_path = run_dir / "meta.json"
         result_path = run_dir / "result.txt"
         step_path = run_dir / "step.json"
 
-        system_prompt = _read_text_file(cfg.system_prompt_path) if cfg.system_prompt_path else None
+        system_prompt = self._prompts.render(cfg.system_prompt_path) if cfg.system_prompt_path else None
         append_system_prompt = (
-            _read_text_file(cfg.append_system_prompt_path) if cfg.append_system_prompt_path else None
+            self._prompts.render(cfg.append_system_prompt_path) if cfg.append_system_prompt_path else None
         )
 
         add_dirs = [
@@ -115,15 +427,18 @@ class ClaudeCliExecutor:
         if jm_skill_dir.exists():
             add_dirs.append(jm_skill_dir)
 
-        invocation = build_claude_argv(
-            prompt=instruction,
-            cfg=cfg,
-            resume=session_id,
-            fork=fork,
-            add_dirs=add_dirs,
-            system_prompt=system_prompt,
-            append_system_prompt=append_system_prompt,
-        )
+        def invocation_for(resume: str | None, fork_: bool) -> ClaudeInvocation:
+            return build_claude_argv(
+                prompt=instruction,
+                cfg=cfg,
+                resume=resume,
+                fork=fork_,
+                add_dirs=add_dirs,
+                system_prompt_file=system_prompt.path if system_prompt else None,
+                append_system_prompt_file=append_system_prompt.path if append_system_prompt else None,
+            )
+
+        invocation = invocation_for(session_id, fork)
 
         # Provide Anthropic/Claude auth via env vars. We support both a repo-root
         # `.env` (shared across workspaces) and a per-workspace `.env` override.
@@ -132,108 +447,212 @@ class ClaudeCliExecutor:
         dotenv = merge_env(dotenv_repo, dotenv_ws)
         env = env_for_claude(dotenv=dotenv)
 
-        started_at = _now_utc()
-        timed_out = False
-
-        # Shared state updated by stdout reader.
-        state_lock = threading.Lock()
-        session_id_after: str | None = session_id
-        api_key_source: str | None = None
-        deltas: list[str] = []
-        result_text: str | None = None
+        # Endpoints leased by the current attempt, in spawn order.
+        leases: list[Lease] = []
 
-        def reader_thread(proc: subprocess.Popen[str]) -> None:
-            nonlocal session_id_after, api_key_source, result_text
+        def spawn_env() -> dict[str, str]:
+            if not cfg.endpoints:
+                return env
+            # A hedge goes to another member than the process it races, if it can.
+            lease = self._endpoints.acquire(cfg.endpoints, avoid=leases[-1].endpoint if leases else None)
+            leases.append(lease)
+            return lease.endpoint.apply(env)
 
+        started_at = _now_utc()
+        clock = _PhaseClock()
+        timed_out = False
+        policy = RetryPolicy(cfg.retry_max_attempts, cfg.retry_base_delay_s, cfg.retry_max_delay_s)
+        hedge_after_s = self._ttfe.p95(cfg.agent_id) if cfg.hedge else None
+
+        # Reader state of the current attempt; replaced before each retry.
+        spool_path = run_dir / "result.partial"
+        cur = _AttemptState(session_id, spool_path)
+        # tool_use -> tool_result pairs across all attempts, for tools.json.
+        tools = ToolTracker()
+
+        def notify(raw: str, norm: NormalizedEvent | None) -> None:
+            nonlocal on_event
+            if on_event is None:
+                return
+            try:
+                on_event(raw, norm)
+            except Exception:
+                on_event = None
+
+        def reader_thread(proc: subprocess.Popen[str], claim: Callable[[], bool], store: EventWriter) -> None:
+            st = cur
             assert proc.stdout is not None
-            with events_path.open("w", encoding="utf-8") as events_f:
-                for sl in iter_stream_json_lines(proc.stdout):
-                    # Always persist the raw line as emitted.
-                    events_f.write(sl.raw)
-                    events_f.write("\n")
-                    events_f.flush()
-
-                    if sl.obj is None:
-                        _jsonl_write(
-                            norm_events_path,
-                            {"kind": "parse_error", "error": sl.error, "raw": sl.raw},
-                        )
-                        continue
-
-                    norm = normalize_event(sl.obj)
-                    _jsonl_write(
-                        norm_events_path,
-                        {
-                            "kind": norm.kind,
-                            "session_id": norm.session_id,
-                            "text_delta": norm.text_delta,
-                            "result_text": norm.result_text,
-                            "api_key_source": norm.api_key_source,
-                        },
-                    )
-
-                    with state_lock:
-                        if norm.session_id:
-                            session_id_after = norm.session_id
-                        if norm.api_key_source:
-                            api_key_source = norm.api_key_source
-                        if norm.text_delta:
-                            deltas.append(norm.text_delta)
-                        if norm.result_text:
-                            result_text = norm.result_text
-
-        lock_handle = acquire_workspace_lock(workspace, timeout_s=self._lock_timeout_s)
+            lines = iter_stream_json_lines(proc.stdout)
+            for sl in lines:
+                if not claim():
+                    # Lost a hedge race: this process has been killed; drain it.
+                    for _ in lines:
+                        pass
+                    return
+
+                # Always persist the raw line as emitted, with its receive time.
+                t_ms = clock.elapsed_ms()
+                store.append(sl.raw, t_ms=t_ms, parse_error=sl.obj is None)
+
+                if "first_byte" not in clock.marks:
+                    # Line-buffered reads: the first complete line stands in for the first byte.
+                    clock.mark("first_byte")
+                    if (ttfe := clock.since("spawned")) is not None:
+                        metrics.TIME_TO_FIRST_EVENT.observe(ttfe)
+
+                if sl.obj is None:
+                    metrics.PARSE_ERRORS.inc()
+                    notify(sl.raw, None)
+                    continue
+
+                norm = normalize_event(sl.obj)
+                if norm.kind in ("init", "result"):
+                    clock.mark(norm.kind)
+
+                if norm.text_delta and "first_delta" not in clock.marks:
+                    clock.mark("first_delta")
+                    if (ttfd := clock.since("spawned")) is not None:
+                        metrics.TIME_TO_FIRST_DELTA.observe(ttfd)
+
+                with st.lock:
+                    tools.feed(t_ms, sl.obj)
+                    if norm.session_id:
+                        st.session_id_after = norm.session_id
+                    if norm.api_key_source:
+                        st.api_key_source = norm.api_key_source
+                    if norm.text_delta:
+                        st.deltas.append(norm.text_delta)
+                    if norm.result_text:
+                        st.result_text = norm.result_text
+                    if norm.usage is not None:
+                        st.usage = norm.usage
+                    if norm.kind == "error" or (norm.kind == "result" and sl.obj.get("is_error") is True):
+                        st.errors.append(norm.result_text or sl.raw)
+                notify(sl.raw, norm)
+
+        assert run_id is not None
+        live = self._registry.register(run_id, cancel_event or threading.Event())
+        exit_code = _KILLED_EXIT_CODE
+        attempts: list[dict[str, Any]] = []
+        usage: Usage | None = None
         try:
-            with stderr_path.open("w", encoding="utf-8") as stderr_f:
-                proc = subprocess.Popen(
-                    invocation.argv,
-                    cwd=str(workspace),
-                    env=env,
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.PIPE,
-                    stderr=stderr_f,
-                    text=True,
-                    encoding="utf-8",
-                    errors="replace",
-                )
-
-                t = threading.Thread(target=reader_thread, args=(proc,))
-                t.start()
-
-                # `claude -p/--print` requires the prompt via argv or stdin.
-                # We use stdin to avoid quoting/length issues and keep argv stable.
-                assert proc.stdin is not None
-                proc.stdin.write(invocation.prompt)
-                if not invocation.prompt.endswith("\n"):
-                    proc.stdin.write("\n")
-                proc.stdin.close()
-
-                try:
-                    exit_code = proc.wait(timeout=self._timeout_s)
-                except subprocess.TimeoutExpired:
-                    timed_out = True
-                    proc.kill()
-                    exit_code = proc.wait(timeout=30)
-
-                # Deterministically drain stdout so artifacts are complete.
-                t.join()
+            t_lock = time.monotonic()
+            lock_handle = self._acquire_lock(workspace, live.cancel_event)
+            metrics.LOCK_WAIT.observe(time.monotonic() - t_lock)
+            try:
+                if lock_handle is not None:
+                    clock.mark("lock_acquired")
+                    with EventWriter(run_dir) as store:
+                        resume, fork_ = session_id, fork
+                        for attempt in range(1, policy.max_attempts + 1):
+                            inv = invocation if attempt == 1 else invocation_for(resume, fork_)
+                            # The hedge forks the session so the two processes never
+                            # append to the same transcript.
+                            hedge = (
+                                (invocation_for(resume, True).argv if resume else inv.argv, hedge_after_s)
+                                if hedge_after_s is not None
+                                else None
+                            )
+                            leases.clear()
+                            try:
+                                outcome = self._spawn_and_wait(
+                                    inv.argv,
+                                    inv.prompt,
+                                    hedge,
+                                    workspace,
+                                    spawn_env,
+                                    stderr_path,
+                                    live,
+                                    clock,
+                                    lambda proc, claim: reader_thread(proc, claim, store),
+                                )
+                            except BaseException:
+                                for lease in leases:
+                                    lease.release()
+                                raise
+                            exit_code, timed_out = outcome.exit_code, outcome.timed_out
+                            if outcome.ttfe_s is not None:
+                                self._ttfe.add(cfg.agent_id, outcome.ttfe_s)
+                            if outcome.hedged:
+                                metrics.RUN_HEDGES.inc(winner="hedge" if outcome.winner == 1 else "original")
+
+                            with cur.lock:
+                                errors = list(cur.errors)
+                                sid_after = cur.session_id_after
+                                if cur.usage is not None:
+                                    usage = cur.usage if usage is None else usage + cur.usage
+                            failure = classify_failure(
+                                exit_code=exit_code,
+                                timed_out=timed_out,
+                                cancelled=live.cancel_event.is_set(),
+                                error_texts=errors,
+                                stderr=_read_text_file(stderr_path) or "",
+                            )
+                            endpoint = _settle_leases(leases, outcome, failure)
+                            attempts.append(
+                                {
+                                    "exit_code": exit_code,
+                                    "failure": failure.reason if failure else None,
+                                    "transient": failure.transient if failure else None,
+                                    "hedged": outcome.hedged,
+                                    "winner": outcome.winner,
+                                    **({"endpoint": endpoint} if endpoint is not None else {}),
+                                }
+                            )
+                            if failure is None or not failure.transient or attempt == policy.max_attempts:
+                                break
+
+                            delay = policy.delay_s(attempt)
+                            metrics.RUN_RETRIES.inc(reason=failure.reason)
+                            marker = json.dumps(
+                                {
+                                    "type": RETRY_EVENT_TYPE,
+                                    "attempt": attempt + 1,
+                                    "reason": failure.reason,
+                                    "delay_s": round(delay, 3),
+                                }
+                            )
+                            store.append(marker, t_ms=clock.elapsed_ms())
+                            tools.feed(clock.elapsed_ms(), json.loads(marker))
+                            notify(marker, normalize_event(json.loads(marker)))
+                            if live.cancel_event.wait(delay):
+                                break
+                            # Resume whatever session the failed attempt recorded.
+                            if sid_after and sid_after != resume:
+                                resume, fork_ = sid_after, False
+                            cur.deltas.discard()
+                            cur = _AttemptState(resume, spool_path)
+                    clock.mark("exit")
+                else:
+                    stderr_path.write_text("cancelled before start\n", encoding="utf-8")
+            finally:
+                if lock_handle is not None:
+                    lock_handle.release()
         finally:
-            lock_handle.release()
+            self._registry.unregister(run_id, live)
 
+        cancelled = live.cancel_event.is_set()
         finished_at = _now_utc()
 
-        with state_lock:
-            final_text = result_text if result_text is not None else "".join(deltas)
-            sid_after = session_id_after
-            aks = api_key_source
+        metrics.RUN_DURATION.observe((finished_at - started_at).total_seconds())
+        metrics.RUN_EXIT_CODES.inc(exit_code=exit_code)
+        if timed_out:
+            metrics.RUN_TIMEOUTS.inc()
+
+        final_text, result_chars = cur.write_result(result_path)
+        with cur.lock:
+            sid_after = cur.session_id_after
+            aks = cur.api_key_source
 
         # If the CLI failed before emitting any streaming output, surface stderr.
         if exit_code != 0 and not final_text.strip():
             stderr_text = _read_text_file(stderr_path)
             if stderr_text:
                 final_text = stderr_text.strip()
-
-        result_path.write_text(final_text, encoding="utf-8")
+                result_chars = len(final_text)
+                result_path.write_text(final_text, encoding="utf-8")
+        if result_chars > RESULT_INLINE_MAX_CHARS:
+            final_text = final_text[:RESULT_PREVIEW_CHARS]
 
         step_path.write_text(
             json.dumps(
@@ -243,6 +662,7 @@ class ClaudeCliExecutor:
                     "session_id_after": sid_after,
                     "fork": fork,
                     "timed_out": timed_out,
+                    "cancelled": cancelled,
                     "exit_code": exit_code,
                 },
                 ensure_ascii=True,
@@ -251,6 +671,9 @@ class ClaudeCliExecutor:
             encoding="utf-8",
         )
 
+        write_tools_json(run_dir, run_tools(run_id, tools.calls(), clock.marks, backoff_ms=tools.backoff_ms))
+
+        clock.mark("artifacts_written")
         meta_path.write_text(
             json.dumps(
                 {
@@ -261,14 +684,25 @@ class ClaudeCliExecutor:
                     "started_at": started_at.isoformat(),
                     "finished_at": finished_at.isoformat(),
                     "duration_ms": int((finished_at - started_at).total_seconds() * 1000),
+                    # Monotonic ms since execute() started; events.idx holds per-event times.
+                    "phases_ms": {p: clock.marks[p] for p in RUN_PHASES if p in clock.marks},
                     "exit_code": exit_code,
                     "timed_out": timed_out,
+                    "cancelled": cancelled,
                     "session_id_before": session_id,
                     "session_id_after": sid_after,
                     "apiKeySource": aks,
                     "permission_mode": cfg.permission_mode,
                     "policy_preset": cfg.policy_preset,
                     "model": cfg.model,
+                    # Prompt files are blobs in .cc3/prompts/, named by these digests.
+                    "prompts": {
+                        "system_sha256": system_prompt.sha256 if system_prompt else None,
+                        "append_sha256": append_system_prompt.sha256 if append_system_prompt else None,
+                    },
+                    "attempts": attempts,
+                    "usage": usage.to_dict() if usage is not None else None,
+                    "result_chars": result_chars,
                 },
                 ensure_ascii=True,
                 indent=2,
@@ -276,7 +710,6 @@ class ClaudeCliExecutor:
             encoding="utf-8",
         )
 
-        assert run_id is not None
         return ExecutionResult(
             run_id=run_id,
             run_dir=run_dir,
@@ -286,4 +719,171 @@ class ClaudeCliExecutor:
             session_id_after=sid_after,
             api_key_source=aks,
             final_text=final_text,
+            cancelled=cancelled,
+            attempts=max(1, len(attempts)),
+            usage=usage,
+            result_chars=result_chars,
         )
+
+    def _spawn_and_wait(
+        self,
+        argv: list[str],
+        prompt: str,
+        hedge: tuple[list[str], float] | None,
+        workspace: Path,
+        spawn_env: Callable[[], dict[str, str]],
+        stderr_path: Path,
+        live: _LiveRun,
+        clock: _PhaseClock,
+        reader_thread: Callable[[subprocess.Popen[str], Callable[[], bool]], None],
+    ) -> _AttemptOutcome:
+        """Run one attempt; with `hedge` = (argv, delay_s), race a second process.
+
+        `spawn_env` is called once per spawned process for its environment.
+        """
+
+        race = _Race()
+        procs: list[subprocess.Popen[str]] = []
+        threads: list[threading.Thread] = []
+        stderr_files: list[Any] = []
+        hedge_stderr_path = stderr_path.with_name("stderr.hedge.log")
+
+        def spawn(argv_: list[str], stderr_path_: Path) -> None:
+            stderr_f = stderr_path_.open("w", encoding="utf-8")
+            stderr_files.append(stderr_f)
+            proc = subprocess.Popen(
+                argv_,
+                cwd=str(workspace),
+                env=spawn_env(),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=stderr_f,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                # Own process group so cancel/timeout also reap tool subprocesses.
+                start_new_session=(os.name == "posix"),
+            )
+            clock.mark("spawned")
+            race.add(proc)
+            procs.append(proc)
+            self._registry.attach(live, proc)
+            metrics.LIVE_PROCESSES.inc()
+            t = threading.Thread(target=reader_thread, args=(proc, lambda: race.claim(proc)))
+            t.start()
+            threads.append(t)
+            _write_prompt(proc, prompt)
+
+        try:
+            spawn(argv, stderr_path)
+            hedge_at = time.monotonic() + hedge[1] if hedge is not None else None
+            exit_code, timed_out = self._wait(
+                procs, race, live.cancel_event, hedge_at, lambda: spawn(hedge[0], hedge_stderr_path)
+            )
+        finally:
+            for proc in procs:
+                if _poll(proc) is None:
+                    _kill_process_group(proc)
+                    proc.wait(timeout=30)
+                self._registry.detach(live, proc)
+                metrics.LIVE_PROCESSES.dec()
+            # Deterministically drain stdout so artifacts are complete.
+            for t in threads:
+                t.join()
+            for f in stderr_files:
+                f.close()
+
+        winner = race.index(race.winner)
+        if winner == 1:
+            # stderr.log always belongs to the process whose output was kept.
+            os.replace(stderr_path, stderr_path.with_name("stderr.hedge-lost.log"))
+            os.replace(hedge_stderr_path, stderr_path)
+        return _AttemptOutcome(
+            exit_code=exit_code, timed_out=timed_out, winner=winner, hedged=len(procs) > 1, ttfe_s=race.ttfe_s
+        )
+
+    def _wait(
+        self,
+        procs: list[subprocess.Popen[str]],
+        race: _Race,
+        cancel_event: threading.Event,
+        hedge_at: float | None,
+        spawn_hedge: Callable[[], None],
+    ) -> tuple[int, bool]:
+        """Wait for the attempt's outcome: the winner's exit, or every process exiting silently."""
+
+        # Wait in slices so that setting `cancel_event` (not only `cancel`)
+        # stops a running process.
+        deadline = time.monotonic() + self._timeout_s
+        while True:
+            winner = race.winner
+            if winner is not None:
+                code = _poll(winner)
+                if code is not None:
+                    return code, False
+                running = [winner]
+            else:
+                codes = [_poll(p) for p in procs]
+                running = [p for p, c in zip(procs, codes) if c is None]
+                if not running:
+                    # Nobody produced output; report the original process.
+                    return codes[0] if codes[0] is not None else _KILLED_EXIT_CODE, False
+                if hedge_at is not None and time.monotonic() >= hedge_at:
+                    hedge_at = None
+                    spawn_hedge()
+                    continue
+
+            now = time.monotonic()
+            if cancel_event.is_set() or now >= deadline:
+                timed_out = not cancel_event.is_set()
+                for p in procs:
+                    _kill_process_group(p)
+                return (winner or procs[0]).wait(timeout=30), timed_out
+
+            slice_s = min(_WAIT_SLICE_S, deadline - now)
+            if hedge_at is not None:
+                slice_s = min(slice_s, hedge_at - now)
+            try:
+                running[0].wait(timeout=max(0.0, slice_s))
+            except subprocess.TimeoutExpired:
+                pass
+
+
+def _settle_leases(leases: list[Lease], outcome: _AttemptOutcome, failure: Failure | None) -> str | None:
+    """Report an attempt's outcome to the endpoint whose output was kept; returns its name."""
+
+    if not leases:
+        return None
+    kept = outcome.winner if outcome.winner is not None else 0
+    ok: bool | None
+    if failure is None:
+        ok = True
+    elif failure.reason == "cancelled":
+        ok = None
+    elif failure.reason == "timed_out":
+        # A gateway that never answered is at fault; a slow generation is not.
+        ok = False if outcome.ttfe_s is None else None
+    else:
+        ok = not failure.endpoint_fault
+    for i, lease in enumerate(leases):
+        if i == kept:
+            lease.release(ok, ttfe_s=outcome.ttfe_s)
+            label = "aborted" if ok is None else "ok" if ok else "failed"
+            metrics.ENDPOINT_ATTEMPTS.inc(endpoint=lease.endpoint.name, outcome=label)
+        else:
+            lease.release()
+    return leases[kept].endpoint.name
+
+
+def _write_prompt(proc: subprocess.Popen[str], prompt: str) -> None:
+    # `claude -p/--print` requires the prompt via argv or stdin.
+    # We use stdin to avoid quoting/length issues and keep argv stable.
+    assert proc.stdin is not None
+    try:
+        proc.stdin.write(prompt)
+        if not prompt.endswith("\n"):
+            proc.stdin.write("\n")
+        proc.stdin.close()
+    except BrokenPipeError:
+        # Killed (cancelled) before it read the prompt.
+        pass
@@ -0,0 +1,338 @@
+"""Columnar export of recorded runs for analytics (Parquet or Arrow IPC).
+
+`export_runs` writes two datasets under an output directory: `events/`, one
+row per stored event with a flattened set of common fields, and `runs/`, one
+row per finished run from its `meta.json`/`step.json`. Each invocation only
+exports runs it has not exported before (tracked in `_exported.json`) and
+adds them as new part files, so a dataset grows by appending parts. Rows are
+written in bounded batches, so memory does not depend on the corpus size.
+
+pyarrow is an optional dependency (`pip install 'cc-3[export]'`); the row
+builders below do not need it.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import secrets
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from .event_store import RunReader
+from .events import extract_tool_events, normalize_event
+from .paths import workspaces_dir
+
+FORMATS = ("parquet", "arrow")
+STATE_FILE = "_exported.json"
+BATCH_ROWS = 50_000
+
+# Column name -> arrow type name; `_schema` turns these into a pyarrow schema.
+EVENT_COLUMNS: dict[str, str] = {
+    "run": "string",  # run dir relative to workspaces/; joins with runs.run
+    "seq": "int64",
+    "t_ms": "float64",
+    "kind": "string",
+    "type": "string",
+    "subtype": "string",
+    "session_id": "string",
+    "delta_chars": "int64",
+    "result_chars": "int64",
+    "tool_uses": "list<string>",
+    "tool_results": "int64",
+    "is_error": "bool",
+    "input_tokens": "int64",
+    "output_tokens": "int64",
+    "cost_usd": "float64",
+    "raw_bytes": "int64",
+    "parse_error": "bool",
+}
+
+RUN_COLUMNS: dict[str, str] = {
+    "run": "string",
+    "workspace": "string",
+    "run_id": "string",
+    "started_at": "timestamp",
+    "duration_ms": "int64",
+    "exit_code": "int64",
+    "timed_out": "bool",
+    "cancelled": "bool",
+    "fork": "bool",
+    "model": "string",
+    "policy_preset": "string",
+    "permission_mode": "string",
+    "api_key_source": "string",
+    "session_id_before": "string",
+    "session_id_after": "string",
+    "instruction_chars": "int64",
+    "attempts": "int64",
+    "failure": "string",
+    "hedged": "bool",
+    "first_byte_ms": "float64",
+    "first_delta_ms": "float64",
+    "input_tokens": "int64",
+    "output_tokens": "int64",
+    "cache_creation_input_tokens": "int64",
+    "cache_read_input_tokens": "int64",
+    "total_tokens": "int64",
+    "cost_usd": "float64",
+    "events": "int64",
+}
+
+
+def _str(v: Any) -> str | None:
+    return v if isinstance(v, str) else None
+
+
+def _int(v: Any) -> int | None:
+    return v if isinstance(v, int) and not isinstance(v, bool) else None
+
+
+def _num(v: Any) -> float | None:
+    return float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else None
+
+
+def _bool(v: Any) -> bool | None:
+    return v if isinstance(v, bool) else None
+
+
+def _read_json(path: Path) -> dict[str, Any]:
+    try:
+        obj = json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return obj if isinstance(obj, dict) else {}
+
+
+def event_rows(run_dir: Path, run: str) -> Iterator[dict[str, Any]]:
+    """One row per stored event of `run_dir`."""
+
+    with RunReader(run_dir) as reader:
+        for ev in reader:
+            row: dict[str, Any] = dict.fromkeys(EVENT_COLUMNS)
+            row.update(run=run, seq=ev.seq, t_ms=ev.t_ms, raw_bytes=len(ev.raw.encode("utf-8")))
+            obj = ev.obj()
+            if obj is None:
+                row.update(kind="parse_error", parse_error=True)
+                yield row
+                continue
+            norm = normalize_event(obj)
+            tool_events = extract_tool_events(obj)
+            row.update(
+                kind=norm.kind,
+                type=_str(obj.get("type")),
+                subtype=_str(obj.get("subtype")),
+                session_id=norm.session_id,
+                delta_chars=len(norm.text_delta) if norm.text_delta else None,
+                result_chars=len(norm.result_text) if norm.result_text else None,
+                tool_uses=[te.name or "" for te in tool_events if te.kind == "use"] or None,
+                tool_results=sum(te.kind == "result" for te in tool_events) or None,
+                is_error=_bool(obj.get("is_error")),
+                parse_error=False,
+            )
+            if norm.usage is not None:
+                row.update(
+                    input_tokens=norm.usage.input_tokens,
+                    output_tokens=norm.usage.output_tokens,
+                    cost_usd=norm.usage.cost_usd,
+                )
+            yield row
+
+
+def run_row(run_dir: Path, run: str) -> dict[str, Any]:
+    """The row of `run_dir` in the runs table."""
+
+    meta = _read_json(run_dir / "meta.json")
+    step = _read_json(run_dir / "step.json")
+    usage = meta.get("usage") if isinstance(meta.get("usage"), dict) else {}
+    phases = meta.get("phases_ms") if isinstance(meta.get("phases_ms"), dict) else {}
+    attempts = [a for a in meta.get("attempts") or [] if isinstance(a, dict)]
+
+    started_at = None
+    if isinstance(meta.get("started_at"), str):
+        try:
+            started_at = datetime.fromisoformat(meta["started_at"])
+        except ValueError:
+            pass
+    instruction = step.get("instruction")
+
+    with RunReader(run_dir) as reader:
+        n_events = len(reader)
+
+    return {
+        "run": run,
+        "workspace": str(Path(run).parent.parent),
+        "run_id": _str(meta.get("run_id")) or run_dir.name,
+        "started_at": started_at,
+        "duration_ms": _int(meta.get("duration_ms")),
+        "exit_code": _int(meta.get("exit_code")),
+        "timed_out": _bool(meta.get("timed_out")),
+        "cancelled": _bool(meta.get("cancelled")),
+        "fork": _bool(step.get("fork")),
+        "model": _str(meta.get("model")),
+        "policy_preset": _str(meta.get("policy_preset")),
+        "permission_mode": _str(meta.get("permission_mode")),
+        "api_key_source": _str(meta.get("apiKeySource")),
+        "session_id_before": _str(meta.get("session_id_before")),
+        "session_id_after": _str(meta.get("session_id_after")),
+        "instruction_chars": len(instruction) if isinstance(instruction, str) else None,
+        "attempts": len(attempts) or None,
+        "failure": _str(attempts[-1].get("failure")) if attempts else None,
+        "hedged": any(a.get("hedged") is True for a in attempts) if attempts else None,
+        "first_byte_ms": _num(phases.get("first_byte")),
+        "first_delta_ms": _num(phases.get("first_delta")),
+        "input_tokens": _int(usage.get("input_tokens")),
+        "output_tokens": _int(usage.get("output_tokens")),
+        "cache_creation_input_tokens": _int(usage.get("cache_creation_input_tokens")),
+        "cache_read_input_tokens": _int(usage.get("cache_read_input_tokens")),
+        "total_tokens": _int(usage.get("total_tokens")),
+        "cost_usd": _num(usage.get("cost_usd")),
+        "events": n_events,
+    }
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise RuntimeError("cc3 export needs pyarrow: pip install 'cc-3[export]'") from e
+    return pyarrow
+
+
+def _schema(pa: Any, columns: dict[str, str]) -> Any:
+    types = {
+        "string": pa.string(),
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "bool": pa.bool_(),
+        "list<string>": pa.list_(pa.string()),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }
+    return pa.schema([(name, types[t]) for name, t in columns.items()])
+
+
+class _PartWriter:
+    """Streams rows into one new part file, `batch_rows` at a time.
+
+    The part is written under a temporary name and only appears under its
+    final name on `publish`.
+    """
+
+    def __init__(self, pa: Any, path: Path, columns: dict[str, str], *, fmt: str, batch_rows: int):
+        self._pa = pa
+        self._schema = _schema(pa, columns)
+        self._path = path
+        self._tmp = path.with_name(f".{path.name}.tmp")
+        self._batch_rows = batch_rows
+        self._rows: list[dict[str, Any]] = []
+        self._writer: Any = None
+        self._fmt = fmt
+        self.rows = 0
+
+    def _open(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        if self._fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(str(self._tmp), self._schema, compression="zstd")
+        else:
+            self._writer = self._pa.ipc.new_file(str(self._tmp), self._schema)
+
+    def add(self, row: dict[str, Any]) -> None:
+        self._rows.append(row)
+        if len(self._rows) >= self._batch_rows:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._rows:
+            return
+        if self._writer is None:
+            self._open()
+        self._writer.write_batch(self._pa.RecordBatch.from_pylist(self._rows, schema=self._schema))
+        self.rows += len(self._rows)
+        self._rows = []
+
+    def close(self) -> None:
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def publish(self) -> None:
+        if self._tmp.exists():
+            os.replace(self._tmp, self._path)
+
+    def abort(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._tmp.unlink(missing_ok=True)
+
+
+@dataclass(frozen=True)
+class ExportStats:
+    runs: int
+    events: int
+    # Finished runs found that had already been exported.
+    skipped: int
+
+
+def _finished_runs(repo_root: Path, agent: str | None) -> Iterator[tuple[Path, str]]:
+    root = workspaces_dir(repo_root)
+    pattern = f"{agent}/runs/*" if agent else "**/runs/*"
+    for p in sorted(root.glob(pattern)):
+        # Runs still in progress have no meta.json yet; a later export picks them up.
+        if p.is_dir() and (p / "meta.json").exists() and RunReader.has_events(p):
+            yield p, p.relative_to(root).as_posix()
+
+
+def export_runs(
+    repo_root: Path,
+    out_dir: Path,
+    *,
+    fmt: str = "parquet",
+    agent: str | None = None,
+    batch_rows: int = BATCH_ROWS,
+) -> ExportStats:
+    """Append the not yet exported finished runs to the datasets in `out_dir`."""
+
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format: {fmt} (expected one of {', '.join(FORMATS)})")
+    pa = _pyarrow()
+
+    state_path = out_dir / STATE_FILE
+    state = _read_json(state_path)
+    done = set(state.get("runs") or [])
+
+    part = f"part-{datetime.now(UTC).strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}.{fmt}"
+    events = _PartWriter(pa, out_dir / "events" / part, EVENT_COLUMNS, fmt=fmt, batch_rows=batch_rows)
+    runs = _PartWriter(pa, out_dir / "runs" / part, RUN_COLUMNS, fmt=fmt, batch_rows=batch_rows)
+    exported: list[str] = []
+    skipped = 0
+    try:
+        for run_dir, run in _finished_runs(repo_root, agent):
+            if run in done:
+                skipped += 1
+                continue
+            for row in event_rows(run_dir, run):
+                events.add(row)
+            runs.add(run_row(run_dir, run))
+            exported.append(run)
+        events.close()
+        runs.close()
+    except BaseException:
+        events.abort()
+        runs.abort()
+        raise
+
+    events.publish()
+    runs.publish()
+    if exported:
+        # Recorded last: a crash before this re-exports the runs rather than losing them.
+        tmp = state_path.with_name(f".{STATE_FILE}.tmp")
+        tmp.write_text(json.dumps({"runs": sorted(done.union(exported))}, ensure_ascii=True), encoding="utf-8")
+        os.replace(tmp, state_path)
+    return ExportStats(runs=len(exported), events=events.rows, skipped=skipped)
@@ -0,0 +1,126 @@
+"""Copy-on-write cloning of workspace trees.
+
+Files are cloned with a reflink (FICLONE: btrfs, XFS, bcachefs, ...) when the
+filesystem supports it, so no data is copied, and copied elsewhere. Either
+way both sides may be modified independently: a clone never shares an inode
+with its source.
+"""
+
+from __future__ import annotations
+
+import errno
+import os
+import re
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+
+# _IOW(0x94, 9, int) from <linux/fs.h>.
+FICLONE = 0x40049409
+
+# Errors meaning "this filesystem (pair) can't do that", as opposed to real I/O errors.
+_UNSUPPORTED = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EPERM}
+
+
+@dataclass(frozen=True)
+class CloneStats:
+    reflinked: int = 0
+    copied: int = 0
+
+
+def reflink(src: Path, dst: Path) -> bool:
+    """Clone `src` to a new file `dst` sharing its extents; False if unsupported."""
+
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    with open(src, "rb") as fs:
+        fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            fcntl.ioctl(fd, FICLONE, fs.fileno())
+        except OSError as e:
+            os.close(fd)
+            dst.unlink(missing_ok=True)
+            if e.errno in _UNSUPPORTED:
+                return False
+            raise
+    os.close(fd)
+    shutil.copystat(src, dst)
+    return True
+
+
+class _Cloner:
+    def __init__(self) -> None:
+        # Stop probing after the first refusal: the whole tree is on one filesystem.
+        self.can_reflink = True
+        self.counts = {"reflinked": 0, "copied": 0}
+
+    def file(self, src: Path, dst: Path) -> None:
+        if self.can_reflink:
+            if reflink(src, dst):
+                self.counts["reflinked"] += 1
+                return
+            self.can_reflink = False
+        shutil.copy2(src, dst)
+        self.counts["copied"] += 1
+
+
+def clone_file(src: Path, dst: Path) -> None:
+    """Clone one file (reflink, else copy)."""
+
+    _Cloner().file(src, dst)
+
+
+def clone_tree(
+    src: Path,
+    dst: Path,
+    *,
+    exclude: frozenset[str] = frozenset(),
+) -> CloneStats:
+    """Clone the tree under `src` into `dst` (which may already exist).
+
+    `exclude` names top-level entries of `src`.
+    """
+
+    cloner = _Cloner()
+    dst.mkdir(parents=True, exist_ok=True)
+    for root, dirs, files in os.walk(src):
+        rel = Path(root).relative_to(src)
+        if not rel.parts:
+            dirs[:] = [d for d in dirs if d not in exclude]
+            files = [f for f in files if f not in exclude]
+        out = dst / rel
+        for d in dirs:
+            (out / d).mkdir(exist_ok=True)
+        for name in files:
+            s = Path(root) / name
+            if s.is_symlink():
+                os.symlink(os.readlink(s), out / name)
+                continue
+            cloner.file(s, out / name)
+    return CloneStats(**cloner.counts)
+
+
+def claude_project_dir(cwd: Path) -> Path:
+    """Where the claude CLI keeps session transcripts for runs started in `cwd`."""
+
+    config_dir = os.environ.get("CLAUDE_CONFIG_DIR")
+    base = Path(config_dir) if config_dir else Path.home() / ".claude"
+    return base / "projects" / re.sub(r"[^A-Za-z0-9]", "-", str(cwd.resolve()))
+
+
+def clone_claude_session(session_id: str, *, src_cwd: Path, dst_cwd: Path) -> bool:
+    """Make `session_id` resumable from `dst_cwd`; False if no transcript was found.
+
+    The claude CLI only resumes sessions recorded for the current directory.
+    """
+
+    src = claude_project_dir(src_cwd) / f"{session_id}.jsonl"
+    if not src.is_file():
+        return False
+    dst = claude_project_dir(dst_cwd) / src.name
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    dst.unlink(missing_ok=True)
+    clone_file(src, dst)
+    return True
@@ -15,14 +15,20 @@ class LockHandle:
             self.lock.release()
 
 
-def workspace_lock(workspace: Path) -> FileLock:
+def workspace_lock(workspace: Path, *, name: str = "workspace") -> FileLock:
+    """A lock file under `<workspace>/.locks/`.
+
+    `workspace` is held by the executor for the whole claude run; other names
+    guard short bookkeeping writes that must not wait for a run to finish.
+    """
+
     locks_dir = workspace / ".locks"
     locks_dir.mkdir(parents=True, exist_ok=True)
-    return FileLock(str(locks_dir / "workspace.lock"))
+    return FileLock(str(locks_dir / f"{name}.lock"))
 
 
-def acquire_workspace_lock(workspace: Path, *, timeout_s: float) -> LockHandle:
-    lock = workspace_lock(workspace)
+def acquire_workspace_lock(workspace: Path, *, timeout_s: float, name: str = "workspace") -> LockHandle:
+    lock = workspace_lock(workspace, name=name)
     try:
         lock.acquire(timeout=timeout_s)
     except Timeout as e:
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import math
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Sequence
+from typing import TypeVar
+
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+    600.0,
+)
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(pairs: Iterable[tuple[str, str]]) -> str:
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return f"{{{inner}}}" if inner else ""
+
+
+def _fmt_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, object]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    @abstractmethod
+    def render(self) -> list[str]: ...
+
+
+_M = TypeVar("_M", bound=_Metric)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        if not self.labelnames:
+            # Unlabeled series are exported as 0 before the first update.
+            self._values[()] = 0.0
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        out = self._header()
+        for key, v in items:
+            out.append(f"{self.name}{_fmt_labels(zip(self.labelnames, key))} {_fmt_value(v)}")
+        return out
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (per-bucket counts (non-cumulative, last is +Inf), sum, count)
+        self._series: dict[tuple[str, ...], tuple[list[int], float, int]] = {}
+        if not self.labelnames:
+            self._series[()] = ([0] * (len(self.buckets) + 1), 0.0, 0)
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        idx = len(self.buckets)
+        for i, b in enumerate(self.buckets):
+            if value <= b:
+                idx = i
+                break
+        with self._lock:
+            counts, total, n = self._series.get(key) or ([0] * (len(self.buckets) + 1), 0.0, 0)
+            counts[idx] += 1
+            self._series[key] = (counts, total + value, n + 1)
+
+    def count(self, **labels: object) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s, n)) for k, (c, s, n) in self._series.items())
+        out = self._header()
+        for key, (counts, total, n) in items:
+            pairs = list(zip(self.labelnames, key))
+            cum = 0
+            for b, c in zip((*self.buckets, math.inf), counts):
+                cum += c
+                out.append(f"{self.name}_bucket{_fmt_labels([*pairs, ('le', _fmt_value(b))])} {cum}")
+            out.append(f"{self.name}_sum{_fmt_labels(pairs)} {_fmt_value(total)}")
+            out.append(f"{self.name}_count{_fmt_labels(pairs)} {n}")
+        return out
+
+
+class MetricsRegistry:
+    """In-process metric registry rendered in Prometheus text exposition format."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: _M) -> _M:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or not isinstance(existing, type(metric)):
+                    raise ValueError(f"metric {metric.name} already registered as {existing.kind}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = [self._metrics[k] for k in sorted(self._metrics)]
+        lines: list[str] = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+RUN_DURATION = REGISTRY.histogram("cc3_run_duration_seconds", "Wall time of one executor run.")
+TIME_TO_FIRST_EVENT = REGISTRY.histogram(
+    "cc3_run_time_to_first_event_seconds", "Time from claude spawn to its first stream-json line."
+)
+TIME_TO_FIRST_DELTA = REGISTRY.histogram(
+    "cc3_run_time_to_first_delta_seconds", "Time from claude spawn to its first text delta."
+)
+LOCK_WAIT = REGISTRY.histogram("cc3_lock_wait_seconds", "Time spent waiting for the workspace lock.")
+QUEUE_WAIT = REGISTRY.histogram("cc3_queue_wait_seconds", "Time a run waited between submission and dispatch.")
+SSE_FANOUT_LAG = REGISTRY.histogram(
+    "cc3_sse_fanout_lag_seconds",
+    "Delay between an event being written to disk and being sent to an SSE client.",
+)
+
+RUN_EXIT_CODES = REGISTRY.counter("cc3_run_exit_codes_total", "Finished runs by claude exit code.", ["exit_code"])
+RUN_TIMEOUTS = REGISTRY.counter("cc3_run_timeouts_total", "Runs killed after exceeding timeout_s.")
+RUN_RETRIES = REGISTRY.counter("cc3_run_retries_total", "Attempts retried after a transient failure.", ["reason"])
+RUN_HEDGES = REGISTRY.counter(
+    "cc3_run_hedges_total", "Attempts that raced a hedge process, by whose output was kept.", ["winner"]
+)
+ENDPOINT_ATTEMPTS = REGISTRY.counter(
+    "cc3_endpoint_attempts_total", "claude attempts per pool endpoint by outcome.", ["endpoint", "outcome"]
+)
+PARSE_ERRORS = REGISTRY.counter("cc3_stream_parse_errors_total", "stream-json lines that failed to parse.")
+ROLLOVER_FAILURES = REGISTRY.counter(
+    "cc3_session_rollover_failures_total", "Session rollovers that raised; the session was kept as is."
+)
+
+LIVE_PROCESSES = REGISTRY.gauge("cc3_claude_processes", "claude CLI processes currently running.")
+SSE_STREAMS = REGISTRY.gauge("cc3_sse_streams_open", "Open SSE event streams.")
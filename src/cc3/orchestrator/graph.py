@@ -1,57 +1,68 @@
 from __future__ import annotations
 
+import dataclasses
+import hashlib
+import json
+import threading
 from pathlib import Path
-from typing import Any, TypedDict
+from typing import Any
 
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, StateGraph
 
 from ..config import AgentConfig
 from ..executor import ClaudeCliExecutor
+from .steps import AgentState, execute_step, resolve_planner
 
+__all__ = ["AgentState", "build_graph", "compiled_graph", "config_fingerprint"]
 
-class AgentState(TypedDict, total=False):
-    agent_id: str
-    workspace_path: str
+# Compiled graphs keyed by (agent_id, config fingerprint). Per-run objects
+# (executor, workspace) travel in `config["configurable"]`, so one compiled
+# graph serves every invocation with the same agent config.
+_GRAPHS: dict[tuple[str, str], Any] = {}
+_GRAPHS_LOCK = threading.Lock()
 
-    goal: str
-    instruction: str
 
-    claude_session_id: str | None
-    fork: bool
+def config_fingerprint(cfg: AgentConfig) -> str:
+    blob = json.dumps(dataclasses.asdict(cfg), sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
 
-    run_id: str
-    run_dir: str
 
-    final_text: str
+def _compile(cfg: AgentConfig) -> Any:
+    """Compile the minimal START -> Planner -> Exec -> END LangGraph."""
 
+    planner = resolve_planner(cfg.planner)
 
-def build_graph(*, executor: ClaudeCliExecutor, cfg: AgentConfig, workspace: Path) -> Any:
-    """Build the minimal START -> Planner -> Exec -> END LangGraph."""
-
-    def planner_node(state: AgentState) -> AgentState:
-        # MVP planner: one step equals the goal.
-        return {**state, "instruction": state["goal"]}
-
-    def exec_node(state: AgentState) -> AgentState:
-        res = executor.execute(
-            instruction=state["instruction"],
-            workspace=workspace,
+    def exec_node(state: AgentState, config: RunnableConfig) -> AgentState:
+        conf = config["configurable"]
+        return execute_step(
+            state,
+            executor=conf["executor"],
             cfg=cfg,
-            session_id=state.get("claude_session_id"),
-            fork=bool(state.get("fork")),
+            workspace=conf["workspace"],
+            on_event=conf.get("on_event"),
+            cancel_event=conf.get("cancel_event"),
         )
-        return {
-            **state,
-            "claude_session_id": res.session_id_after,
-            "run_id": res.run_id,
-            "run_dir": str(res.run_dir),
-            "final_text": res.final_text,
-        }
 
     g: StateGraph = StateGraph(AgentState)
-    g.add_node("planner", planner_node)
+    g.add_node("planner", planner)
     g.add_node("exec", exec_node)
     g.set_entry_point("planner")
     g.add_edge("planner", "exec")
     g.add_edge("exec", END)
     return g.compile()
+
+
+def compiled_graph(cfg: AgentConfig) -> Any:
+    key = (cfg.agent_id, config_fingerprint(cfg))
+    with _GRAPHS_LOCK:
+        graph = _GRAPHS.get(key)
+        if graph is None:
+            graph = _GRAPHS[key] = _compile(cfg)
+    return graph
+
+
+def build_graph(*, executor: ClaudeCliExecutor, cfg: AgentConfig, workspace: Path) -> Any:
+    """The cached compiled graph for `cfg`, bound to one executor and workspace."""
+
+    return compiled_graph(cfg).with_config(configurable={"executor": executor, "workspace": workspace})
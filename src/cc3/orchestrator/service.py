@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import dataclasses
+import threading
+from pathlib import Path
+from typing import Any
+
+from ..config import AgentConfig, load_agent_config
+from ..executor import ClaudeCliExecutor, EventCallback
+from ..paths import agent_dir
+from .steps import AgentState, run_agent
+
+_PROFILE_FILES = ("agent.yaml", "system_prompt.md", "append_system_prompt.md")
+
+
+class OrchestratorService:
+    """Long-lived orchestration state for servers (chat API, `cc3 serve`).
+
+    Agent profiles are loaded from `agents/<id>/` once and reloaded only when
+    their files change; executors are shared per timeout pair; compiled
+    graphs are cached per profile fingerprint by `orchestrator.graph`. A run
+    therefore costs no setup beyond the claude process itself.
+    """
+
+    def __init__(
+        self,
+        repo_root: Path,
+        *,
+        default_profile: AgentConfig | None = None,
+        timeout_s: float = 600.0,
+        lock_timeout_s: float = 30.0,
+    ):
+        self.repo_root = repo_root
+        self._default_profile = default_profile
+        self._timeout_s = timeout_s
+        self._lock_timeout_s = lock_timeout_s
+        self._lock = threading.Lock()
+        self._profiles: dict[str, tuple[tuple[Any, ...], AgentConfig]] = {}
+        self._executors: dict[tuple[float, float], ClaudeCliExecutor] = {}
+
+    def has_profile(self, agent_id: str) -> bool:
+        return agent_dir(self.repo_root, agent_id).is_dir()
+
+    def _stamp(self, agent_id: str) -> tuple[Any, ...]:
+        base = agent_dir(self.repo_root, agent_id)
+        stamp: list[Any] = []
+        for name in _PROFILE_FILES:
+            try:
+                stamp.append((base / name).stat().st_mtime_ns)
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def profile(self, agent_id: str | None = None) -> AgentConfig:
+        """The agent's config (or the default profile for None).
+
+        Callers must not mutate the returned object; use `dataclasses.replace`.
+        """
+
+        if agent_id is None:
+            if self._default_profile is None:
+                raise ValueError("no agent_id given and no default profile configured")
+            return self._default_profile
+
+        stamp = self._stamp(agent_id)
+        with self._lock:
+            cached = self._profiles.get(agent_id)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+        cfg = load_agent_config(repo_root=self.repo_root, agent_id=agent_id)
+        with self._lock:
+            self._profiles[agent_id] = (stamp, cfg)
+        return cfg
+
+    def executor(self, *, timeout_s: float | None = None, lock_timeout_s: float | None = None) -> ClaudeCliExecutor:
+        key = (timeout_s or self._timeout_s, lock_timeout_s or self._lock_timeout_s)
+        with self._lock:
+            ex = self._executors.get(key)
+            if ex is None:
+                ex = self._executors[key] = ClaudeCliExecutor(
+                    repo_root=self.repo_root, timeout_s=key[0], lock_timeout_s=key[1]
+                )
+            return ex
+
+    def run(
+        self,
+        *,
+        workspace: Path,
+        goal: str,
+        agent_id: str | None = None,
+        session_id: str | None = None,
+        run_id: str | None = None,
+        fork: bool = False,
+        overrides: dict[str, Any] | None = None,
+        on_event: EventCallback | None = None,
+        cancel_event: threading.Event | None = None,
+    ) -> AgentState:
+        """Run one goal in `workspace` with the agent's profile (planner -> exec)."""
+
+        cfg = self.profile(agent_id)
+        if overrides:
+            cfg = dataclasses.replace(cfg, **overrides)
+
+        state: AgentState = {
+            "agent_id": cfg.agent_id,
+            "workspace_path": str(workspace),
+            "goal": goal,
+            "claude_session_id": session_id,
+            "fork": fork,
+        }
+        if run_id is not None:
+            state["run_id"] = run_id
+        return run_agent(
+            state,
+            executor=self.executor(),
+            cfg=cfg,
+            workspace=workspace,
+            on_event=on_event,
+            cancel_event=cancel_event,
+        )
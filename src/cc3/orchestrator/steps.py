@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TypedDict
+
+if TYPE_CHECKING:
+    from ..config import AgentConfig
+    from ..executor import ClaudeCliExecutor, EventCallback
+
+# Kept free of langgraph imports: the single-step fast path must not pay for it.
+
+
+class AgentState(TypedDict, total=False):
+    agent_id: str
+    workspace_path: str
+
+    goal: str
+    instruction: str
+
+    claude_session_id: str | None
+    fork: bool
+
+    run_id: str
+    run_dir: str
+
+    # A preview when the result is longer than RESULT_INLINE_MAX_CHARS; see run_dir/result.txt.
+    final_text: str
+    result_chars: int
+    exit_code: int
+    timed_out: bool
+    cancelled: bool
+    # Usage.to_dict() of the run, or None.
+    usage: dict[str, Any] | None
+
+
+def identity_planner(state: AgentState) -> AgentState:
+    # MVP planner: one step equals the goal.
+    return {**state, "instruction": state["goal"]}
+
+
+PLANNERS: dict[str, Callable[[AgentState], AgentState]] = {
+    "identity": identity_planner,
+}
+
+
+def resolve_planner(name: str) -> Callable[[AgentState], AgentState]:
+    try:
+        return PLANNERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown planner: {name!r} (known: {', '.join(sorted(PLANNERS))})") from None
+
+
+def execute_step(
+    state: AgentState,
+    *,
+    executor: ClaudeCliExecutor,
+    cfg: AgentConfig,
+    workspace: Path,
+    on_event: EventCallback | None = None,
+    cancel_event: threading.Event | None = None,
+) -> AgentState:
+    res = executor.execute(
+        instruction=state["instruction"],
+        workspace=workspace,
+        cfg=cfg,
+        session_id=state.get("claude_session_id"),
+        fork=bool(state.get("fork")),
+        # Servers pre-allocate the run id so clients can subscribe right away.
+        run_id=state.get("run_id"),
+        cancel_event=cancel_event,
+        on_event=on_event,
+    )
+    return {
+        **state,
+        "claude_session_id": res.session_id_after,
+        "run_id": res.run_id,
+        "run_dir": str(res.run_dir),
+        "final_text": res.final_text,
+        "result_chars": res.result_chars,
+        "exit_code": res.exit_code,
+        "timed_out": res.timed_out,
+        "cancelled": res.cancelled,
+        "usage": res.usage.to_dict() if res.usage is not None else None,
+    }
+
+
+def run_agent(
+    state: AgentState,
+    *,
+    executor: ClaudeCliExecutor,
+    cfg: AgentConfig,
+    workspace: Path,
+    on_event: EventCallback | None = None,
+    cancel_event: threading.Event | None = None,
+) -> AgentState:
+    """Run planner -> exec for one goal.
+
+    With the trivial identity planner the graph would be a straight line, so
+    the step runs directly without importing or compiling LangGraph.
+    """
+
+    run_opts = {"executor": executor, "workspace": workspace, "on_event": on_event, "cancel_event": cancel_event}
+    if cfg.planner == "identity":
+        return execute_step(identity_planner(state), cfg=cfg, **run_opts)
+
+    from .graph import compiled_graph
+
+    return compiled_graph(cfg).invoke(state, config={"configurable": run_opts})
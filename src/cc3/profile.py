@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .event_store import RunReader
+from .events import normalize_event
+from .executor import RUN_PHASES
+from .paths import workspaces_dir
+from .tools import ToolCall, ToolTracker, tool_time_ms
+
+
+@dataclass
+class RunProfile:
+    run_id: str
+    run_dir: Path
+    meta: dict[str, Any]
+    phases_ms: dict[str, float]
+    # (seq, t_ms, kind) per received event.
+    events: list[tuple[int, float, str]] = field(default_factory=list)
+    tools: list[ToolCall] = field(default_factory=list)
+
+
+def find_run_dir(repo_root: Path, run_id: str, *, agent: str | None = None) -> Path | None:
+    """Locate `runs/<run_id>` under workspaces/ (agent workspaces and chat conversations)."""
+
+    root = workspaces_dir(repo_root)
+    if agent:
+        p = root / agent / "runs" / run_id
+        return p if p.is_dir() else None
+    for p in sorted(root.glob(f"**/runs/{run_id}")):
+        if p.is_dir():
+            return p
+    return None
+
+
+def load_profile(run_dir: Path) -> RunProfile:
+    """Join `meta.json` phases with the per-event receive times of the event store."""
+
+    meta_path = run_dir / "meta.json"
+    meta = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.exists() else {}
+    phases = meta.get("phases_ms") if isinstance(meta.get("phases_ms"), dict) else {}
+
+    prof = RunProfile(run_id=meta.get("run_id") or run_dir.name, run_dir=run_dir, meta=meta, phases_ms=phases)
+
+    tracker = ToolTracker()
+    with RunReader(run_dir) as reader:
+        for ev in reader:
+            obj = ev.obj()
+            norm = normalize_event(obj) if obj is not None else None
+            prof.events.append((ev.seq, ev.t_ms, norm.kind if norm is not None else "parse_error"))
+            if obj is not None:
+                tracker.feed(ev.t_ms, obj)
+
+    prof.tools = tracker.calls()
+    return prof
+
+
+def _ms(v: float | None) -> str:
+    return "-" if v is None else f"{v:,.1f}"
+
+
+def render_profile(prof: RunProfile, *, top_gaps: int = 5) -> str:
+    meta = prof.meta
+    lines = [
+        f"run {prof.run_id}  exit={meta.get('exit_code')}  duration={meta.get('duration_ms')} ms"
+        + ("  TIMED OUT" if meta.get("timed_out") else "")
+        + ("  CANCELLED" if meta.get("cancelled") else ""),
+        "",
+        f"{'phase':<20}{'at_ms':>12}{'+ms':>12}",
+    ]
+
+    prev = 0.0
+    for phase in RUN_PHASES:
+        at = prof.phases_ms.get(phase)
+        if at is None:
+            lines.append(f"{phase:<20}{'-':>12}{'-':>12}")
+            continue
+        lines.append(f"{phase:<20}{_ms(at):>12}{_ms(at - prev):>12}")
+        prev = at
+
+    if prof.tools:
+        lines += ["", f"{'tool':<20}{'start_ms':>12}{'took_ms':>12}{'in_b':>9}{'out_b':>9}  tool_use_id"]
+        for c in prof.tools:
+            out_b = "-" if c.output_bytes is None else str(c.output_bytes)
+            lines.append(
+                f"{c.name or '?':<20}{_ms(c.start_ms):>12}{_ms(c.duration_ms):>12}{c.input_bytes:>9}{out_b:>9}"
+                f"  {c.tool_use_id}"
+            )
+        lines.append(f"{'total tool time':<20}{'':>12}{_ms(tool_time_ms(prof.tools)):>12}")
+
+    gaps = [(b[1] - a[1], a, b) for a, b in zip(prof.events, prof.events[1:])]
+    gaps.sort(key=lambda g: g[0], reverse=True)
+    if gaps and top_gaps > 0:
+        lines += ["", "largest gaps between events:"]
+        for gap, a, b in gaps[:top_gaps]:
+            lines.append(f"  {_ms(gap):>10} ms  #{a[0]} {a[2]} -> #{b[0]} {b[2]}")
+
+    return "\n".join(lines)
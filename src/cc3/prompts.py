@@ -0,0 +1,61 @@
+"""Content-addressed system prompt files for claude invocations.
+
+System prompts are handed to the CLI as files (`--system-prompt-file`,
+`--append-system-prompt-file`) rather than argv strings: argv stays small,
+prompts do not show up in `ps`, and `meta.json` records a digest instead of
+the full text. Each distinct prompt is stored once, as a read-only blob
+named by its sha256, so an unchanged prompt always yields the same path and
+the same bytes (and keeps hitting the provider's prompt cache).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from .blobstore import BlobStore
+
+
+@dataclass(frozen=True)
+class RenderedPrompt:
+    sha256: str
+    path: Path
+
+
+class PromptFiles:
+    """Materializes prompt sources into a blob store, once per content.
+
+    Sources are re-read only when their mtime or size changes, so a
+    long-lived executor does no prompt I/O per run.
+    """
+
+    def __init__(self, root: Path):
+        self._store = BlobStore(root)
+        self._lock = threading.Lock()
+        self._cache: dict[Path, tuple[tuple[int, int], RenderedPrompt | None]] = {}
+
+    def render(self, source: Path) -> RenderedPrompt | None:
+        """The stored copy of `source`; None if it is missing or blank."""
+
+        try:
+            st = source.stat()
+        except FileNotFoundError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._cache.get(source)
+        if cached is not None and cached[0] == stamp and (cached[1] is None or cached[1].path.exists()):
+            return cached[1]
+
+        data = source.read_bytes()
+        rendered: RenderedPrompt | None = None
+        if data.strip():
+            digest = hashlib.sha256(data).hexdigest()
+            if not self._store.has(digest):
+                self._store.put([data])
+            rendered = RenderedPrompt(sha256=digest, path=self._store.path(digest))
+        with self._lock:
+            self._cache[source] = (stamp, rendered)
+        return rendered
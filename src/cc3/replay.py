@@ -0,0 +1,254 @@
+"""Offline re-derivation of run artifacts from their recorded event streams.
+
+The raw stream-json lines in a run's event store are the source of truth;
+`result.txt` and the stream-derived fields of `meta.json`/`step.json` are
+computed from them when the run finishes. After a change to
+`cc3.stream_parser` or `cc3.events`, `replay_runs` re-drives stored streams
+through the current code (in a process pool), reports which fields changed,
+and rewrites the artifacts atomically. `retime` replays one stream through a
+pipe at its recorded pacing (optionally accelerated) to benchmark the
+parse/normalize path under realistic arrival patterns.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .event_store import RunReader
+from .events import Usage, normalize_event
+from .paths import workspaces_dir
+from .stream_parser import iter_stream_json_lines
+
+
+@dataclass(frozen=True)
+class Derived:
+    """What the executor derives from a run's stream."""
+
+    final_text: str
+    session_id_after: str | None
+    api_key_source: str | None
+    usage: dict[str, Any] | None
+    parse_errors: int
+
+
+def derive(lines: Iterable[str], *, session_id_before: str | None = None) -> Derived:
+    """Mirror of the executor's stdout reader over a recorded stream.
+
+    Retry markers start a new attempt: the final text and key source come
+    from the last attempt, usage is summed over all of them.
+    """
+
+    session_id = session_id_before
+    api_key_source: str | None = None
+    deltas: list[str] = []
+    result_text: str | None = None
+    usage: Usage | None = None
+    # Usage of the current attempt: its last result event wins.
+    attempt_usage: Usage | None = None
+    parse_errors = 0
+
+    def add(a: Usage | None, b: Usage | None) -> Usage | None:
+        return b if a is None else a if b is None else a + b
+
+    stream = io.StringIO("".join(line + "\n" for line in lines))
+    for sl in iter_stream_json_lines(stream):
+        if sl.obj is None:
+            parse_errors += 1
+            continue
+        norm = normalize_event(sl.obj)
+        if norm.kind == "retry":
+            usage, attempt_usage = add(usage, attempt_usage), None
+            api_key_source, deltas, result_text = None, [], None
+            continue
+        if norm.session_id:
+            session_id = norm.session_id
+        if norm.api_key_source:
+            api_key_source = norm.api_key_source
+        if norm.text_delta:
+            deltas.append(norm.text_delta)
+        if norm.result_text:
+            result_text = norm.result_text
+        if norm.usage is not None:
+            attempt_usage = norm.usage
+    usage = add(usage, attempt_usage)
+
+    return Derived(
+        final_text=result_text if result_text is not None else "".join(deltas),
+        session_id_after=session_id,
+        api_key_source=api_key_source,
+        usage=usage.to_dict() if usage is not None else None,
+        parse_errors=parse_errors,
+    )
+
+
+@dataclass
+class RunDiff:
+    run_dir: Path
+    # field -> (old, new), e.g. "meta.usage" or "result.txt".
+    changes: dict[str, tuple[Any, Any]] = field(default_factory=dict)
+    error: str | None = None
+
+
+def _read_json(path: Path) -> dict[str, Any] | None:
+    try:
+        obj = json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return obj if isinstance(obj, dict) else None
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    tmp = path.with_name(f".{path.name}.replay.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def replay_run(run_dir: Path, *, write: bool = True) -> RunDiff:
+    """Re-derive one finished run's artifacts; rewrite the changed ones if `write`."""
+
+    diff = RunDiff(run_dir=run_dir)
+    meta_path, step_path, result_path = run_dir / "meta.json", run_dir / "step.json", run_dir / "result.txt"
+    meta = _read_json(meta_path)
+    if meta is None:
+        diff.error = "no meta.json (unfinished run?)"
+        return diff
+
+    with RunReader(run_dir) as reader:
+        d = derive((ev.raw for ev in reader), session_id_before=meta.get("session_id_before"))
+
+    final_text = d.final_text
+    if meta.get("exit_code") != 0 and not final_text.strip():
+        # Same fallback as the executor: surface stderr when nothing was streamed.
+        stderr = run_dir / "stderr.log"
+        if stderr.exists():
+            final_text = stderr.read_text(encoding="utf-8").strip() or final_text
+
+    old_text = result_path.read_text(encoding="utf-8") if result_path.exists() else None
+    if old_text != final_text:
+        diff.changes["result.txt"] = (old_text, final_text)
+
+    new_meta = dict(meta)
+    derived = {
+        "session_id_after": d.session_id_after,
+        "apiKeySource": d.api_key_source,
+        "usage": d.usage,
+        "result_chars": len(final_text),
+    }
+    for key, value in derived.items():
+        if meta.get(key) != value:
+            diff.changes[f"meta.{key}"] = (meta.get(key), value)
+            new_meta[key] = value
+
+    step = _read_json(step_path)
+    if step is not None and step.get("session_id_after") != d.session_id_after:
+        diff.changes["step.session_id_after"] = (step.get("session_id_after"), d.session_id_after)
+        step = {**step, "session_id_after": d.session_id_after}
+
+    if write and diff.changes:
+        if "result.txt" in diff.changes:
+            _atomic_write(result_path, final_text)
+        if any(k.startswith("meta.") for k in diff.changes):
+            _atomic_write(meta_path, json.dumps(new_meta, ensure_ascii=True, indent=2))
+        if step is not None and "step.session_id_after" in diff.changes:
+            _atomic_write(step_path, json.dumps(step, ensure_ascii=True, indent=2))
+    return diff
+
+
+def _replay_worker(args: tuple[str, bool]) -> RunDiff:
+    run_dir, write = args
+    try:
+        return replay_run(Path(run_dir), write=write)
+    except Exception as e:
+        return RunDiff(run_dir=Path(run_dir), error=f"{type(e).__name__}: {e}")
+
+
+def iter_run_dirs(repo_root: Path, *, agent: str | None = None) -> Iterator[Path]:
+    """Recorded runs under workspaces/ (agent workspaces and chat conversations)."""
+
+    root = workspaces_dir(repo_root)
+    pattern = f"{agent}/runs/*" if agent else "**/runs/*"
+    for p in sorted(root.glob(pattern)):
+        if p.is_dir() and RunReader.has_events(p):
+            yield p
+
+
+def replay_runs(run_dirs: Iterable[Path], *, jobs: int | None = None, write: bool = True) -> Iterator[RunDiff]:
+    """`replay_run` over many runs; `jobs=1` stays in-process."""
+
+    args = [(str(rd), write) for rd in run_dirs]
+    if jobs == 1 or len(args) <= 1:
+        yield from map(_replay_worker, args)
+        return
+    # forkserver: callers (the chat API, tests) may be multi-threaded, where fork() is unsafe.
+    ctx = multiprocessing.get_context("forkserver")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=ctx) as pool:
+        # Runs are small and numerous: batch them to amortize IPC.
+        yield from pool.map(_replay_worker, args, chunksize=16)
+
+
+@dataclass(frozen=True)
+class RetimeStats:
+    events: int
+    recorded_s: float
+    wall_s: float
+    # Delay between an event's scheduled arrival and it being normalized.
+    lag_p50_ms: float
+    lag_p95_ms: float
+    lag_max_ms: float
+
+
+def retime(run_dir: Path, *, speed: float = 1.0) -> RetimeStats:
+    """Feed a recorded stream through a pipe into the parser at `speed` x its recorded pacing.
+
+    `speed=0` writes as fast as possible.
+    """
+
+    with RunReader(run_dir) as reader:
+        events = [(ev.t_ms, ev.raw) for ev in reader]
+    if not events:
+        return RetimeStats(0, 0.0, 0.0, 0.0, 0.0, 0.0)
+    t_first = events[0][0]
+    offsets = [((t - t_first) / 1000 / speed) if speed > 0 else 0.0 for t, _ in events]
+
+    rfd, wfd = os.pipe()
+    t0 = time.monotonic()
+
+    def feed() -> None:
+        with open(wfd, "w", encoding="utf-8") as w:
+            for off, (_, raw) in zip(offsets, events):
+                delay = t0 + off - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                w.write(raw + "\n")
+                w.flush()
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    lags: list[float] = []
+    with open(rfd, encoding="utf-8") as r:
+        for i, sl in enumerate(iter_stream_json_lines(r)):
+            if sl.obj is not None:
+                normalize_event(sl.obj)
+            lags.append(max(0.0, time.monotonic() - (t0 + offsets[min(i, len(offsets) - 1)])) * 1000)
+    writer.join()
+    wall = time.monotonic() - t0
+
+    lags.sort()
+    return RetimeStats(
+        events=len(lags),
+        recorded_s=round((events[-1][0] - t_first) / 1000, 3),
+        wall_s=round(wall, 3),
+        lag_p50_ms=round(lags[len(lags) // 2], 3) if lags else 0.0,
+        lag_p95_ms=round(lags[min(len(lags) - 1, int(len(lags) * 0.95))], 3) if lags else 0.0,
+        lag_max_ms=round(lags[-1], 3) if lags else 0.0,
+    )
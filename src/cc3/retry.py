@@ -0,0 +1,103 @@
+"""Failure classification and backoff for claude runs.
+
+`classify_failure` looks at the error results/events a run emitted and the
+tail of its `stderr.log`, and decides whether running it again can help:
+gateway overload, rate limits, 5xx responses and dropped connections are
+transient; bad credentials, invalid requests and anything unrecognised are
+permanent.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+from dataclasses import dataclass
+
+# Event type of the marker the executor stores between attempts.
+RETRY_EVENT_TYPE = "cc3_retry"
+
+# Only the end of stderr is relevant (and it can be large).
+_STDERR_TAIL_CHARS = 8192
+
+_STATUS_RE = re.compile(r"(?:api error|status(?: code)?|http)[:\s]+(\d{3})\b", re.IGNORECASE)
+_TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504, 529}
+
+# (reason, pattern); permanent patterns are checked first.
+_PERMANENT = (
+    ("auth", re.compile(r"authentication_error|invalid (?:x-)?api[ -]key|oauth token|not logged in", re.I)),
+    ("permission", re.compile(r"permission_error", re.I)),
+    ("invalid_request", re.compile(r"invalid_request_error|prompt is too long|context length", re.I)),
+    ("billing", re.compile(r"credit balance|billing", re.I)),
+    ("not_found", re.compile(r"not_found_error|no conversation found", re.I)),
+)
+_TRANSIENT = (
+    ("overloaded", re.compile(r"overloaded", re.I)),
+    ("rate_limited", re.compile(r"rate[_ -]?limit|too many requests", re.I)),
+    (
+        "server_error",
+        re.compile(r"api_error|internal server error|bad gateway|service unavailable|gateway time-?out", re.I),
+    ),
+    (
+        "network",
+        re.compile(r"ECONNRESET|ECONNREFUSED|ETIMEDOUT|EAI_AGAIN|socket hang up|fetch failed|connection error", re.I),
+    ),
+)
+
+
+@dataclass(frozen=True)
+class Failure:
+    transient: bool
+    reason: str
+
+    @property
+    def endpoint_fault(self) -> bool:
+        """Whether the failure reflects on the gateway/key that served the attempt."""
+
+        return self.transient or self.reason in ("auth", "billing")
+
+
+def classify_failure(
+    *,
+    exit_code: int,
+    timed_out: bool,
+    cancelled: bool,
+    error_texts: list[str],
+    stderr: str,
+) -> Failure | None:
+    """None for a successful run, else whether the failure is worth retrying."""
+
+    if cancelled:
+        return Failure(transient=False, reason="cancelled")
+    if timed_out:
+        # Another full-length attempt is rarely what the caller wants.
+        return Failure(transient=False, reason="timed_out")
+    if exit_code == 0 and not error_texts:
+        return None
+
+    text = "\n".join([*error_texts, stderr[-_STDERR_TAIL_CHARS:]])
+    for reason, pattern in _PERMANENT:
+        if pattern.search(text):
+            return Failure(transient=False, reason=reason)
+    for m in _STATUS_RE.finditer(text):
+        status = int(m.group(1))
+        if status in _TRANSIENT_STATUS:
+            return Failure(transient=True, reason=f"http_{status}")
+        if 400 <= status < 500:
+            return Failure(transient=False, reason=f"http_{status}")
+    for reason, pattern in _TRANSIENT:
+        if pattern.search(text):
+            return Failure(transient=True, reason=reason)
+    return Failure(transient=False, reason=f"exit_code_{exit_code}" if exit_code else "error_result")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 3
+    base_delay_s: float = 1.0
+    max_delay_s: float = 30.0
+
+    def delay_s(self, retry: int, rng: random.Random | None = None) -> float:
+        """Delay before retry number `retry` (1-based): full jitter over an exponential cap."""
+
+        cap = min(self.max_delay_s, self.base_delay_s * 2 ** (retry - 1))
+        return (rng or random).uniform(0.0, cap)
@@ -0,0 +1,87 @@
+"""Session rollover: retire a claude session whose context has grown too large.
+
+Every resumed turn re-reads the whole session, so turns get slower and more
+expensive as a conversation goes on. Once the session's context (the input
+side of its latest run, see `context_tokens`) reaches
+`AgentConfig.session_max_tokens`, the session is asked for a summary of
+itself, and the next turn starts a fresh session whose first prompt carries
+that summary. The summary is never taken before a reply is delivered: the
+chat API waits until the conversation is idle, `cc3 run` (and the daemon)
+takes it at the start of the next turn. Callers persist the session lineage
+(see `cc3.session` and the chat API's session.json).
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any
+
+from .config import AgentConfig
+from .executor import ClaudeCliExecutor, ExecutionResult
+
+SUMMARY_PROMPT = """\
+This session is about to be replaced by a fresh one that will only see your summary, not this transcript.
+Write that summary now. Include: the user's goals and preferences, decisions made and why, the current
+state of any files or work in progress (with paths), open questions, and anything you were asked to
+remember. Be specific and complete but concise. Reply with the summary only; do not use any tools."""
+
+_SEED_TEMPLATE = """\
+[Context carried over from an earlier session of this conversation]
+
+{summary}
+
+[End of carried-over context]
+
+{goal}"""
+
+
+def context_tokens(usage: Mapping[str, Any] | None) -> int:
+    """Context size of a run from its usage dict: fresh input plus cache reads and writes.
+
+    Not the run's total: output tokens are not re-read as such, and summing
+    runs would count the cached prefix again on every turn.
+    """
+
+    if not usage:
+        return 0
+    keys = ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+    return sum(int(usage.get(k) or 0) for k in keys)
+
+
+def should_roll_over(cfg: AgentConfig, session_tokens: int) -> bool:
+    return cfg.session_max_tokens is not None and session_tokens >= cfg.session_max_tokens
+
+
+def summarize_session(
+    executor: ClaudeCliExecutor,
+    *,
+    cfg: AgentConfig,
+    workspace: Path,
+    session_id: str,
+    run_id: str | None = None,
+    cancel_event: threading.Event | None = None,
+) -> tuple[str | None, ExecutionResult]:
+    """Ask `session_id` to summarize itself; the summary is None if the run failed."""
+
+    # Read-only: summarizing must not touch the workspace.
+    summary_cfg = dataclasses.replace(cfg, policy_preset="safe", hedge=False)
+    res = executor.execute(
+        instruction=SUMMARY_PROMPT,
+        workspace=workspace,
+        cfg=summary_cfg,
+        session_id=session_id,
+        run_id=run_id,
+        cancel_event=cancel_event,
+    )
+    if res.exit_code != 0 or res.timed_out or res.cancelled:
+        return None, res
+    return res.final_text.strip() or None, res
+
+
+def seeded_goal(summary: str, goal: str) -> str:
+    """The first prompt of the session that replaces a summarized one."""
+
+    return _SEED_TEMPLATE.format(summary=summary, goal=goal)
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import dataclasses
+import threading
 from dataclasses import dataclass
 from pathlib import Path
 
-from .config import AgentConfig
-from .executor import ClaudeCliExecutor, ExecutionResult
+from .config import AgentConfig, load_agent_config
+from .executor import ClaudeCliExecutor, EventCallback, ExecutionResult
+from .orchestrator.steps import AgentState, run_agent
+from .rollover import context_tokens, seeded_goal, should_roll_over, summarize_session
+from .session import SessionManager
 
 
 @dataclass(frozen=True)
@@ -27,6 +32,7 @@ def run_one_step(
     run_cfg: RunConfig | None = None,
     timeout_s: float = 600.0,
     lock_timeout_s: float = 30.0,
+    cancel_event: threading.Event | None = None,
 ) -> ExecutionResult:
     """Run one step using the Claude Code CLI executor.
 
@@ -49,4 +55,81 @@ def run_one_step(
         session_id=session_id,
         fork=fork,
         run_id=run_id,
+        cancel_event=cancel_event,
     )
+
+
+def cancel_run(*, repo_root: Path, run_id: str) -> bool:
+    """Cancel a live run started by `run_one_step` (any thread in this process)."""
+
+    return ClaudeCliExecutor(repo_root=repo_root).cancel(run_id)
+
+
+def run_agent_goal(
+    *,
+    repo_root: Path,
+    agent: str,
+    goal: str,
+    mode: str | None = None,
+    resume: str | None = None,
+    fork: bool = False,
+    timeout_s: float = 600.0,
+    lock_timeout_s: float = 30.0,
+    cfg: AgentConfig | None = None,
+    executor: ClaudeCliExecutor | None = None,
+    on_event: EventCallback | None = None,
+    cancel_event: threading.Event | None = None,
+) -> AgentState:
+    """Run one goal for an agent and persist its session id (what `cc3 run` does).
+
+    `cfg`/`executor` let long-lived callers (the daemon) reuse warm objects;
+    `cfg` is not mutated.
+    """
+
+    sm = SessionManager(repo_root)
+    rec = sm.load_or_create(agent)
+
+    cfg = cfg or load_agent_config(repo_root=repo_root, agent_id=agent)
+    if mode is not None:
+        cfg = dataclasses.replace(cfg, policy_preset=mode)
+
+    executor = executor or ClaudeCliExecutor(repo_root=repo_root, timeout_s=timeout_s, lock_timeout_s=lock_timeout_s)
+
+    # A rollover that came due with the previous turn is taken now rather than
+    # after it, so that its reply was not held up by the summary run.
+    if resume is None and not fork and rec.claude_session_id and should_roll_over(cfg, rec.session_tokens):
+        summary, res = summarize_session(
+            executor, cfg=cfg, workspace=rec.workspace_path, session_id=rec.claude_session_id, cancel_event=cancel_event
+        )
+        if summary is not None:
+            rec.roll_over(summary, summary_run_id=res.run_id)
+            sm.save(rec)
+
+    # Default to stored session id unless overridden.
+    session_id = resume if resume is not None else rec.claude_session_id
+    if fork and not session_id:
+        raise ValueError("--fork requires an existing session id (use --resume or run once first)")
+
+    # The first run after a rollover carries the retired session's summary.
+    seed = rec.seed_summary if session_id is None else None
+
+    final_state = run_agent(
+        {
+            "agent_id": agent,
+            "workspace_path": str(rec.workspace_path),
+            "goal": seeded_goal(seed, goal) if seed else goal,
+            "claude_session_id": session_id,
+            "fork": fork,
+        },
+        executor=executor,
+        cfg=cfg,
+        workspace=rec.workspace_path,
+        on_event=on_event,
+        cancel_event=cancel_event,
+    )
+
+    rec.record_run(final_state.get("claude_session_id"), context_tokens(final_state.get("usage")))
+    if seed and final_state.get("exit_code") == 0:
+        rec.seed_summary = None
+    sm.save(rec)
+    return final_state
@@ -31,15 +31,45 @@ class SessionRecord:
     agent_id: str
     workspace_path: Path
     claude_session_id: str | None = None
+    # Context size of `claude_session_id` as of its latest run (see cc3.rollover).
+    session_tokens: int = 0
+    # Summary of the retired session; seeds the first run of the next one.
+    seed_summary: str | None = None
+    # Sessions retired by rollover, oldest first.
+    lineage: list[dict[str, Any]] = field(default_factory=list)
 
     created_at: datetime = field(default_factory=_now_utc)
     last_active_at: datetime = field(default_factory=_now_utc)
 
+    def record_run(self, session_id: str | None, context_tokens: int) -> None:
+        """Account a finished run; its context size replaces the previous one."""
+
+        self.claude_session_id = session_id
+        self.session_tokens = context_tokens
+
+    def roll_over(self, summary: str, *, summary_run_id: str) -> None:
+        """Retire the current session; the next run starts fresh from `summary`."""
+
+        self.lineage.append(
+            {
+                "claude_session_id": self.claude_session_id,
+                "tokens": self.session_tokens,
+                "summary_run_id": summary_run_id,
+                "rolled_over_at": _dt_to_str(_now_utc()),
+            }
+        )
+        self.claude_session_id = None
+        self.session_tokens = 0
+        self.seed_summary = summary
+
     def to_dict(self) -> dict[str, Any]:
         return {
             "agent_id": self.agent_id,
             "workspace_path": str(self.workspace_path),
             "claude_session_id": self.claude_session_id,
+            "session_tokens": self.session_tokens,
+            "seed_summary": self.seed_summary,
+            "lineage": self.lineage,
             "created_at": _dt_to_str(self.created_at),
             "last_active_at": _dt_to_str(self.last_active_at),
         }
@@ -51,6 +81,9 @@ class SessionRecord:
             agent_id=agent_id,
             workspace_path=workspace_path,
             claude_session_id=(data.get("claude_session_id") if isinstance(data.get("claude_session_id"), str) else None),
+            session_tokens=data.get("session_tokens") if isinstance(data.get("session_tokens"), int) else 0,
+            seed_summary=data.get("seed_summary") if isinstance(data.get("seed_summary"), str) else None,
+            lineage=data.get("lineage") if isinstance(data.get("lineage"), list) else [],
             created_at=_str_to_dt(data.get("created_at"), fallback=now),
             last_active_at=_str_to_dt(data.get("last_active_at"), fallback=now),
         )
@@ -0,0 +1,276 @@
+"""Tool-call latency: tool_use/tool_result pairs per run, and per-agent reports.
+
+Latency is the time between receiving the event carrying a `tool_use` block
+and the one carrying its `tool_result` (event store receive times), so it
+covers the tool run plus the CLI's own overhead. The executor writes the
+calls of each run to `tools.json`; runs without one are read from their
+event store. Tool time is the union of call intervals (parallel calls count
+once); model time is the rest of the time claude was running, less the
+backoff between retried attempts.
+"""
+
+from __future__ import annotations
+
+import json
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from .event_store import RunReader
+from .events import extract_tool_events
+from .retry import RETRY_EVENT_TYPE
+
+TOOLS_FILE = "tools.json"
+
+
+@dataclass(frozen=True)
+class ToolCall:
+    tool_use_id: str
+    name: str
+    start_ms: float
+    # None: no result received (run ended or was killed first).
+    end_ms: float | None
+    input_bytes: int
+    output_bytes: int | None = None
+    is_error: bool | None = None
+
+    @property
+    def duration_ms(self) -> float | None:
+        return None if self.end_ms is None else round(self.end_ms - self.start_ms, 3)
+
+
+class ToolTracker:
+    """Pairs tool_use and tool_result blocks as events arrive.
+
+    Also sums the backoff announced by the executor's retry markers.
+    """
+
+    def __init__(self) -> None:
+        self._open: dict[str, ToolCall] = {}
+        self._done: list[ToolCall] = []
+        self.backoff_ms = 0.0
+
+    def feed(self, t_ms: float, obj: dict[str, Any]) -> None:
+        if obj.get("type") == RETRY_EVENT_TYPE:
+            delay = obj.get("delay_s")
+            if isinstance(delay, (int, float)) and not isinstance(delay, bool):
+                self.backoff_ms += delay * 1000.0
+            return
+        for te in extract_tool_events(obj):
+            if te.kind == "use":
+                self._open[te.tool_use_id] = ToolCall(
+                    tool_use_id=te.tool_use_id,
+                    name=te.name or "",
+                    start_ms=t_ms,
+                    end_ms=None,
+                    input_bytes=te.size_bytes,
+                )
+            elif (call := self._open.pop(te.tool_use_id, None)) is not None:
+                self._done.append(
+                    ToolCall(
+                        tool_use_id=call.tool_use_id,
+                        name=call.name,
+                        start_ms=call.start_ms,
+                        end_ms=t_ms,
+                        input_bytes=call.input_bytes,
+                        output_bytes=te.size_bytes,
+                        is_error=te.is_error,
+                    )
+                )
+
+    def calls(self) -> list[ToolCall]:
+        """Completed and still open calls, by start time."""
+
+        return sorted([*self._done, *self._open.values()], key=lambda c: c.start_ms)
+
+
+def tool_time_ms(calls: Iterable[ToolCall]) -> float:
+    """Length of the union of the completed calls' intervals."""
+
+    spans = sorted((c.start_ms, c.end_ms) for c in calls if c.end_ms is not None)
+    total = 0.0
+    cur: list[float] | None = None
+    for start, end in spans:
+        if cur is not None and start <= cur[1]:
+            cur[1] = max(cur[1], end)
+            continue
+        if cur is not None:
+            total += cur[1] - cur[0]
+        cur = [start, end]
+    if cur is not None:
+        total += cur[1] - cur[0]
+    return round(total, 3)
+
+
+@dataclass(frozen=True)
+class RunTools:
+    run_id: str
+    calls: list[ToolCall]
+    tool_ms: float
+    # Time claude was running (spawned -> exit) minus tool time and retry
+    # backoff; None if unknown.
+    model_ms: float | None
+    backoff_ms: float = 0.0
+
+
+def run_tools(
+    run_id: str, calls: list[ToolCall], phases_ms: dict[str, float], *, backoff_ms: float = 0.0
+) -> RunTools:
+    tool_ms = tool_time_ms(calls)
+    spawned, exited = phases_ms.get("spawned"), phases_ms.get("exit")
+    model_ms = None
+    if spawned is not None and exited is not None:
+        model_ms = round(max(0.0, exited - spawned - tool_ms - backoff_ms), 3)
+    return RunTools(run_id=run_id, calls=calls, tool_ms=tool_ms, model_ms=model_ms, backoff_ms=round(backoff_ms, 3))
+
+
+def write_tools_json(run_dir: Path, rt: RunTools) -> None:
+    doc = {
+        "run_id": rt.run_id,
+        "tool_ms": rt.tool_ms,
+        "model_ms": rt.model_ms,
+        "backoff_ms": rt.backoff_ms,
+        "calls": [{**asdict(c), "duration_ms": c.duration_ms} for c in rt.calls],
+    }
+    (run_dir / TOOLS_FILE).write_text(json.dumps(doc, ensure_ascii=True, indent=2), encoding="utf-8")
+
+
+def load_run_tools(run_dir: Path) -> RunTools:
+    """The run's `tools.json`, or the same figures derived from its event store."""
+
+    try:
+        doc = json.loads((run_dir / TOOLS_FILE).read_text(encoding="utf-8"))
+        return RunTools(
+            run_id=doc["run_id"],
+            calls=[ToolCall(**{k: v for k, v in c.items() if k != "duration_ms"}) for c in doc["calls"]],
+            tool_ms=doc["tool_ms"],
+            model_ms=doc["model_ms"],
+            backoff_ms=doc.get("backoff_ms", 0.0),
+        )
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+        pass
+
+    try:
+        meta = json.loads((run_dir / "meta.json").read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        meta = {}
+    tracker = ToolTracker()
+    with RunReader(run_dir) as reader:
+        for ev in reader:
+            obj = ev.obj()
+            if obj is not None:
+                tracker.feed(ev.t_ms, obj)
+    phases = meta.get("phases_ms") if isinstance(meta.get("phases_ms"), dict) else {}
+    return run_tools(meta.get("run_id") or run_dir.name, tracker.calls(), phases, backoff_ms=tracker.backoff_ms)
+
+
+@dataclass(frozen=True)
+class ToolStats:
+    name: str
+    calls: int
+    errors: int
+    unfinished: int
+    total_ms: float
+    p50_ms: float
+    p95_ms: float
+    max_ms: float
+    input_bytes: int
+    output_bytes: int
+
+
+@dataclass
+class ToolsReport:
+    runs: int
+    # Runs whose model time is known; tool_ms and model_ms sum over these only,
+    # so that their ratio compares like with like.
+    timed_runs: int
+    tool_ms: float
+    model_ms: float
+    by_tool: list[ToolStats]
+    # (run_id, call), slowest first.
+    slowest: list[tuple[str, ToolCall]]
+
+
+def _pct(sorted_vals: list[float], q: float) -> float:
+    return sorted_vals[min(len(sorted_vals) - 1, int(len(sorted_vals) * q))] if sorted_vals else 0.0
+
+
+def tools_report(runs: Iterable[RunTools], *, top: int = 10) -> ToolsReport:
+    durations: dict[str, list[float]] = defaultdict(list)
+    counts: dict[str, list[int]] = defaultdict(lambda: [0, 0, 0, 0, 0])  # calls, errors, unfinished, in, out
+    slowest: list[tuple[str, ToolCall]] = []
+    n_runs = timed_runs = 0
+    tool_ms = model_ms = 0.0
+    for rt in runs:
+        n_runs += 1
+        if rt.model_ms is not None:
+            timed_runs += 1
+            tool_ms += rt.tool_ms
+            model_ms += rt.model_ms
+        for c in rt.calls:
+            cnt = counts[c.name]
+            cnt[0] += 1
+            cnt[1] += 1 if c.is_error else 0
+            cnt[3] += c.input_bytes
+            cnt[4] += c.output_bytes or 0
+            if c.duration_ms is None:
+                cnt[2] += 1
+                continue
+            durations[c.name].append(c.duration_ms)
+            slowest.append((rt.run_id, c))
+    slowest.sort(key=lambda rc: rc[1].duration_ms or 0.0, reverse=True)
+
+    by_tool = []
+    for name, (calls, errors, unfinished, in_b, out_b) in counts.items():
+        ds = sorted(durations[name])
+        by_tool.append(
+            ToolStats(
+                name=name,
+                calls=calls,
+                errors=errors,
+                unfinished=unfinished,
+                total_ms=round(sum(ds), 3),
+                p50_ms=_pct(ds, 0.5),
+                p95_ms=_pct(ds, 0.95),
+                max_ms=ds[-1] if ds else 0.0,
+                input_bytes=in_b,
+                output_bytes=out_b,
+            )
+        )
+    by_tool.sort(key=lambda s: s.total_ms, reverse=True)
+    return ToolsReport(
+        runs=n_runs,
+        timed_runs=timed_runs,
+        tool_ms=round(tool_ms, 3),
+        model_ms=round(model_ms, 3),
+        by_tool=by_tool,
+        slowest=slowest[:top],
+    )
+
+
+def _ms(v: float) -> str:
+    return f"{v:,.1f}"
+
+
+def render_tools_report(rep: ToolsReport) -> str:
+    busy = rep.tool_ms + rep.model_ms
+    share = f" ({rep.tool_ms / busy:.0%} of claude time)" if busy > 0 else ""
+    timed = f" ({rep.timed_runs} timed)" if rep.timed_runs < rep.runs else ""
+    lines = [
+        f"{rep.runs} runs{timed}  tool time {_ms(rep.tool_ms)} ms{share}  model time {_ms(rep.model_ms)} ms",
+        "",
+        f"{'tool':<20}{'calls':>7}{'errors':>8}{'total_ms':>12}{'p50_ms':>10}{'p95_ms':>10}{'max_ms':>10}"
+        f"{'in_kb':>9}{'out_kb':>9}",
+    ]
+    for s in rep.by_tool:
+        lines.append(
+            f"{s.name or '?':<20}{s.calls:>7}{s.errors:>8}{_ms(s.total_ms):>12}{_ms(s.p50_ms):>10}"
+            f"{_ms(s.p95_ms):>10}{_ms(s.max_ms):>10}{s.input_bytes / 1024:>9.1f}{s.output_bytes / 1024:>9.1f}"
+        )
+    if rep.slowest:
+        lines += ["", "slowest calls:"]
+        for run_id, c in rep.slowest:
+            lines.append(f"  {_ms(c.duration_ms or 0.0):>10} ms  {c.name or '?':<16} {run_id}  {c.tool_use_id}")
+    return "\n".join(lines)
@@ -5,8 +5,9 @@ from pathlib import Path
 
 
 def pytest_configure() -> None:
-    # Ensure `import cc3` works when running tests without installing the package.
+    # Ensure `import cc3` (and the chat API's `cc3_chat_api`) work when running
+    # tests without installing the packages.
     repo_root = Path(__file__).resolve().parents[1]
-    src_dir = repo_root / "src"
-    if src_dir.exists() and str(src_dir) not in sys.path:
-        sys.path.insert(0, str(src_dir))
+    for d in (repo_root / "src", repo_root / "apps" / "chat_api"):
+        if d.exists() and str(d) not in sys.path:
+            sys.path.insert(0, str(d))
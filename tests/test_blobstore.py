@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import hashlib
+
+from cc3.blobstore import BlobStore
+
+
+def test_blobs_are_deduplicated_and_collected_when_unreferenced(tmp_path) -> None:
+    store = BlobStore(tmp_path / "blobs")
+    data = b"kb document" * 1000
+
+    first = store.put([data[:100], data[100:]])
+    assert first.digest == hashlib.sha256(data).hexdigest()
+    assert first.created
+    assert not store.put([data]).created
+
+    a = tmp_path / "refs" / "a" / "doc.txt"
+    b = tmp_path / "refs" / "b" / "doc.txt"
+    store.link(first.digest, a)
+    store.link(first.digest, b)
+    assert store.refcount(first.digest) == 2
+
+    a.unlink()
+    assert store.gc().removed == 0
+    b.unlink()
+    gc = store.gc()
+    assert (gc.removed, gc.freed_bytes) == (1, len(data))
+    assert not store.has(first.digest)
+
+
+def test_checked_out_copies_are_private_and_writable(tmp_path) -> None:
+    store = BlobStore(tmp_path / "blobs")
+    ref = store.root / "refs" / "c1" / "doc.txt"
+    w = store.writer()
+    w.write(b"original")
+    digest = w.commit(ref=ref).digest
+
+    view = tmp_path / "ws" / "kb" / "doc.txt"
+    store.copy(digest, view)
+    assert view.stat().st_ino != store.path(digest).stat().st_ino
+    with view.open("r+b") as f:
+        f.write(b"EDITED")
+    assert store.path(digest).read_bytes() == b"original"
+    assert hashlib.sha256(store.path(digest).read_bytes()).hexdigest() == digest
+
+    store.checkout(digest, store.root / "refs" / "c2" / "doc.txt", tmp_path / "ws2" / "kb" / "doc.txt")
+    assert store.refcount(digest) == 2
+    assert (tmp_path / "ws2" / "kb" / "doc.txt").read_bytes() == b"original"
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from cc3.budget import RETENTION_S, Budget, BudgetLedger, parse_budget
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.t = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def test_budget_window_and_retry_after(tmp_path) -> None:
+    clock = FakeClock()
+    ledger = BudgetLedger(tmp_path / "usage.ndjson", clock=clock)
+    budget = Budget(tokens=100, window_s=60.0)
+
+    ledger.record(user_id="u1", agent_id="a", tokens=60, cost_usd=0.01)
+    clock.t += 10
+    ledger.record(user_id="u1", agent_id="b", tokens=50, cost_usd=0.01)
+    ledger.record(user_id="u2", agent_id="a", tokens=500, cost_usd=1.0)
+
+    used = ledger.usage(budget, user_id="u1")
+    assert (used.tokens, used.cost_usd) == (110, 0.02)
+    # Admitted again once the first run (60 tokens) leaves the window.
+    assert used.retry_after_s == 50.0
+    assert ledger.usage(budget, agent_id="b").retry_after_s == 0.0
+    assert ledger.usage(Budget(cost_usd=1.0), agent_id="a").retry_after_s > 0
+
+    clock.t += 50
+    assert ledger.usage(budget, user_id="u1").tokens == 50
+
+
+def test_ledger_persists_and_compacts(tmp_path) -> None:
+    clock = FakeClock()
+    path = tmp_path / "usage.ndjson"
+    ledger = BudgetLedger(path, clock=clock)
+    for _ in range(3):
+        ledger.record(user_id="u1", agent_id="a", tokens=10, cost_usd=0.0)
+    clock.t += RETENTION_S + 1
+    ledger.record(user_id="u1", agent_id="a", tokens=7, cost_usd=0.0)
+    path.open("a").write("not json\n")
+
+    reloaded = BudgetLedger(path, clock=clock)
+    assert reloaded.usage(Budget(tokens=1, window_s=RETENTION_S), user_id="u1").tokens == 7
+    assert len(path.read_text().splitlines()) == 1
+
+
+def test_parse_budget() -> None:
+    assert not parse_budget(None).enabled
+    assert parse_budget({"tokens": "5000", "window_s": None}) == Budget(tokens=5000, window_s=3600.0)
+    assert parse_budget({"cost_usd": 2, "window_s": 10**9}).window_s == RETENTION_S
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from cc3_chat_api.storage import conversation_root, create_conversation, fork_conversation
+
+
+def _edit_in_place(path, text: str) -> None:
+    with path.open("r+", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_forked_kb_files_are_independent_of_the_parent(tmp_path) -> None:
+    parent_id = create_conversation(tmp_path, "u1", "t")["conversation_id"]
+    parent_doc = conversation_root(tmp_path, "u1", parent_id) / "kb" / "doc.txt"
+    parent_doc.write_text("original", encoding="utf-8")
+
+    meta, _ = fork_conversation(tmp_path, "u1", parent_id)
+    child_doc = conversation_root(tmp_path, "u1", meta["conversation_id"]) / "kb" / "doc.txt"
+    assert child_doc.read_text(encoding="utf-8") == "original"
+
+    _edit_in_place(child_doc, "CHILD")
+    assert parent_doc.read_text(encoding="utf-8") == "original"
+    _edit_in_place(parent_doc, "PARENT")
+    assert child_doc.read_text(encoding="utf-8") == "CHILDnal"
+
+
+def test_kb_uploads_are_private_copies_of_intact_blobs(tmp_path, monkeypatch) -> None:
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from cc3_chat_api import kb_routes
+
+    monkeypatch.setattr(kb_routes, "repo_root", tmp_path)
+    app = FastAPI()
+    app.include_router(kb_routes.router)
+    client = TestClient(app, headers={"X-User-Id": "u1"})
+    a = create_conversation(tmp_path, "u1", "a")["conversation_id"]
+    b = create_conversation(tmp_path, "u1", "b")["conversation_id"]
+
+    digest = client.put(f"/v1/conversations/{a}/kb/doc.txt", content=b"original").json()["sha256"]
+    resp = client.put(f"/v1/conversations/{b}/kb/doc.txt", params={"sha256": digest})
+    assert resp.status_code == 201 and resp.json()["deduplicated"] is True
+
+    # The agent edits its copy in place: the blob and the other conversation keep the original.
+    doc_a = conversation_root(tmp_path, "u1", a) / "kb" / "doc.txt"
+    _edit_in_place(doc_a, "EDITED")
+    assert (conversation_root(tmp_path, "u1", b) / "kb" / "doc.txt").read_text(encoding="utf-8") == "original"
+    c = create_conversation(tmp_path, "u1", "c")["conversation_id"]
+    client.put(f"/v1/conversations/{c}/kb/doc.txt", params={"sha256": digest})
+    assert (conversation_root(tmp_path, "u1", c) / "kb" / "doc.txt").read_text(encoding="utf-8") == "original"
+
+    # Forks reference the parent's blobs, so deleting the parent's copy keeps them.
+    meta, _ = fork_conversation(tmp_path, "u1", a)
+    for cid in (a, b, c):
+        assert client.delete(f"/v1/conversations/{cid}/kb/doc.txt").json()["gc"]["removed"] == 0
+    gc = client.delete(f"/v1/conversations/{meta['conversation_id']}/kb/doc.txt").json()["gc"]
+    assert gc["removed"] == 1
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from cc3_chat_api.storage import (
+    append_message,
+    conversation_root,
+    create_conversation,
+    load_messages_page,
+    messages_etag,
+    messages_path,
+)
+
+
+def _msg(i: int) -> dict:
+    return {"message_id": f"m{i}", "role": "user", "content": f"hello {i}"}
+
+
+def _ids(msgs: list[dict]) -> list[str]:
+    return [m["message_id"] for m in msgs]
+
+
+def test_cursor_pages_forward_and_skips_a_half_written_line(tmp_path) -> None:
+    ws = tmp_path / "c1"
+    for i in range(3):
+        append_message(ws, _msg(i))
+
+    msgs, cursor = load_messages_page(ws, limit=2)
+    assert _ids(msgs) == ["m1", "m2"]
+    assert load_messages_page(ws, after=cursor) == ([], cursor)
+
+    for i in range(3, 8):
+        append_message(ws, _msg(i))
+    # A writer is mid-append: the partial line is left for the next fetch.
+    line = json.dumps(_msg(8)) + "\n"
+    with messages_path(ws).open("a", encoding="utf-8") as f:
+        f.write(line[:10])
+
+    seen = []
+    while True:
+        msgs, next_cursor = load_messages_page(ws, limit=2, after=cursor)
+        if not msgs:
+            break
+        assert len(msgs) <= 2
+        seen += _ids(msgs)
+        cursor = next_cursor
+    assert seen == ["m3", "m4", "m5", "m6", "m7"]
+    assert next_cursor == cursor
+
+    with messages_path(ws).open("a", encoding="utf-8") as f:
+        f.write(line[10:])
+    assert _ids(load_messages_page(ws, after=cursor)[0]) == ["m8"]
+
+
+def test_messages_etag_changes_on_append(tmp_path) -> None:
+    ws = tmp_path / "c1"
+    empty = messages_etag(ws, 200)
+    append_message(ws, _msg(0))
+    first = messages_etag(ws, 200)
+    assert first != empty
+    assert messages_etag(ws, 200, 0) != first
+    append_message(ws, _msg(1))
+    assert messages_etag(ws, 200) != first
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from cc3_chat_api import routes
+
+    monkeypatch.setattr(routes, "repo_root", tmp_path)
+    app = FastAPI()
+    app.include_router(routes.router)
+    return TestClient(app, headers={"X-User-Id": "u1"})
+
+
+@pytest.mark.parametrize("if_none_match", ["{etag}", "W/{etag}", '"other", {etag}', "*"])
+def test_messages_answer_304_when_the_etag_matches(tmp_path, client, if_none_match) -> None:
+    cid = create_conversation(tmp_path, "u1", "t")["conversation_id"]
+    url = f"/v1/conversations/{cid}/messages"
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    again = client.get(url, headers={"If-None-Match": if_none_match.format(etag=etag)})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag and again.content == b""
+
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_message_listing_revalidates_after_append(tmp_path, client) -> None:
+    cid = create_conversation(tmp_path, "u1", "t")["conversation_id"]
+    ws = conversation_root(tmp_path, "u1", cid)
+    url = f"/v1/conversations/{cid}/messages"
+    first = client.get(url)
+    cursor = first.headers["x-messages-cursor"]
+
+    append_message(ws, _msg(0))
+    resp = client.get(url, headers={"If-None-Match": first.headers["etag"]})
+    assert resp.status_code == 200 and _ids(resp.json()) == ["m0"]
+
+    newer = client.get(url, params={"after": cursor})
+    assert _ids(newer.json()) == ["m0"]
+    assert int(newer.headers["x-messages-cursor"]) > int(cursor)
+
+
+def test_conversation_listing_answers_304_until_a_conversation_is_added(tmp_path, client) -> None:
+    first = client.get("/v1/conversations")
+    etag = first.headers["etag"]
+    assert client.get("/v1/conversations", headers={"If-None-Match": etag}).status_code == 304
+
+    create_conversation(tmp_path, "u1", "t")
+    resp = client.get("/v1/conversations", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and len(resp.json()) == 1
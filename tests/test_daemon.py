@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from cc3 import daemon
+from cc3.session import SessionManager
+
+FAKE_CLAUDE_BIN = Path(__file__).resolve().parents[1] / "benchmarks" / "bin"
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="unix sockets + sh fake claude")
+
+
+@pytest.fixture
+def running_daemon(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", f"{FAKE_CLAUDE_BIN}{os.pathsep}{os.environ.get('PATH', '')}")
+    monkeypatch.setenv("FAKE_CLAUDE_PYTHON", sys.executable)
+    monkeypatch.setenv("FAKE_CLAUDE_EVENTS", "5")
+    monkeypatch.setenv("FAKE_CLAUDE_PAYLOAD_BYTES", "4")
+
+    # Unix socket paths are limited to ~100 bytes; pytest tmp paths can be longer.
+    sock = Path(tempfile.mkdtemp(prefix="cc3d-")) / "d.sock"
+    started = threading.Event()
+    servers = []
+
+    def ready(server) -> None:
+        servers.append(server)
+        started.set()
+
+    t = threading.Thread(target=daemon.serve, args=(tmp_path, sock), kwargs={"ready": ready}, daemon=True)
+    t.start()
+    assert started.wait(30.0)
+    yield sock
+    servers[0].shutdown()
+    t.join(5.0)
+    assert not sock.exists()
+
+
+def test_daemon_runs_goals_and_streams_deltas(tmp_path, running_daemon) -> None:
+    assert daemon.ping(running_daemon)
+
+    deltas: list[str] = []
+    state = daemon.run_remote(
+        running_daemon, repo_root=tmp_path, on_delta=deltas.append, agent="demo", goal="hi", mode="safe"
+    )
+
+    assert len(deltas) == 5
+    assert state["final_text"] == "".join(deltas)
+    assert Path(state["run_dir"]).is_dir()
+    assert SessionManager(tmp_path).load_or_create("demo").claude_session_id == state["claude_session_id"]
+
+    # The stored session is resumed by the next run.
+    state2 = daemon.run_remote(running_daemon, repo_root=tmp_path, agent="demo", goal="again")
+    assert state2["claude_session_id"] == state["claude_session_id"]
+
+
+def test_daemon_reports_errors_and_refuses_second_instance(tmp_path, running_daemon) -> None:
+    with pytest.raises(daemon.DaemonError) as exc:
+        daemon.run_remote(running_daemon, repo_root=tmp_path, agent="demo", goal="hi", fork=True)
+    assert exc.value.exit_code == 2
+
+    with pytest.raises(daemon.DaemonError):
+        daemon.serve(tmp_path, running_daemon)
+
+
+def test_client_without_daemon_is_unavailable(tmp_path) -> None:
+    with pytest.raises(daemon.DaemonUnavailable):
+        daemon.run_remote(tmp_path / "missing.sock", repo_root=tmp_path, agent="demo", goal="hi")
+
+
+def test_daemon_rejects_runs_for_another_repo_root(tmp_path, running_daemon) -> None:
+    other = tmp_path / "other"
+    other.mkdir()
+    with pytest.raises(daemon.DaemonRepoMismatch):
+        daemon.run_remote(running_daemon, repo_root=other, agent="demo", goal="hi")
+    # Nothing ran in the daemon's repo.
+    assert not (tmp_path / "workspaces" / "demo").exists()
+
+
+def test_cli_runs_in_process_when_the_daemon_serves_another_root(tmp_path, running_daemon, monkeypatch) -> None:
+    from typer.testing import CliRunner
+
+    from cc3.cli import app
+
+    monkeypatch.setenv(daemon.SOCKET_ENV, str(running_daemon))
+    other = tmp_path / "other"
+    other.mkdir()
+    res = CliRunner().invoke(app, ["run", "--agent", "demo", "--goal", "hi", "--root", str(other)])
+
+    assert res.exit_code == 0, res.output
+    assert SessionManager(other).load_or_create("demo").claude_session_id is not None
+    assert not (tmp_path / "workspaces" / "demo").exists()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from cc3.endpoints import COOLDOWN_S, Endpoint, EndpointHealth, parse_endpoints
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.t = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+A = Endpoint(name="a", base_url="http://a")
+B = Endpoint(name="b", base_url="http://b", weight=2.0)
+
+
+def test_acquire_prefers_least_loaded_member_by_weight() -> None:
+    health = EndpointHealth()
+    picks = [health.acquire([A, B]).endpoint.name for _ in range(6)]
+    # b carries twice the weight, so it takes two runs for each of a's.
+    assert picks.count("b") == 4
+    assert picks.count("a") == 2
+    assert {s.name: s.in_flight for s in health.stats([A, B])} == {"a": 2, "b": 4}
+
+
+def test_circuit_opens_after_failures_and_closes_after_probe() -> None:
+    clock = FakeClock()
+    health = EndpointHealth(clock=clock)
+    for _ in range(3):
+        health.acquire([A]).release(False)
+    assert health.stats([A])[0].state == "open"
+    # While open, the other member gets every run.
+    lease = health.acquire([A, B])
+    assert lease.endpoint == B
+    lease.release(True, ttfe_s=0.2)
+
+    clock.t += COOLDOWN_S
+    # Once b is busy, a half-open a takes a probe run.
+    busy = [health.acquire([B]) for _ in range(2)]
+    probe = health.acquire([A, B])
+    assert probe.endpoint == A
+    # Only one probe at a time.
+    assert health.acquire([A, B]).endpoint == B
+    probe.release(True, ttfe_s=0.1)
+    for lease in busy:
+        lease.release(True)
+    assert health.stats([A])[0].state == "closed"
+    assert health.stats([A])[0].error_rate == 0.0
+
+
+def test_failed_probe_reopens_for_longer() -> None:
+    clock = FakeClock()
+    health = EndpointHealth(clock=clock)
+    for _ in range(3):
+        health.acquire([A]).release(False)
+    clock.t += COOLDOWN_S
+    health.acquire([A]).release(False)
+    clock.t += COOLDOWN_S
+    assert health.stats([A])[0].state == "open"
+    clock.t += COOLDOWN_S
+    assert health.stats([A])[0].state == "half_open"
+
+
+def test_endpoint_env_overrides_base_env() -> None:
+    [ep] = parse_endpoints(
+        [{"name": "gw", "base_url": "http://gw", "api_key_env": "GW_KEY", "weight": 3, "env": {"X": 1}}, "junk"]
+    )
+    env = ep.apply({"ANTHROPIC_BASE_URL": "http://default", "ANTHROPIC_API_KEY": "k0", "GW_KEY": "k1"})
+    assert env["ANTHROPIC_BASE_URL"] == "http://gw"
+    assert env["ANTHROPIC_API_KEY"] == "k1"
+    assert env["X"] == "1"
+    assert ep.weight == 3.0
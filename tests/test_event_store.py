@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+
+from cc3.event_store import EVENTS_FILE, INDEX_FILE, EventWriter, RunReader
+
+
+def _lines(n: int) -> list[str]:
+    return [json.dumps({"type": "delta", "delta": {"text": f"t{i}"}}) for i in range(n)]
+
+
+def test_random_access_tail_and_export(tmp_path) -> None:
+    lines = _lines(10)
+    with EventWriter(tmp_path) as w:
+        for i, line in enumerate(lines):
+            assert w.append(line, t_ms=float(i)) == i
+        w.append("not json", t_ms=10.0, parse_error=True)
+
+    with RunReader(tmp_path) as r:
+        assert len(r) == 11
+        assert r[3].raw == lines[3] and r[3].t_ms == 3.0
+        assert r[-1].parse_error and r[-1].kind == "parse_error"
+        assert [e.seq for e in r.tail(3)] == [8, 9, 10]
+        assert r[5].normalized().text_delta == "t5"
+        with pytest.raises(IndexError):
+            r[11]
+
+        out = io.StringIO()
+        assert r.export_ndjson(out, stop=10) == 10
+        assert out.getvalue().splitlines() == lines
+
+        norm = io.StringIO()
+        r.export_ndjson(norm, normalized=True, start=10)
+        assert json.loads(norm.getvalue()) == {"kind": "parse_error", "raw": "not json"}
+
+
+def test_large_records_are_compressed(tmp_path) -> None:
+    big = json.dumps({"type": "result", "result": "x" * 50_000, "usage": {}})
+    with EventWriter(tmp_path, compress_min_bytes=1024) as w:
+        w.append(big, t_ms=1.0)
+
+    assert (tmp_path / EVENTS_FILE).stat().st_size < 5_000
+    assert RunReader(tmp_path)[0].raw == big
+
+
+def test_reader_ignores_unpublished_records(tmp_path) -> None:
+    with EventWriter(tmp_path) as w:
+        w.append(_lines(1)[0], t_ms=0.0)
+        w.append(_lines(2)[1], t_ms=1.0)
+    # Simulate a crash between writing a record and its full index entry.
+    idx = tmp_path / INDEX_FILE
+    idx.write_bytes(idx.read_bytes()[:-3])
+
+    assert len(RunReader(tmp_path)) == 1
+
+
+def test_legacy_ndjson_runs_are_readable(tmp_path) -> None:
+    lines = _lines(3)
+    (tmp_path / "events.ndjson").write_text("".join(x + "\n" for x in lines) + '{"partial"')
+    (tmp_path / "events_ts.ndjson").write_text(
+        "".join(json.dumps({"seq": i, "t_ms": 10.0 * i, "kind": "delta"}) + "\n" for i in range(3))
+    )
+
+    r = RunReader(tmp_path)
+    assert len(r) == 3
+    assert [e.t_ms for e in r] == [0.0, 10.0, 20.0]
+    assert r.tail(1)[0].raw == lines[2]
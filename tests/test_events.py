@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 from cc3.events import (
+    Usage,
     extract_api_key_source,
     extract_result_text,
     extract_session_id,
     extract_text_delta,
     guess_event_kind,
+    normalize_event,
 )
 
 
@@ -34,3 +36,17 @@ def test_guess_event_kind_heuristics() -> None:
     assert guess_event_kind({"type": "InitEvent", "apiKeySource": "env"}) == "init"
     assert guess_event_kind({"delta": "x"}) == "delta"
     assert guess_event_kind({"result_text": "done", "usage": {}}) == "result"
+
+
+def test_normalize_result_extracts_usage() -> None:
+    ev = normalize_event(
+        {
+            "type": "result",
+            "result": "ok",
+            "usage": {"input_tokens": 12, "output_tokens": 30, "cache_read_input_tokens": 100},
+            "total_cost_usd": 0.0042,
+        }
+    )
+    assert ev.usage == Usage(input_tokens=12, output_tokens=30, cache_read_input_tokens=100, cost_usd=0.0042)
+    assert (ev.usage + ev.usage).total_tokens == 284
+    assert normalize_event({"type": "delta", "delta": "x", "usage": {"output_tokens": 1}}).usage is None
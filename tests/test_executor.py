@@ -1,9 +1,19 @@
 from __future__ import annotations
 
 import io
+import json
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
 
 from cc3.config import AgentConfig
-from cc3.executor import ClaudeCliExecutor
+from cc3.endpoints import Endpoint, EndpointHealth
+from cc3.event_store import RunReader
+from cc3.executor import ClaudeCliExecutor, _TtfeHistory
 
 
 class FakePopen:
@@ -12,15 +22,19 @@ class FakePopen:
         argv,
         cwd=None,
         env=None,
+        stdin=None,
         stdout=None,
         stderr=None,
         text=None,
         encoding=None,
         errors=None,
+        start_new_session=False,
     ):
         self.argv = argv
         self.cwd = cwd
         self.env = env
+        self.pid = 0
+        self.stdin = io.StringIO()
 
         # Minimal stream-json fixture.
         self.stdout = io.StringIO(
@@ -65,9 +79,310 @@ def test_executor_writes_artifacts(tmp_path, monkeypatch) -> None:
     assert res.session_id_after == "sid-123"
     assert res.final_text == "OK"
 
-    assert (res.run_dir / "events.ndjson").exists()
-    assert (res.run_dir / "events_norm.ndjson").exists()
+    assert (res.run_dir / "events.bin").exists()
+    assert (res.run_dir / "events.idx").exists()
     assert (res.run_dir / "meta.json").exists()
     assert (res.run_dir / "result.txt").exists()
     assert (res.run_dir / "step.json").exists()
     assert (res.run_dir / "stderr.log").exists()
+    assert json.loads((res.run_dir / "tools.json").read_text())["calls"] == []
+
+    with RunReader(res.run_dir) as reader:
+        assert [ev.seq for ev in reader] == [0, 1, 2]
+        assert [ev.kind for ev in reader] == ["init", "delta", "result"]
+    phases = json.loads((res.run_dir / "meta.json").read_text())["phases_ms"]
+    assert {"lock_acquired", "spawned", "first_byte", "init", "first_delta", "result", "exit"} <= set(phases)
+
+
+class LargeDeltasFakePopen(FakePopen):
+    """Streams a long answer as deltas and ends without a result text."""
+
+    def __init__(self, argv, **kwargs):
+        super().__init__(argv, **kwargs)
+        chunk = json.dumps({"type": "delta", "delta": "x" * 999 + "\n"})
+        self.stdout = io.StringIO(
+            '{"type":"init","session_id":"sid-9"}\n' + (chunk + "\n") * 100 + '{"type":"result","usage":{}}\n'
+        )
+
+
+def test_executor_spills_large_results(tmp_path, monkeypatch) -> None:
+    workspace = tmp_path / "workspaces" / "demo"
+    workspace.mkdir(parents=True)
+    monkeypatch.setattr("cc3.executor.subprocess.Popen", LargeDeltasFakePopen)
+
+    ex = ClaudeCliExecutor(repo_root=tmp_path, timeout_s=5.0, lock_timeout_s=1.0)
+    res = ex.execute(instruction="hi", workspace=workspace, cfg=AgentConfig(agent_id="demo"), session_id=None)
+
+    assert res.result_chars == 100_000
+    assert res.final_text_truncated
+    assert res.final_text == ("x" * 999 + "\n") * 4 + "x" * 96
+    assert (res.run_dir / "result.txt").read_text() == ("x" * 999 + "\n") * 100
+    assert not (res.run_dir / "result.partial").exists()
+    assert json.loads((res.run_dir / "meta.json").read_text())["result_chars"] == 100_000
+
+
+class BlockingFakePopen(FakePopen):
+    """Emits an init event, then blocks until killed."""
+
+    def __init__(self, argv, **kwargs):
+        super().__init__(argv, **kwargs)
+        self._killed = threading.Event()
+        started.set()
+
+        def lines():
+            yield '{"type":"init","session_id":"sid-9"}\n'
+            self._killed.wait(5.0)
+
+        self.stdout = lines()
+
+    def wait(self, timeout=None):
+        if not self._killed.wait(timeout):
+            raise subprocess.TimeoutExpired("claude", timeout)
+        return self._exit_code
+
+    def kill(self):
+        self._exit_code = -9
+        self._killed.set()
+
+
+started = threading.Event()
+
+
+def test_executor_cancel_kills_and_writes_artifacts(tmp_path, monkeypatch) -> None:
+    workspace = tmp_path / "workspaces" / "demo"
+    workspace.mkdir(parents=True)
+
+    monkeypatch.setattr("cc3.executor.subprocess.Popen", BlockingFakePopen)
+    monkeypatch.setattr("cc3.executor._kill_process_group", lambda proc: proc.kill())
+    started.clear()
+
+    ex = ClaudeCliExecutor(repo_root=tmp_path, timeout_s=5.0, lock_timeout_s=1.0)
+    cfg = AgentConfig(agent_id="demo")
+
+    out = {}
+    t = threading.Thread(
+        target=lambda: out.setdefault(
+            "res", ex.execute(instruction="hi", workspace=workspace, cfg=cfg, session_id=None, run_id="r1")
+        )
+    )
+    t.start()
+    assert started.wait(5.0)
+
+    assert ex.cancel("r1") is True
+    t.join(5.0)
+
+    res = out["res"]
+    assert res.cancelled is True
+    assert res.session_id_after == "sid-9"
+    assert json.loads((res.run_dir / "meta.json").read_text())["cancelled"] is True
+    assert ex.cancel("r1") is False
+    assert "r1" not in ClaudeCliExecutor.live_run_ids()
+
+
+def test_executor_cancel_event_stops_running_process(tmp_path, monkeypatch) -> None:
+    workspace = tmp_path / "workspaces" / "demo"
+    workspace.mkdir(parents=True)
+
+    monkeypatch.setattr("cc3.executor.subprocess.Popen", BlockingFakePopen)
+    monkeypatch.setattr("cc3.executor._kill_process_group", lambda proc: proc.kill())
+    started.clear()
+
+    ev = threading.Event()
+    seen: list[str] = []
+    ex = ClaudeCliExecutor(repo_root=tmp_path, timeout_s=5.0, lock_timeout_s=1.0)
+    out = {}
+    t = threading.Thread(
+        target=lambda: out.setdefault(
+            "res",
+            ex.execute(
+                instruction="hi",
+                workspace=workspace,
+                cfg=AgentConfig(agent_id="demo"),
+                session_id=None,
+                cancel_event=ev,
+                on_event=lambda raw, norm: seen.append(norm.kind),
+            ),
+        )
+    )
+    t.start()
+    assert started.wait(5.0)
+    ev.set()
+    t.join(5.0)
+
+    assert out["res"].cancelled is True
+    assert out["res"].timed_out is False
+    assert seen == ["init"]
+
+
+def test_executor_cancel_before_spawn(tmp_path, monkeypatch) -> None:
+    workspace = tmp_path / "workspaces" / "demo"
+    workspace.mkdir(parents=True)
+    monkeypatch.setattr("cc3.executor.subprocess.Popen", FakePopen)
+
+    ev = threading.Event()
+    ev.set()
+    ex = ClaudeCliExecutor(repo_root=tmp_path, timeout_s=5.0, lock_timeout_s=1.0)
+    res = ex.execute(
+        instruction="hi", workspace=workspace, cfg=AgentConfig(agent_id="demo"), session_id=None, cancel_event=ev
+    )
+
+    assert res.cancelled is True
+    assert not (res.run_dir / "events.idx").exists()
+
+
+class OverloadedOnceFakePopen(FakePopen):
+    """The first spawn fails with a gateway overload; later spawns succeed."""
+
+    spawns: list[list[str]] = []
+
+    def __init__(self, argv, **kwargs):
+        super().__init__(argv, **kwargs)
+        OverloadedOnceFakePopen.spawns.append(argv)
+        if len(OverloadedOnceFakePopen.spawns) == 1:
+            self.stdout = io.StringIO(
+                '{"type":"init","session_id":"sid-1"}\n'
+                '{"type":"result","is_error":true,"session_id":"sid-1","result":"API Error: 529 overloaded_error"}\n'
+            )
+            self._exit_code = 1
+
+
+def test_executor_retries_transient_failure_resuming_session(tmp_path, monkeypatch) -> None:
+    workspace = tmp_path / "workspaces" / "demo"
+    workspace.mkdir(parents=True)
+    monkeypatch.setattr("cc3.executor.subprocess.Popen", OverloadedOnceFakePopen)
+    OverloadedOnceFakePopen.spawns = []
+
+    ex = ClaudeCliExecutor(repo_root=tmp_path, timeout_s=5.0, lock_timeout_s=1.0)
+    cfg = AgentConfig(agent_id="demo", retry_base_delay_s=0.01)
+    res = ex.execute(instruction="hi", workspace=workspace, cfg=cfg, session_id=None)
+
+    assert res.exit_code == 0
+    assert res.attempts == 2
+    assert res.final_text == "OK"
+    # The retry resumes the session the failed attempt recorded.
+    second = OverloadedOnceFakePopen.spawns[1]
+    assert second[second.index("--resume") + 1] == "sid-1"
+    with RunReader(res.run_dir) as reader:
+        assert [ev.kind for ev in reader] == ["init", "result", "retry", "init", "delta", "result"]
+    attempts = json.loads((res.run_dir / "meta.json").read_text())["attempts"]
+    assert [a["failure"] for a in attempts] == ["http_529", None]
+
+
+class SilentUntilKilledFakePopen(BlockingFakePopen):
+    """The first spawn never answers; the second (the hedge) does."""
+
+    spawns = 0
+
+    def __init__(self, argv, **kwargs):
+        SilentUntilKilledFakePopen.spawns += 1
+        super().__init__(argv, **kwargs)
+        if SilentUntilKilledFakePopen.spawns == 1:
+
+            def lines():
+                self._killed.wait(5.0)
+                return
+                yield
+
+            self.stdout = lines()
+        else:
+            self.stdout = FakePopen(argv).stdout
+            self._killed.set()
+            self._exit_code = 0
+
+
+def test_executor_hedges_slow_first_event(tmp_path, monkeypatch) -> None:
+    workspace = tmp_path / "workspaces" / "demo"
+    workspace.mkdir(parents=True)
+    monkeypatch.setattr("cc3.executor.subprocess.Popen", SilentUntilKilledFakePopen)
+    monkeypatch.setattr("cc3.executor._kill_process_group", lambda proc: proc.kill())
+    SilentUntilKilledFakePopen.spawns = 0
+    # A fresh history: samples on the class would leak into later hedging tests.
+    ttfe = _TtfeHistory()
+    monkeypatch.setattr(ClaudeCliExecutor, "_ttfe", ttfe)
+    for _ in range(20):
+        ttfe.add("hedged", 0.05)
+
+    ex = ClaudeCliExecutor(repo_root=tmp_path, timeout_s=5.0, lock_timeout_s=1.0)
+    res = ex.execute(
+        instruction="hi", workspace=workspace, cfg=AgentConfig(agent_id="hedged", hedge=True), session_id="sid-0"
+    )
+
+    assert SilentUntilKilledFakePopen.spawns == 2
+    assert res.exit_code == 0
+    assert res.final_text == "OK"
+    attempts = json.loads((res.run_dir / "meta.json").read_text())["attempts"]
+    assert attempts == [{"exit_code": 0, "failure": None, "transient": None, "hedged": True, "winner": 1}]
+
+
+FAKE_CLAUDE_BIN = Path(__file__).resolve().parents[1] / "benchmarks" / "bin"
+
+
+@pytest.mark.skipif(os.name != "posix", reason="fake claude wrapper is a sh script")
+def test_executor_with_fake_claude_binary(tmp_path, monkeypatch) -> None:
+    workspace = tmp_path / "workspaces" / "demo"
+    workspace.mkdir(parents=True)
+    monkeypatch.setenv("PATH", f"{FAKE_CLAUDE_BIN}{os.pathsep}{os.environ.get('PATH', '')}")
+    monkeypatch.setenv("FAKE_CLAUDE_PYTHON", sys.executable)
+    monkeypatch.setenv("FAKE_CLAUDE_EVENTS", "50")
+    monkeypatch.setenv("FAKE_CLAUDE_PAYLOAD_BYTES", "8")
+
+    ex = ClaudeCliExecutor(repo_root=tmp_path, timeout_s=30.0, lock_timeout_s=1.0)
+    res = ex.execute(
+        instruction="hi", workspace=workspace, cfg=AgentConfig(agent_id="demo"), session_id="sid-1"
+    )
+
+    assert res.exit_code == 0
+    assert res.session_id_after == "sid-1"
+    assert len(RunReader(res.run_dir)) == 52
+
+
+@pytest.mark.skipif(os.name != "posix", reason="fake claude wrapper is a sh script")
+def test_executor_fails_over_to_healthy_endpoint(tmp_path, monkeypatch) -> None:
+    workspace = tmp_path / "workspaces" / "demo"
+    workspace.mkdir(parents=True)
+    monkeypatch.setenv("PATH", f"{FAKE_CLAUDE_BIN}{os.pathsep}{os.environ.get('PATH', '')}")
+    monkeypatch.setenv("FAKE_CLAUDE_PYTHON", sys.executable)
+    monkeypatch.setenv("FAKE_CLAUDE_EVENTS", "3")
+    monkeypatch.setattr(ClaudeCliExecutor, "_endpoints", EndpointHealth())
+    # Stub gateways: the member env configures how the fake claude behaves behind each.
+    cfg = AgentConfig(
+        agent_id="demo",
+        retry_base_delay_s=0.01,
+        endpoints=[
+            Endpoint(name="overloaded", base_url="http://127.0.0.1:9", env={"FAKE_CLAUDE_ERROR": "529 overloaded"}),
+            Endpoint(name="healthy", base_url="http://127.0.0.1:10"),
+        ],
+    )
+
+    ex = ClaudeCliExecutor(repo_root=tmp_path, timeout_s=30.0, lock_timeout_s=1.0)
+    res = ex.execute(instruction="hi", workspace=workspace, cfg=cfg, session_id=None)
+
+    assert res.exit_code == 0
+    attempts = json.loads((res.run_dir / "meta.json").read_text())["attempts"]
+    assert [(a["endpoint"], a["failure"]) for a in attempts] == [("overloaded", "http_529"), ("healthy", None)]
+    # The next run starts on the healthy member.
+    res = ex.execute(instruction="hi", workspace=workspace, cfg=cfg, session_id=res.session_id_after)
+    assert json.loads((res.run_dir / "meta.json").read_text())["attempts"][0]["endpoint"] == "healthy"
+
+
+def test_executor_passes_system_prompt_by_file(tmp_path, monkeypatch) -> None:
+    workspace = tmp_path / "workspaces" / "demo"
+    workspace.mkdir(parents=True)
+    prompt = tmp_path / "system_prompt.md"
+    prompt.write_text("Answer in French.\n" * 1000)
+    monkeypatch.setattr("cc3.executor.subprocess.Popen", FakePopen)
+
+    ex = ClaudeCliExecutor(repo_root=tmp_path, timeout_s=5.0, lock_timeout_s=1.0)
+    cfg = AgentConfig(agent_id="demo", system_prompt_path=prompt)
+    metas = []
+    for _ in range(2):
+        res = ex.execute(instruction="hi", workspace=workspace, cfg=cfg, session_id=None)
+        metas.append(json.loads((res.run_dir / "meta.json").read_text()))
+
+    argv = metas[0]["argv"]
+    assert "--system-prompt" not in argv
+    path = Path(argv[argv.index("--system-prompt-file") + 1])
+    assert path.read_text() == prompt.read_text()
+    assert metas[0]["prompts"]["system_sha256"] == path.name
+    # Same content, same file: the argv is identical run to run.
+    assert metas[1]["argv"] == argv
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from cc3.event_store import EventWriter
+from cc3.export import event_rows, export_runs, run_row
+
+
+def _write_run(run_dir, *, finished: bool = True) -> None:
+    run_dir.mkdir(parents=True)
+    events = [
+        json.dumps({"type": "system", "subtype": "init", "session_id": "s", "apiKeySource": "env"}),
+        json.dumps({"type": "assistant", "message": {"content": [{"type": "tool_use", "id": "t1", "name": "Grep"}]}}),
+        json.dumps({"type": "stream_event", "delta": {"text": "hello"}}),
+        "{broken",
+        json.dumps({"type": "result", "result": "done", "usage": {"input_tokens": 7}, "total_cost_usd": 0.5}),
+    ]
+    with EventWriter(run_dir) as w:
+        for i, e in enumerate(events):
+            w.append(e, t_ms=5.0 * i)
+    if finished:
+        meta = {
+            "run_id": run_dir.name,
+            "started_at": "2026-01-02T03:04:05+00:00",
+            "duration_ms": 900,
+            "exit_code": 0,
+            "phases_ms": {"first_byte": 12.5},
+            "attempts": [{"failure": "overloaded", "hedged": False}, {"failure": None, "hedged": True}],
+            "usage": {"input_tokens": 7, "output_tokens": 0, "total_tokens": 7, "cost_usd": 0.5},
+        }
+        (run_dir / "meta.json").write_text(json.dumps(meta))
+        (run_dir / "step.json").write_text(json.dumps({"instruction": "do it", "fork": False}))
+
+
+def test_rows_flatten_events_and_meta(tmp_path) -> None:
+    rd = tmp_path / "r1"
+    _write_run(rd)
+
+    rows = list(event_rows(rd, "demo/runs/r1"))
+    assert [r["kind"] for r in rows] == ["init", "delta", "delta", "parse_error", "result"]
+    assert rows[1]["tool_uses"] == ["Grep"]
+    assert rows[2]["delta_chars"] == 5
+    assert rows[3]["parse_error"] is True
+    assert rows[4]["input_tokens"] == 7 and rows[4]["cost_usd"] == 0.5
+
+    run = run_row(rd, "demo/runs/r1")
+    assert run["workspace"] == "demo"
+    assert run["attempts"] == 2 and run["failure"] is None and run["hedged"] is True
+    assert run["instruction_chars"] == 5 and run["events"] == 5
+    assert run["started_at"].year == 2026
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_export_appends_only_new_finished_runs(tmp_path, fmt) -> None:
+    pytest.importorskip("pyarrow")
+    import pyarrow.dataset as ds
+
+    ws = tmp_path / "workspaces"
+    _write_run(ws / "demo" / "runs" / "r1")
+    _write_run(ws / "demo" / "runs" / "r2", finished=False)
+    out = tmp_path / "out"
+
+    first = export_runs(tmp_path, out, fmt=fmt, batch_rows=2)
+    assert (first.runs, first.events, first.skipped) == (1, 5, 0)
+
+    _write_run(ws / "chat" / "u" / "c" / "runs" / "r3")
+    (ws / "demo" / "runs" / "r2" / "meta.json").write_text(json.dumps({"exit_code": 1}))
+    second = export_runs(tmp_path, out, fmt=fmt)
+    assert (second.runs, second.skipped) == (2, 1)
+
+    assert export_runs(tmp_path, out, fmt=fmt).runs == 0
+    assert len(list((out / "runs").iterdir())) == 2
+
+    dsfmt = "parquet" if fmt == "parquet" else "ipc"
+    runs = ds.dataset(out / "runs", format=dsfmt).to_table().to_pylist()
+    assert sorted(r["run"] for r in runs) == ["chat/u/c/runs/r3", "demo/runs/r1", "demo/runs/r2"]
+    events = ds.dataset(out / "events", format=dsfmt).to_table()
+    assert events.num_rows == 15
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from cc3.fsclone import clone_tree
+
+
+def test_clone_tree_never_shares_inodes_and_skips_excluded(tmp_path) -> None:
+    src = tmp_path / "src"
+    (src / "kb" / "sub").mkdir(parents=True)
+    (src / "runs").mkdir()
+    (src / "kb" / "sub" / "doc.txt").write_text("kb", encoding="utf-8")
+    (src / "notes.md").write_text("notes", encoding="utf-8")
+    (src / "runs" / "r1.txt").write_text("run", encoding="utf-8")
+    (src / "session.json").write_text("{}", encoding="utf-8")
+
+    dst = tmp_path / "dst"
+    stats = clone_tree(src, dst, exclude=frozenset({"runs", "session.json"}))
+
+    assert (dst / "kb" / "sub" / "doc.txt").read_text(encoding="utf-8") == "kb"
+    assert not (dst / "runs").exists()
+    assert not (dst / "session.json").exists()
+    assert stats.reflinked + stats.copied == 2
+    for rel in ("kb/sub/doc.txt", "notes.md"):
+        assert (dst / rel).stat().st_ino != (src / rel).stat().st_ino
+        # In place, as an editor would.
+        with (dst / rel).open("r+", encoding="utf-8") as f:
+            f.write("XX")
+    assert (src / "kb" / "sub" / "doc.txt").read_text(encoding="utf-8") == "kb"
+    assert (src / "notes.md").read_text(encoding="utf-8") == "notes"
@@ -17,3 +17,15 @@ def test_workspace_lock_blocks(tmp_path) -> None:
         assert raised
     finally:
         h1.release()
+
+
+def test_named_locks_are_independent(tmp_path) -> None:
+    w = tmp_path / "workspace"
+    w.mkdir()
+
+    h1 = acquire_workspace_lock(w, timeout_s=0.1)
+    try:
+        h2 = acquire_workspace_lock(w, timeout_s=0.1, name="conversation")
+        h2.release()
+    finally:
+        h1.release()
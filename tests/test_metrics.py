@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from cc3.metrics import MetricsRegistry
+
+
+def test_counter_and_gauge_render() -> None:
+    reg = MetricsRegistry()
+    c = reg.counter("runs_total", "Runs.", ["exit_code"])
+    c.inc(exit_code=0)
+    c.inc(exit_code=0)
+    c.inc(exit_code=1)
+    g = reg.gauge("live", "Live.")
+    g.inc()
+    g.inc()
+    g.dec()
+
+    text = reg.render()
+    assert "# TYPE runs_total counter" in text
+    assert 'runs_total{exit_code="0"} 2' in text
+    assert 'runs_total{exit_code="1"} 1' in text
+    assert "live 1" in text
+
+
+def test_histogram_buckets_are_cumulative() -> None:
+    reg = MetricsRegistry()
+    h = reg.histogram("lat_seconds", "Latency.", buckets=(0.1, 1.0))
+    h.observe(0.05)
+    h.observe(0.5)
+    h.observe(5.0)
+
+    lines = reg.render().splitlines()
+    assert 'lat_seconds_bucket{le="0.1"} 1' in lines
+    assert 'lat_seconds_bucket{le="1"} 2' in lines
+    assert 'lat_seconds_bucket{le="+Inf"} 3' in lines
+    assert "lat_seconds_count 3" in lines
+    assert "lat_seconds_sum 5.55" in lines
+
+
+def test_registry_returns_existing_metric() -> None:
+    reg = MetricsRegistry()
+    assert reg.counter("x_total", "X.") is reg.counter("x_total", "X.")
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+
+from cc3.event_store import EventWriter
+from cc3.profile import find_run_dir, load_profile, render_profile
+
+_EVENTS = [
+    {"type": "system", "subtype": "init", "session_id": "s", "apiKeySource": "env"},
+    {"type": "assistant", "message": {"content": [{"type": "tool_use", "id": "tu1", "name": "Grep", "input": {}}]}},
+    {"type": "user", "message": {"content": [{"type": "tool_result", "tool_use_id": "tu1", "content": "x"}]}},
+    {"type": "result", "result": "done", "usage": {}},
+]
+_STAMPS = [50.0, 120.0, 470.0, 900.0]
+
+
+def _write_meta(run_dir) -> None:
+    (run_dir / "meta.json").write_text(
+        json.dumps(
+            {
+                "run_id": run_dir.name,
+                "exit_code": 0,
+                "duration_ms": 950,
+                "phases_ms": {"lock_acquired": 1.0, "spawned": 10.0, "first_byte": 50.0, "exit": 920.0},
+            }
+        )
+    )
+
+
+def _write_run(run_dir) -> None:
+    run_dir.mkdir(parents=True)
+    with EventWriter(run_dir) as w:
+        for e, t in zip(_EVENTS, _STAMPS):
+            w.append(json.dumps(e), t_ms=t)
+    _write_meta(run_dir)
+
+
+def _write_legacy_run(run_dir) -> None:
+    run_dir.mkdir(parents=True)
+    (run_dir / "events.ndjson").write_text("".join(json.dumps(e) + "\n" for e in _EVENTS))
+    kinds = ["init", "delta", "unknown", "result"]
+    (run_dir / "events_ts.ndjson").write_text(
+        "".join(json.dumps({"seq": s, "t_ms": t, "kind": k}) + "\n" for s, (t, k) in enumerate(zip(_STAMPS, kinds)))
+    )
+    _write_meta(run_dir)
+
+
+def test_profile_pairs_tool_use_and_result(tmp_path) -> None:
+    rd = tmp_path / "workspaces" / "demo" / "runs" / "r1"
+    _write_run(rd)
+
+    assert find_run_dir(tmp_path, "r1") == rd
+    assert find_run_dir(tmp_path, "r1", agent="other") is None
+
+    prof = load_profile(rd)
+    assert len(prof.events) == 4
+    assert [(t.name, t.duration_ms) for t in prof.tools] == [("Grep", 350.0)]
+
+    text = render_profile(prof)
+    assert "spawned" in text and "Grep" in text
+    assert "#1 delta -> #2 unknown" in text
+
+
+def test_profile_reads_legacy_ndjson_runs(tmp_path) -> None:
+    rd = tmp_path / "workspaces" / "demo" / "runs" / "r1"
+    _write_legacy_run(rd)
+
+    prof = load_profile(rd)
+    assert len(prof.events) == 4
+    assert [(t.name, t.duration_ms) for t in prof.tools] == [("Grep", 350.0)]
+    assert "#1 delta -> #2 unknown" in render_profile(prof)
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import hashlib
+
+from cc3.prompts import PromptFiles
+
+
+def test_prompts_are_stored_once_per_content(tmp_path) -> None:
+    prompts = PromptFiles(tmp_path / "store")
+    a = tmp_path / "a.md"
+    b = tmp_path / "b.md"
+    a.write_text("You are terse.\n")
+    b.write_text("You are terse.\n")
+
+    ra, rb = prompts.render(a), prompts.render(b)
+    assert ra == rb
+    assert ra.sha256 == hashlib.sha256(b"You are terse.\n").hexdigest()
+    assert ra.path.read_text() == "You are terse.\n"
+    assert ra.path.stat().st_mode & 0o222 == 0
+
+    a.write_text("You are verbose.\n")
+    assert prompts.render(a).sha256 != ra.sha256
+    # The old content is still addressable.
+    assert ra.path.exists()
+
+
+def test_blank_or_missing_prompt_renders_nothing(tmp_path) -> None:
+    prompts = PromptFiles(tmp_path / "store")
+    (tmp_path / "blank.md").write_text("  \n")
+    assert prompts.render(tmp_path / "blank.md") is None
+    assert prompts.render(tmp_path / "missing.md") is None
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import json
+
+from cc3.event_store import EventWriter
+from cc3.replay import derive, iter_run_dirs, replay_runs, retime
+
+
+def _write_run(run_dir, events, meta) -> None:
+    run_dir.mkdir(parents=True)
+    with EventWriter(run_dir) as w:
+        for i, e in enumerate(events):
+            w.append(e if isinstance(e, str) else json.dumps(e), t_ms=10.0 * i)
+    (run_dir / "meta.json").write_text(json.dumps(meta))
+
+
+_USAGE = {"input_tokens": 10, "output_tokens": 5}
+
+
+def test_derive_keeps_last_attempt_text_and_sums_usage() -> None:
+    lines = [
+        json.dumps({"type": "system", "subtype": "init", "session_id": "s1", "apiKeySource": "env"}),
+        json.dumps({"type": "result", "is_error": True, "result": "overloaded", "usage": _USAGE}),
+        json.dumps({"type": "cc3_retry", "attempt": 2, "reason": "overloaded", "delay_s": 0.1}),
+        "not json",
+        json.dumps({"type": "system", "subtype": "init", "session_id": "s1", "apiKeySource": "none"}),
+        json.dumps({"type": "result", "result": "done", "usage": _USAGE}),
+    ]
+    d = derive(lines)
+
+    assert d.final_text == "done"
+    assert d.session_id_after == "s1"
+    assert d.api_key_source == "none"
+    assert d.usage is not None and d.usage["input_tokens"] == 20 and d.usage["output_tokens"] == 10
+    assert d.parse_errors == 1
+
+
+def test_replay_reports_and_rewrites_stale_artifacts(tmp_path) -> None:
+    events = [
+        {"type": "system", "subtype": "init", "session_id": "s2", "apiKeySource": "env"},
+        {"type": "result", "result": "fresh", "usage": _USAGE},
+    ]
+    rd = tmp_path / "workspaces" / "demo" / "runs" / "r1"
+    _write_run(rd, events, {"run_id": "r1", "exit_code": 0, "session_id_after": None, "apiKeySource": "env"})
+    (rd / "result.txt").write_text("stale")
+    (rd / "step.json").write_text(json.dumps({"session_id_after": None, "exit_code": 0}))
+    # Unfinished run: events but no meta.json.
+    (tmp_path / "workspaces" / "demo" / "runs" / "r2").mkdir()
+    _write_run(tmp_path / "workspaces" / "other" / "runs" / "r3", events[:1], {"exit_code": 0})
+
+    assert [p.name for p in iter_run_dirs(tmp_path, agent="demo")] == ["r1"]
+
+    [dry] = replay_runs([rd], write=False)
+    assert dry.error is None
+    assert set(dry.changes) == {
+        "result.txt",
+        "meta.session_id_after",
+        "meta.usage",
+        "meta.result_chars",
+        "step.session_id_after",
+    }
+    assert dry.changes["result.txt"] == ("stale", "fresh")
+    assert (rd / "result.txt").read_text() == "stale"
+
+    diffs = list(replay_runs(iter_run_dirs(tmp_path), jobs=2))
+    assert {d.run_dir.name for d in diffs} == {"r1", "r3"}
+    assert (rd / "result.txt").read_text() == "fresh"
+    meta = json.loads((rd / "meta.json").read_text())
+    assert meta["session_id_after"] == "s2" and meta["usage"]["input_tokens"] == 10
+    assert json.loads((rd / "step.json").read_text())["session_id_after"] == "s2"
+
+    # Idempotent once the artifacts are current.
+    [again] = replay_runs([rd])
+    assert again.changes == {}
+
+
+def test_retime_paces_the_recorded_stream(tmp_path) -> None:
+    rd = tmp_path / "r"
+    events = [{"type": "stream_event", "event": {"type": "content_block_delta"}}] * 5
+    _write_run(rd, events, {"exit_code": 0})
+
+    st = retime(rd, speed=2.0)
+    assert st.events == 5
+    assert st.recorded_s == 0.04
+    # 40ms of recorded stream at 2x takes at least 20ms.
+    assert st.wall_s >= 0.02
+    assert retime(rd, speed=0).events == 5
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import random
+
+from cc3.retry import RetryPolicy, classify_failure
+
+
+def _classify(*, exit_code=1, errors=(), stderr="", timed_out=False):
+    return classify_failure(
+        exit_code=exit_code, timed_out=timed_out, cancelled=False, error_texts=list(errors), stderr=stderr
+    )
+
+
+def test_classify_failure_separates_transient_from_permanent() -> None:
+    assert _classify(exit_code=0) is None
+    assert _classify(errors=["API Error: 529 {\"type\":\"overloaded_error\"}"]).transient
+    assert _classify(errors=["API Error: 429 rate_limit_error"]).reason == "http_429"
+    assert _classify(stderr="Error: socket hang up\n").reason == "network"
+    assert not _classify(errors=["API Error: 401 authentication_error"]).transient
+    assert not _classify(errors=["API Error: 400 prompt is too long"]).transient
+    assert not _classify(stderr="something odd").transient
+    assert not _classify(exit_code=-9, timed_out=True, stderr="overloaded").transient
+
+
+def test_retry_delay_is_jittered_under_an_exponential_cap() -> None:
+    policy = RetryPolicy(max_attempts=5, base_delay_s=1.0, max_delay_s=5.0)
+    rng = random.Random(7)
+    for retry, cap in [(1, 1.0), (2, 2.0), (3, 4.0), (4, 5.0)]:
+        delays = [policy.delay_s(retry, rng) for _ in range(50)]
+        assert all(0.0 <= d <= cap for d in delays)
+        assert max(delays) > cap / 2
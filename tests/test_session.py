@@ -1,5 +1,10 @@
 from __future__ import annotations
 
+from cc3.config import AgentConfig
+from cc3.events import Usage
+from cc3.executor import ExecutionResult
+from cc3.rollover import SUMMARY_PROMPT, context_tokens
+from cc3.runner import run_agent_goal
 from cc3.session import SessionManager
 
 
@@ -20,3 +25,63 @@ def test_session_manager_persists_session_id(tmp_path) -> None:
 
     rec2 = sm.load_or_create("demo")
     assert rec2.claude_session_id == "sid-1"
+
+
+class ScriptedExecutor:
+    """A fresh session unless resumed; resumed runs read the earlier turns from cache."""
+
+    def __init__(self) -> None:
+        self.calls: list[dict] = []
+
+    def execute(self, *, instruction, workspace, cfg, session_id, **kwargs):
+        self.calls.append({"instruction": instruction, "session_id": session_id, "preset": cfg.policy_preset})
+        n = len(self.calls)
+        return ExecutionResult(
+            run_id=f"r{n}",
+            run_dir=workspace / "runs" / f"r{n}",
+            exit_code=0,
+            timed_out=False,
+            session_id_before=session_id,
+            session_id_after=session_id or f"sid-{n}",
+            api_key_source=None,
+            final_text=f"summary {n}" if instruction == SUMMARY_PROMPT else "ok",
+            usage=Usage(input_tokens=40, output_tokens=10, cache_read_input_tokens=60 if session_id else 0),
+        )
+
+
+def test_runner_rolls_session_over_with_summary(tmp_path) -> None:
+    ex = ScriptedExecutor()
+    cfg = AgentConfig(agent_id="demo", policy_preset="dev", session_max_tokens=100)
+
+    def run(goal: str) -> None:
+        run_agent_goal(repo_root=tmp_path, agent="demo", goal=goal, cfg=cfg, executor=ex)
+
+    run("one")
+    run("two")
+    # sid-1's context reached 100 tokens, but the reply to "two" is not held up by the summary.
+    assert len(ex.calls) == 2
+    rec = SessionManager(tmp_path).load_or_create("demo")
+    assert (rec.claude_session_id, rec.session_tokens, rec.lineage) == ("sid-1", 100, [])
+
+    run("three")
+    # The next turn first has the session summarize itself (read-only) and retires it.
+    assert ex.calls[2] == {"instruction": SUMMARY_PROMPT, "session_id": "sid-1", "preset": "safe"}
+    assert ex.calls[3]["session_id"] is None
+    assert ex.calls[3]["instruction"].startswith("[Context carried over")
+    assert "summary 3" in ex.calls[3]["instruction"]
+    assert ex.calls[3]["instruction"].endswith("three")
+    rec = SessionManager(tmp_path).load_or_create("demo")
+    assert [(e["claude_session_id"], e["tokens"], e["summary_run_id"]) for e in rec.lineage] == [("sid-1", 100, "r3")]
+    assert (rec.claude_session_id, rec.session_tokens, rec.seed_summary) == ("sid-4", 40, None)
+    assert len(rec.lineage) == 1
+
+
+def test_session_tokens_track_context_size_not_cumulative_usage(tmp_path) -> None:
+    sm = SessionManager(tmp_path)
+    rec = sm.load_or_create("demo")
+    usage = Usage(input_tokens=5, output_tokens=500, cache_creation_input_tokens=20, cache_read_input_tokens=75)
+
+    rec.record_run("sid-1", context_tokens(usage.to_dict()))
+    rec.record_run("sid-1", context_tokens(usage.to_dict()))
+    # Cache reads are re-counted every turn; output is not part of the next input.
+    assert rec.session_tokens == 100
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+from cc3.config import AgentConfig
+from cc3.orchestrator.steps import PLANNERS, run_agent
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+
+# Generous enough for slow CI machines; the eager LangGraph import alone took >1s.
+IMPORT_BUDGET_S = 0.75
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import cc3.cli
+dt = time.perf_counter() - t0
+heavy = [m for m in ("langgraph", "langchain_core", "yaml", "cc3.executor") if m in sys.modules]
+print(json.dumps({"seconds": dt, "heavy": heavy}))
+"""
+
+
+def test_cli_import_is_lazy_and_within_budget() -> None:
+    env = {**os.environ, "PYTHONPATH": f"{SRC_DIR}{os.pathsep}{os.environ.get('PYTHONPATH', '')}"}
+    # Best of three, to keep a cold disk cache from failing the budget.
+    samples = []
+    for _ in range(3):
+        out = subprocess.run([sys.executable, "-c", _PROBE], capture_output=True, text=True, env=env, check=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    assert samples[0]["heavy"] == []
+    assert min(s["seconds"] for s in samples) < IMPORT_BUDGET_S
+
+
+class StubExecutor:
+    def __init__(self) -> None:
+        self.instructions: list[str] = []
+
+    def execute(self, *, instruction, workspace, cfg, session_id, fork, **_):
+        self.instructions.append(instruction)
+        return SimpleNamespace(
+            session_id_after="sid-2",
+            run_id="r1",
+            run_dir=workspace / "runs" / "r1",
+            final_text="ok",
+            result_chars=2,
+            exit_code=0,
+            timed_out=False,
+            cancelled=False,
+            usage=None,
+        )
+
+
+def test_identity_planner_runs_without_graph(tmp_path) -> None:
+    ex = StubExecutor()
+    cfg = AgentConfig(agent_id="demo")
+    state = run_agent({"goal": "hi", "claude_session_id": "sid-1"}, executor=ex, cfg=cfg, workspace=tmp_path)
+
+    assert ex.instructions == ["hi"]
+    assert state["claude_session_id"] == "sid-2"
+    assert state["final_text"] == "ok"
+
+
+def test_graph_is_compiled_once_per_config(tmp_path, monkeypatch) -> None:
+    from cc3.orchestrator.graph import compiled_graph
+
+    monkeypatch.setitem(PLANNERS, "shout", lambda s: {**s, "instruction": s["goal"].upper()})
+    cfg = AgentConfig(agent_id="demo", planner="shout")
+
+    assert compiled_graph(cfg) is compiled_graph(AgentConfig(agent_id="demo", planner="shout"))
+    assert compiled_graph(cfg) is not compiled_graph(AgentConfig(agent_id="demo", planner="shout", model="m"))
+
+    ex = StubExecutor()
+    state = run_agent({"goal": "hi"}, executor=ex, cfg=cfg, workspace=tmp_path)
+    assert ex.instructions == ["HI"]
+    assert state["run_id"] == "r1"
+
+
+def test_service_caches_profiles_until_files_change(tmp_path) -> None:
+    from cc3.orchestrator.service import OrchestratorService
+
+    yaml_path = tmp_path / "agents" / "demo" / "agent.yaml"
+    yaml_path.parent.mkdir(parents=True)
+    yaml_path.write_text("model: a\n", encoding="utf-8")
+    service = OrchestratorService(tmp_path, default_profile=AgentConfig(agent_id="chat"))
+
+    first = service.profile("demo")
+    assert first.model == "a"
+    assert service.profile("demo") is first
+    assert service.profile(None).agent_id == "chat"
+    assert service.executor() is service.executor()
+
+    yaml_path.write_text("model: b\n", encoding="utf-8")
+    os.utime(yaml_path, ns=(0, yaml_path.stat().st_mtime_ns + 1_000_000))
+    assert service.profile("demo").model == "b"
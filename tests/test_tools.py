@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+
+from cc3.event_store import EventWriter
+from cc3.tools import TOOLS_FILE, load_run_tools, render_tools_report, tools_report
+
+
+def _use(tid: str, name: str, **inp) -> dict:
+    return {"type": "assistant", "message": {"content": [{"type": "tool_use", "id": tid, "name": name, "input": inp}]}}
+
+
+def _result(tid: str, content: str, *, is_error: bool = False) -> dict:
+    block = {"type": "tool_result", "tool_use_id": tid, "content": content, "is_error": is_error}
+    return {"type": "user", "message": {"content": [block]}}
+
+
+def _write_run(run_dir, stamped) -> None:
+    run_dir.mkdir(parents=True)
+    with EventWriter(run_dir) as w:
+        for t_ms, obj in stamped:
+            w.append(json.dumps(obj), t_ms=t_ms)
+    meta = {"run_id": run_dir.name, "phases_ms": {"spawned": 0.0, "exit": 1000.0}}
+    (run_dir / "meta.json").write_text(json.dumps(meta))
+
+
+def test_tool_calls_are_paired_with_sizes_and_overlap_counted_once(tmp_path) -> None:
+    rd = tmp_path / "r1"
+    _write_run(
+        rd,
+        [
+            (100.0, _use("a", "Grep", pattern="x")),
+            (150.0, _use("b", "Bash", command="sleep 1")),
+            (400.0, _result("a", "hits")),
+            (600.0, _result("b", "boom", is_error=True)),
+            (700.0, _use("c", "Read", path="/f")),
+        ],
+    )
+
+    rt = load_run_tools(rd)
+    assert [(c.name, c.duration_ms) for c in rt.calls] == [("Grep", 300.0), ("Bash", 450.0), ("Read", None)]
+    grep = rt.calls[0]
+    assert grep.input_bytes == len('{"pattern":"x"}') and grep.output_bytes == 4 and grep.is_error is False
+    assert rt.calls[1].is_error is True
+    # 100..600 with the two calls overlapping.
+    assert rt.tool_ms == 500.0
+    assert rt.model_ms == 500.0
+
+
+def test_report_ranks_tools_and_prefers_tools_json(tmp_path) -> None:
+    runs = tmp_path / "workspaces" / "demo" / "runs"
+    _write_run(runs / "r1", [(0.0, _use("a", "Grep")), (800.0, _result("a", "x"))])
+    _write_run(runs / "r2", [(0.0, _use("b", "Read")), (50.0, _result("b", "y"))])
+    # A stored tools.json wins over re-deriving from events.
+    doc = {"run_id": "r2", "tool_ms": 20.0, "model_ms": 980.0, "calls": []}
+    (runs / "r2" / TOOLS_FILE).write_text(json.dumps(doc))
+
+    rep = tools_report([load_run_tools(runs / "r1"), load_run_tools(runs / "r2")], top=1)
+    assert rep.runs == 2
+    assert rep.tool_ms == 820.0 and rep.model_ms == 1180.0
+    assert [(s.name, s.calls, s.max_ms) for s in rep.by_tool] == [("Grep", 1, 800.0)]
+    assert [(run_id, c.name) for run_id, c in rep.slowest] == [("r1", "Grep")]
+
+    text = render_tools_report(rep)
+    assert "Grep" in text and "41% of claude time" in text
+
+
+def test_backoff_is_not_model_time_and_untimed_runs_are_left_out_of_the_share(tmp_path) -> None:
+    rd = tmp_path / "r1"
+    retry = {"type": "cc3_retry", "attempt": 2, "reason": "overloaded", "delay_s": 0.2}
+    _write_run(rd, [(0.0, _use("a", "Grep")), (100.0, _result("a", "x")), (150.0, retry)])
+    rt = load_run_tools(rd)
+    assert (rt.tool_ms, rt.backoff_ms, rt.model_ms) == (100.0, 200.0, 700.0)
+
+    untimed = tmp_path / "r2"
+    _write_run(untimed, [(0.0, _use("b", "Bash")), (900.0, _result("b", "y"))])
+    (untimed / "meta.json").write_text(json.dumps({"run_id": "r2"}))
+
+    rep = tools_report([rt, load_run_tools(untimed)])
+    assert (rep.runs, rep.timed_runs) == (2, 1)
+    assert (rep.tool_ms, rep.model_ms) == (100.0, 700.0)
+    # Per-tool stats still cover every run.
+    assert sorted(s.name for s in rep.by_tool) == ["Bash", "Grep"]
+    assert "2 runs (1 timed)" in render_tools_report(rep)